@@ -0,0 +1,149 @@
+"""Growth analytics"""
+
+from flask import current_app
+from datetime import datetime, timedelta, date as date_type
+import numpy as np
+
+from .extensions import db
+from .models import Pig, Weight, WeightSummary
+from .outliers import counted_weight
+
+
+ANALYTICS_WINDOW_MAX_DAYS = 365
+
+# Weigh-in rows fetched per round trip when streaming into NumPy arrays
+ANALYTICS_BATCH_SIZE = 50000
+
+
+def growth_analytics(barn_ids=None, window_days=None, market_weight=None, today=None):
+    """Growth figures for every live pig in `barn_ids` (None means all barns).
+
+    Weigh-ins from the last `window_days` are streamed into NumPy arrays and
+    reduced per pig with bincount, so the cost is a few array passes however
+    many rows there are:
+    - window_adg: gain between the first and last weigh-in in the window
+    - trend_adg: least-squares slope of weight against day in the window
+    - projected_market_date: latest weight extended at trend_adg until it
+      reaches `market_weight`
+    lifetime_adg comes from the weight summary. Returns {'pigs': [...],
+    'barns': {barn_id: {...}}} with pigs sorted by projected market date.
+    """
+    today = today or datetime.utcnow().date()
+    window_days = window_days or current_app.config['GROWTH_WINDOW_DAYS']
+    market_weight = market_weight or current_app.config['MARKET_WEIGHT_KG']
+
+    pig_query = db.session.query(
+        Pig.id, Pig.barn_id, WeightSummary.latest_weight, WeightSummary.latest_weight_date,
+        WeightSummary.avg_daily_gain
+    ).outerjoin(WeightSummary).filter(Pig.status == 'ALIVE')
+    weight_query = db.session.query(Weight.pig_id, Weight.date, Weight.weight) \
+        .join(Pig, Pig.id == Weight.pig_id) \
+        .filter(Pig.status == 'ALIVE', Weight.date >= today - timedelta(days=window_days), counted_weight())
+    if barn_ids is not None:
+        pig_query = pig_query.filter(Pig.barn_id.in_(barn_ids))
+        weight_query = weight_query.filter(Pig.barn_id.in_(barn_ids))
+
+    pig_rows = pig_query.all()
+    result = {'as_of': today, 'window_days': window_days, 'market_weight': market_weight, 'pigs': [], 'barns': {}}
+    if not pig_rows:
+        return result
+
+    pig_ids, barn_of_pig, latest, latest_dates, lifetime_adg = zip(*pig_rows)
+    pig_count = len(pig_ids)
+    pig_id_array = np.array(pig_ids)
+    pig_order = np.argsort(pig_id_array)
+    sorted_pig_ids = pig_id_array[pig_order]
+    latest = np.array([np.nan if value is None else value for value in latest], dtype=float)
+    latest_days = np.array([date.toordinal() if date else 0 for date in latest_dates], dtype=np.int64)
+
+    # Stream weigh-ins into (pig index, day ordinal, weight) arrays over a Core
+    # connection; ORM row handling would cost more than all the maths below
+    index_chunks, day_chunks, weight_chunks = [], [], []
+    connection = db.session.connection()
+    result_rows = connection.execute(weight_query.statement.execution_options(yield_per=ANALYTICS_BATCH_SIZE))
+    for partition in result_rows.partitions():
+        ids, dates, values = zip(*partition)
+        index_chunks.append(pig_order[np.searchsorted(sorted_pig_ids, np.array(ids))])
+        day_chunks.append(np.fromiter(map(date_type.toordinal, dates), np.int64, len(dates)))
+        weight_chunks.append(np.array(values, dtype=float))
+
+    window_count = np.zeros(pig_count, dtype=np.int64)
+    window_adg = np.full(pig_count, np.nan)
+    trend_adg = np.full(pig_count, np.nan)
+    if index_chunks:
+        pig_index = np.concatenate(index_chunks)
+        days = np.concatenate(day_chunks)
+        weights = np.concatenate(weight_chunks)
+        order = np.lexsort((days, pig_index))
+        pig_index, days, weights = pig_index[order], days[order], weights[order]
+
+        window_count = np.bincount(pig_index, minlength=pig_count)
+        present = window_count > 0
+        ends = np.cumsum(window_count) - 1
+        starts = ends - window_count + 1
+        first_day = np.where(present, days[np.minimum(starts, len(days) - 1)], 0)
+        last_day = np.where(present, days[np.maximum(ends, 0)], 0)
+        span = last_day - first_day
+        with np.errstate(divide='ignore', invalid='ignore'):
+            window_adg = np.where(span > 0, (weights[np.maximum(ends, 0)] - weights[np.minimum(starts, len(days) - 1)]) / span, np.nan)
+
+            # Per-pig least squares on days since the pig's first weigh-in in the window
+            x = (days - first_day[pig_index]).astype(float)
+            n = window_count.astype(float)
+            sum_x = np.bincount(pig_index, x, pig_count)
+            sum_y = np.bincount(pig_index, weights, pig_count)
+            sum_xx = np.bincount(pig_index, x * x, pig_count)
+            sum_xy = np.bincount(pig_index, x * weights, pig_count)
+            denominator = n * sum_xx - sum_x * sum_x
+            trend_adg = np.where(denominator > 0, (n * sum_xy - sum_x * sum_y) / denominator, np.nan)
+
+    ready = latest >= market_weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_market = np.where(ready, 0.0, np.ceil((market_weight - latest) / trend_adg))
+    days_to_market[~ready & ~(trend_adg > 0)] = np.nan
+    projected_days = latest_days + np.nan_to_num(days_to_market).astype(np.int64)
+
+    pigs = []
+    for position in range(pig_count):
+        projected = None
+        if not np.isnan(days_to_market[position]):
+            projected = date_type.fromordinal(int(projected_days[position]))
+        pigs.append({
+            'pig_id': pig_ids[position],
+            'barn_id': barn_of_pig[position],
+            'latest_weight': None if np.isnan(latest[position]) else float(latest[position]),
+            'latest_weight_date': latest_dates[position],
+            'lifetime_adg': lifetime_adg[position],
+            'window_weigh_ins': int(window_count[position]),
+            'window_adg': None if np.isnan(window_adg[position]) else float(window_adg[position]),
+            'trend_adg': None if np.isnan(trend_adg[position]) else float(trend_adg[position]),
+            'ready': bool(ready[position]),
+            'days_to_market': None if np.isnan(days_to_market[position]) else int(days_to_market[position]),
+            'projected_market_date': projected
+        })
+    pigs.sort(key=lambda pig: (pig['projected_market_date'] is None, pig['projected_market_date'] or today, pig['pig_id']))
+    result['pigs'] = pigs
+
+    # Per-barn rollups, again with bincount over a barn index
+    barn_keys, barn_index = np.unique(np.array(barn_of_pig), return_inverse=True)
+    barn_total = len(barn_keys)
+    has_trend = ~np.isnan(trend_adg)
+    trend_sum = np.bincount(barn_index, np.where(has_trend, trend_adg, 0.0), barn_total)
+    trend_n = np.bincount(barn_index, has_trend, barn_total)
+    due_soon = ~ready & ~np.isnan(days_to_market) & (projected_days - today.toordinal() <= 14)
+    pigs_n = np.bincount(barn_index, minlength=barn_total)
+    ready_n = np.bincount(barn_index, ready, barn_total)
+    due_n = np.bincount(barn_index, due_soon, barn_total)
+    for position, barn_id in enumerate(barn_keys.tolist()):
+        result['barns'][barn_id] = {
+            'pigs': int(pigs_n[position]),
+            'avg_trend_adg': float(trend_sum[position] / trend_n[position]) if trend_n[position] else None,
+            'ready': int(ready_n[position]),
+            'due_within_14_days': int(due_n[position]),
+            'next_to_market': []
+        }
+    for pig in pigs:
+        upcoming = result['barns'][pig['barn_id']]['next_to_market']
+        if pig['projected_market_date'] and not pig['ready'] and len(upcoming) < 5:
+            upcoming.append(pig)
+    return result
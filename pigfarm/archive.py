@@ -0,0 +1,61 @@
+"""Archive of slaughtered pigs and their weigh-ins"""
+
+from datetime import datetime
+
+from .extensions import db
+from .models import ArchivedPig, ArchivedWeight, Pig, Weight, WeightSummary
+from .conditional import bump_barn_versions
+from .sync import add_sync_tombstones
+from .charts import chart_cache
+
+
+# Pigs slaughtered longer ago than ARCHIVE_AFTER_DAYS move, with their weights,
+# to archived_pig/archived_weight, so live pages only read the active herd.
+# Exports, rollup rebuilds and (on request) statistics reports read both.
+
+def archive_slaughtered_pigs(cutoff, batch_size):
+    """Move pigs slaughtered before `cutoff`, and their weights, into the archive.
+
+    Works through `batch_size` pigs per transaction: each batch is copied
+    with INSERT ... SELECT and deleted from the live tables together with
+    the weight summaries. Daily rollups keep the pigs' history as it is,
+    barn versions are bumped, and sync tombstones tell terminals to drop
+    the pigs. Yields (pigs, weights) archived per committed batch.
+    """
+    pig_columns = ['id', 'barn_id', 'section_id', 'dob', 'sex', 'breed', 'kill_date', 'status', 'notes', 'created_at']
+    weight_columns = ['id', 'pig_id', 'weight', 'date', 'flag', 'expected_weight']
+    while True:
+        pig_barns = dict(db.session.query(Pig.id, Pig.barn_id).filter(
+            Pig.status == 'SLAUGHTERED', Pig.kill_date < cutoff).order_by(Pig.id).limit(batch_size))
+        if not pig_barns:
+            return
+        pig_ids = list(pig_barns)
+
+        db.session.execute(db.insert(ArchivedPig).from_select(
+            pig_columns + ['latest_weight', 'latest_weight_date', 'archived_at'],
+            db.select(*(getattr(Pig, name) for name in pig_columns), WeightSummary.latest_weight,
+                      WeightSummary.latest_weight_date, db.literal(datetime.utcnow(), db.DateTime))
+            .outerjoin(WeightSummary, WeightSummary.pig_id == Pig.id).where(Pig.id.in_(pig_ids))))
+        weights = db.session.execute(db.insert(ArchivedWeight).from_select(
+            weight_columns,
+            db.select(*(getattr(Weight, name) for name in weight_columns)).where(Weight.pig_id.in_(pig_ids)))).rowcount
+        for model, column in ((WeightSummary, WeightSummary.pig_id), (Weight, Weight.pig_id), (Pig, Pig.id)):
+            model.query.filter(column.in_(pig_ids)).delete(synchronize_session=False)
+
+        bump_barn_versions(set(pig_barns.values()))
+        add_sync_tombstones(pig_barns)
+        db.session.commit()
+        for pig_id in pig_ids:
+            chart_cache.invalidate_pig(pig_id)
+        yield len(pig_ids), weights
+
+
+def archive_horizon():
+    """Latest kill date in the archive: no archived weigh-in is dated after it. None when empty."""
+    return db.session.query(db.func.max(ArchivedPig.kill_date)).scalar()
+
+
+def archive_in_range(start_date):
+    """Whether weigh-ins from `start_date` on (all of them when None) include archived ones"""
+    horizon = archive_horizon()
+    return horizon is not None and (start_date is None or start_date <= horizon)
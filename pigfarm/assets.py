@@ -0,0 +1,131 @@
+"""Static asset bundles: minified, content-hashed and cached for a year"""
+
+from flask import current_app, request, url_for
+from functools import lru_cache
+import re
+import json
+import hashlib
+import zlib
+import os
+
+
+# Bundles pages load, by name: source files under static/, concatenated in order.
+# base.* is on every page; each page adds at most one more bundle.
+ASSET_BUNDLES = {
+    'base.css': ['css/main.css'],
+    'base.js': ['js/main.js'],
+    'dashboard.js': ['js/dashboard.js'],
+    'forms.js': ['js/forms.js'],
+    'pig.js': ['js/forms.js', 'js/charts.js'],
+    'charts.js': ['js/charts.js'],
+    'comparison.js': ['js/charts.js', 'js/jobs.js'],
+    'jobs.js': ['js/jobs.js'],
+}
+ASSET_DIST_DIR = 'dist'
+ASSET_HASH_LENGTH = 10
+ASSET_IMMUTABLE_MAX_AGE = 365 * 86400
+
+
+def minify_js(text):
+    """Drop comment-only lines, indentation and blank lines (rjsmin when installed).
+
+    Statements and line breaks are left alone, so the result behaves exactly
+    like the source, including automatic semicolon insertion.
+    """
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        pass
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+def minify_css(text):
+    """Strip comments and the whitespace around CSS punctuation (rcssmin when installed)"""
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip() + '\n'
+
+
+def build_asset_bundles(static_folder):
+    """Write each bundle minified under static/dist/ with a content hash in its name.
+
+    Returns the manifest ({bundle: hashed file name}) and per-bundle sizes;
+    the manifest is also written to dist/manifest.json, last, so a running
+    app only sees it once every file it names exists.
+    """
+    dist_folder = os.path.join(static_folder, ASSET_DIST_DIR)
+    os.makedirs(dist_folder, exist_ok=True)
+    manifest, sizes = {}, {}
+    for name, sources in ASSET_BUNDLES.items():
+        stem, extension = os.path.splitext(name)
+        texts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as source_file:
+                texts.append(source_file.read())
+        if extension == '.js':
+            content = ';\n'.join(minify_js(text) for text in texts)
+        else:
+            content = ''.join(minify_css(text) for text in texts)
+        data = content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]
+        filename = f'{stem}.{digest}{extension}'
+        with open(os.path.join(dist_folder, filename), 'wb') as output:
+            output.write(data)
+        manifest[name] = filename
+        sizes[name] = {'source_bytes': sum(len(text.encode('utf-8')) for text in texts),
+                       'minified_bytes': len(data), 'gzip_bytes': len(zlib.compress(data, 9))}
+
+    manifest_path = os.path.join(dist_folder, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest, sizes
+
+
+@lru_cache(maxsize=4)
+def read_asset_manifest(manifest_path, modified_ns):
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def asset_manifest():
+    """The built manifest, re-read when build-assets replaces it; {} when assets are not built"""
+    manifest_path = os.path.join(current_app.static_folder, ASSET_DIST_DIR, 'manifest.json')
+    try:
+        modified_ns = os.stat(manifest_path).st_mtime_ns
+    except OSError:
+        return {}
+    return read_asset_manifest(manifest_path, modified_ns)
+
+
+def asset_urls(bundle):
+    """URLs to load `bundle`: its one hashed file once built, otherwise the source files.
+
+    Available in templates; source files carry no hash, so before a build
+    they are revalidated as usual rather than cached long-term.
+    """
+    filename = asset_manifest().get(bundle)
+    if filename is not None:
+        return [url_for('static', filename=f'{ASSET_DIST_DIR}/{filename}')]
+    return [url_for('static', filename=source) for source in ASSET_BUNDLES[bundle]]
+
+
+def cache_static_assets(response):
+    """Let browsers keep content-hashed bundles for a year without revalidating"""
+    if (request.endpoint == 'static' and response.status_code == 200
+            and (request.view_args or {}).get('filename', '').startswith(ASSET_DIST_DIR + '/')
+            and not request.view_args['filename'].endswith('manifest.json')):
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
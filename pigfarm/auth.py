@@ -0,0 +1,141 @@
+"""Logged-in user lookup and the access decorators for routes"""
+
+from flask import redirect, url_for, flash, session, g
+from functools import wraps
+import threading
+import time
+
+from .extensions import db
+from .models import User
+
+
+class AuthUser:
+    """Read-only snapshot of the logged-in user's identity and barn permissions.
+
+    Decorators, access checks and route bodies share one instance per
+    request (see current_user), so it never touches the database itself.
+    """
+    __slots__ = ('id', 'username', 'role', 'barn_id')
+
+    def __init__(self, id, username, role, barn_id):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.barn_id = barn_id
+
+    def can_access_barn(self, barn_id):
+        if self.role == 'ADMIN':
+            return True
+        return self.role in ['FARMER', 'HELPER'] and self.barn_id == barn_id
+
+
+class UserCache:
+    """Process-wide TTL cache of AuthUser snapshots keyed by user id.
+
+    Saves the per-request user lookup for `ttl` seconds. Account and barn
+    changes call invalidate(); a ttl of 0 disables caching entirely.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return entry[1]
+
+    def put(self, auth_user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[auth_user.id] = (time.monotonic() + self.ttl, auth_user)
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone when no id is given"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+user_cache = UserCache(0)  # ttl set by create_app()
+
+
+def current_user():
+    """The logged-in user as an AuthUser, loaded at most once per request.
+
+    Returns None when nobody is logged in or the account no longer exists.
+    """
+    if 'current_user' in g:
+        return g.current_user
+
+    user_id = session.get('user_id')
+    auth_user = None
+    if user_id is not None:
+        auth_user = user_cache.get(user_id)
+        if auth_user is None:
+            row = db.session.query(User.id, User.username, User.role, User.barn_id).filter_by(id=user_id).first()
+            if row is not None:
+                auth_user = AuthUser(*row)
+                user_cache.put(auth_user)
+
+    g.current_user = auth_user
+    return auth_user
+
+
+def login_required(f):
+    """Decorator to require login for a route"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user() is None:
+            session.clear()
+            flash('Please login', 'warning')
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def admin_required(f):
+    """Decorator to require admin privileges for a route"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('Please login', 'warning')
+            return redirect(url_for('auth.login'))
+        user = current_user()
+        if not user or user.role != 'ADMIN':
+            flash('Admin access required', 'danger')
+            return redirect(url_for('pigs.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def farmer_or_admin_required(f):
+    """Decorator to require farmer or admin privileges"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('Please login', 'warning')
+            return redirect(url_for('auth.login'))
+        user = current_user()
+        if not user or user.role not in ['ADMIN', 'FARMER']:
+            flash('Farmer or Admin access required', 'danger')
+            return redirect(url_for('pigs.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def check_barn_access(barn_id):
+    """Check if user can access a barn"""
+    user = current_user()
+    return user is not None and user.can_access_barn(barn_id)
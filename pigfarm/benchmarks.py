@@ -0,0 +1,187 @@
+"""Synthetic data and benchmark helpers"""
+
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import math
+import subprocess
+import sys
+from urllib.parse import urlencode
+import os
+
+from .extensions import db
+from .models import Barn, Pig, Section, User, Weight
+from .conditional import bump_barn_versions
+from .summaries import rebuild_weight_summaries
+from .rollups import rebuild_rollups, rollups_follow
+from .charts import chart_cache
+
+
+SEED_BREEDS = ['Large White', 'Landrace', 'Duroc', 'Pietrain', 'Hampshire', 'Berkshire']
+SEED_INSERT_CHUNK = 20000
+
+
+def growth_curve_weight(age_days, rate):
+    """Gompertz live weight (kg) at `age_days`: ~1.4kg at birth, ~115kg at 165 days for rate 1"""
+    return 300.0 * math.exp(-math.log(300.0 / 1.4) * math.exp(-0.0112 * rate * age_days))
+
+
+def seed_farm_data(barns, sections_per_barn, pigs_per_barn, interval_days, max_age_days, rng, prefix='SYN'):
+    """Insert a synthetic farm and return row counts per table.
+
+    Pigs are born over the last `max_age_days`; most pigs older than ~165
+    days have been slaughtered. Each pig gets a weigh-in every
+    `interval_days` along its own growth curve with scale noise. Rows are
+    written with chunked executemany inserts, one FARMER account is created
+    per barn (with an unusable password) and weight summaries and the new
+    barns' daily rollups are rebuilt. Nothing is committed here.
+    """
+    today = datetime.utcnow().date()
+    counts = {'barns': 0, 'sections': 0, 'pigs': 0, 'weights': 0, 'users': 0}
+    pending_weights = []
+    barn_ids = []
+
+    def flush_weights():
+        if pending_weights:
+            db.session.execute(db.insert(Weight), pending_weights)
+            counts['weights'] += len(pending_weights)
+            pending_weights.clear()
+
+    for barn_number in range(1, barns + 1):
+        barn = Barn(name=f'{prefix} Barn {barn_number:03d}', location=f'Site {(barn_number - 1) // 10 + 1}',
+                    capacity=pigs_per_barn + pigs_per_barn // 5)
+        db.session.add(barn)
+        db.session.flush()
+        barn_ids.append(barn.id)
+        sections = [Section(barn_id=barn.id, name=f'Pen {number}',
+                            capacity=pigs_per_barn // max(sections_per_barn, 1) + 10)
+                    for number in range(1, sections_per_barn + 1)]
+        db.session.add_all(sections)
+        db.session.add(User(username=f'{prefix.lower()}-farmer-{barn_number:03d}',
+                            password=generate_password_hash(os.urandom(16).hex()), role='FARMER', barn_id=barn.id))
+        db.session.flush()
+        counts['barns'] += 1
+        counts['sections'] += len(sections)
+        counts['users'] += 1
+
+        pigs = []
+        for pig_number in range(1, pigs_per_barn + 1):
+            pig_id = f'{prefix}{barn_number:03d}-{pig_number:05d}'
+            dob = today - timedelta(days=rng.randint(0, max_age_days))
+            age = (today - dob).days
+            kill_date = None
+            if age > 165 and rng.random() < 0.85:
+                kill_date = dob + timedelta(days=rng.randint(160, min(age, 200)))
+            pigs.append({
+                'id': pig_id,
+                'barn_id': barn.id,
+                'section_id': rng.choice(sections).id if sections and rng.random() < 0.95 else None,
+                'dob': dob,
+                'sex': rng.choice(['Male', 'Female']),
+                'breed': rng.choice(SEED_BREEDS),
+                'kill_date': kill_date,
+                'status': 'SLAUGHTERED' if kill_date else 'ALIVE',
+                'notes': ''
+            })
+
+            rate = rng.gauss(1.0, 0.08)
+            last_day = (kill_date or today) - dob
+            for day in range(rng.randint(1, interval_days), last_day.days + 1, interval_days):
+                noise = rng.gauss(1.0, 0.015)
+                pending_weights.append({'pig_id': pig_id, 'date': dob + timedelta(days=day),
+                                        'weight': round(growth_curve_weight(day, rate) * noise, 1)})
+            if len(pending_weights) >= SEED_INSERT_CHUNK:
+                db.session.execute(db.insert(Pig), pigs)
+                counts['pigs'] += len(pigs)
+                pigs = []
+                flush_weights()
+
+        if pigs:
+            db.session.execute(db.insert(Pig), pigs)
+            counts['pigs'] += len(pigs)
+        flush_weights()
+
+    rebuild_weight_summaries()
+    rebuild_rollups(barn_ids)
+    return counts
+
+
+def remove_weights_after(last_weight_id):
+    """Delete weigh-ins a benchmark added (ids above `last_weight_id`) and restore summaries"""
+    touched = [pig_id for (pig_id,) in db.session.query(Weight.pig_id).filter(Weight.id > last_weight_id).distinct()]
+    if touched:
+        with rollups_follow(touched):
+            Weight.query.filter(Weight.id > last_weight_id).delete(synchronize_session=False)
+            rebuild_weight_summaries(touched)
+        bump_barn_versions(pig_ids=touched)
+        db.session.commit()
+        for pig_id in touched:
+            chart_cache.invalidate_pig(pig_id)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def benchmark_scenarios(pig_ids, rng):
+    """(name, method, path, form, samples) request builders for bench-routes.
+
+    `samples` scales the request count: heavy routes run fewer times.
+    """
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    return [
+        ('dashboard', 'GET', lambda: '/dashboard', lambda: None, 1),
+        ('pig_detail', 'GET', lambda: f'/pig/{rng.choice(pig_ids)}', lambda: None, 1),
+        ('barn_statistics', 'GET', lambda: '/charts/barn-statistics', lambda: None, 1),
+        ('weight_comparison', 'POST', lambda: '/charts/weight-comparison',
+         lambda: {'pig_ids': rng.sample(pig_ids, min(5, len(pig_ids))), 'chart_type': 'line'}, 1),
+        ('weight_comparison_chart', 'GET',
+         lambda: '/charts/weight-comparison.png?' + urlencode({'pig_ids': rng.sample(pig_ids, min(5, len(pig_ids)))},
+                                                                doseq=True),
+         lambda: None, 1),
+        ('export_csv', 'GET', lambda: '/export/csv', lambda: None, 0.1),
+        ('weigh_pig', 'POST', lambda: f'/pig/{rng.choice(pig_ids)}/weigh',
+         lambda: {'weight': str(round(rng.uniform(20, 120), 1)), 'date': today}, 1),
+    ]
+
+
+# Run in a fresh interpreter by bench-startup: import, build the app, serve a
+# first page and a first chart, and print how long each step took
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from datetime import date
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get('/login').status_code
+served = time.perf_counter()
+preloaded = 'matplotlib' in sys.modules
+from pigfarm.charts import render_pig_chart
+render_pig_chart('P1', [date(2024, 1, 1)], [30.0])
+charted = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - started) * 1000, 'first_chart_ms': (charted - served) * 1000,
+                  'status': status, 'matplotlib_at_first_request': preloaded}))
+"""
+
+
+def import_time_breakdown(root_path):
+    """Cumulative `python -X importtime` milliseconds for `app` and its heaviest direct imports"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, cwd=root_path)
+    total, direct = None, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        if name.strip() == 'app' and not name.startswith('  '):
+            total = round(int(cumulative) / 1000, 1)
+        elif name.startswith('   ') and not name.startswith('    '):
+            direct[name.strip()] = int(cumulative) / 1000
+    heaviest = sorted(direct.items(), key=lambda item: -item[1])[:8]
+    return total, {name: round(ms, 1) for name, ms in heaviest}
@@ -0,0 +1,234 @@
+"""Chart rendering and the rendered chart cache"""
+
+from flask import Response, request
+from datetime import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+import io
+
+from .extensions import db
+from .models import Pig, Weight, WeightSummary
+from .profiling import profile_span
+from .outliers import counted_weight
+
+
+class ChartCache:
+    """Thread-safe in-memory LRU cache of rendered chart PNGs, capped by total bytes.
+
+    Keys are (chart_type, pig_ids, weight_versions) tuples. Since the
+    versions come from the database, a weigh-in handled by another worker
+    still produces a new key here; invalidate_pig() just frees stale entries
+    early in the worker that handled the write.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return (png, rendered_at) for `key`, or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, png):
+        """Store a rendered chart, evicting least recently used entries over budget"""
+        entry = (png, datetime.utcnow().replace(microsecond=0))
+        if len(png) > self.max_bytes:
+            return entry
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self.entries[key] = entry
+            self.size += len(png)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def invalidate_pig(self, pig_id):
+        """Drop every cached chart that includes `pig_id`"""
+        with self.lock:
+            for key in [key for key in self.entries if pig_id in key[1]]:
+                self.size -= len(self.entries.pop(key)[0])
+
+
+chart_cache = ChartCache(0)  # byte budget set by create_app()
+
+
+def weight_versions(pig_ids):
+    """(created_at, weight data version) of each pig, the version 0 if it has never been weighed.
+
+    A pig deleted and registered again under the same ID starts its data
+    version over; its created_at keeps the two records' charts apart.
+    """
+    versions = {pig_id: (created_at, version or 0) for pig_id, created_at, version in
+                db.session.query(Pig.id, Pig.created_at, WeightSummary.data_version)
+                .outerjoin(WeightSummary, WeightSummary.pig_id == Pig.id).filter(Pig.id.in_(pig_ids))}
+    return tuple(versions.get(pig_id, (None, 0)) for pig_id in pig_ids)
+
+
+def versions_stamp(versions):
+    """Short token for weight_versions(), for chart image URLs"""
+    return hashlib.sha1(repr(versions).encode()).hexdigest()[:12]
+
+
+WEIGHT_SERIES_MAX_PIGS = 100
+
+
+def weight_series(pig_ids):
+    """Load the weight history of several pigs in one query.
+
+    Returns {pig_id: (dates, weights)} with each series in date order; flagged
+    outliers are left out and pigs without weights are absent.
+    """
+    series = {}
+    rows = db.session.query(Weight.pig_id, Weight.date, Weight.weight) \
+        .filter(Weight.pig_id.in_(pig_ids), counted_weight()) \
+        .order_by(Weight.pig_id, Weight.date, Weight.id)
+    for pig_id, date, weight in rows:
+        dates, weights = series.setdefault(pig_id, ([], []))
+        dates.append(date)
+        weights.append(weight)
+    return series
+
+
+def compact_series(pig_id, dates, weights, epoch):
+    """Columnar JSON form of one pig's series: day offsets from `epoch` plus weights"""
+    return {
+        'pig_id': pig_id,
+        'days': [(date - epoch).days for date in dates],
+        'weights': weights
+    }
+
+
+matplotlib_lock = threading.Lock()
+matplotlib_api = {}
+
+
+def load_matplotlib():
+    """Import matplotlib on first use and return (Figure, FigureCanvasAgg).
+
+    matplotlib is most of this module's import time and only chart
+    rendering needs it, so workers, CLI commands and scripts that never
+    draw a chart don't pay for it.
+    """
+    with matplotlib_lock:
+        if not matplotlib_api:
+            import matplotlib
+            matplotlib.use('Agg')
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.path import Path
+
+            # Path deepcopy patch, applied once together with the import
+            def patched_deepcopy(self, memo):
+                return Path(self.vertices.copy(), self.codes.copy() if self.codes is not None else None)
+
+            Path.__deepcopy__ = patched_deepcopy
+            matplotlib_api.update(Figure=Figure, FigureCanvasAgg=FigureCanvasAgg)
+        return matplotlib_api['Figure'], matplotlib_api['FigureCanvasAgg']
+
+
+def figure_png(fig):
+    """Render a Figure to PNG bytes through its own Agg canvas (no pyplot state)"""
+    _, FigureCanvasAgg = load_matplotlib()
+    FigureCanvasAgg(fig)
+    img = io.BytesIO()
+    fig.savefig(img, format='png', dpi=100, bbox_inches='tight')
+    return img.getvalue()
+
+
+def render_pig_chart(pig_id, dates, weight_values):
+    """Render a pig's weight history as a PNG bar chart"""
+    labels = [date.strftime('%Y-%m-%d') for date in dates]
+    
+    Figure, _ = load_matplotlib()
+    fig = Figure(figsize=(10, 6), dpi=100)
+    ax = fig.subplots()
+    bars = ax.bar(range(len(labels)), weight_values, width=0.7, color='#667eea', edgecolor='#764ba2', linewidth=2, alpha=0.8)
+    
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45, ha='right')
+    
+    ax.set_xlabel('Date', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Weight (kg)', fontsize=12, fontweight='bold')
+    ax.set_title(f'Weight Progress for Pig {pig_id}', fontsize=14, fontweight='bold', pad=20)
+    
+    ax.grid(True, alpha=0.2, axis='y', linestyle='--')
+    ax.set_axisbelow(True)
+    
+    for bar, weight in zip(bars, weight_values):
+        ax.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
+                f'{weight}kg', ha='center', va='bottom', fontsize=9, fontweight='bold', color='#2d3748')
+    
+    ax.set_ylim(0, max(weight_values, default=1) * 1.1)
+    
+    fig.tight_layout()
+    return figure_png(fig)
+
+
+def render_comparison_chart(series, selected_pig_ids, chart_type):
+    """Render the weight comparison chart for several pigs as a PNG.
+
+    `series` is the {pig_id: (dates, weights)} mapping from weight_series().
+    """
+    Figure, _ = load_matplotlib()
+    fig = Figure(figsize=(12, 7), dpi=100)
+    ax = fig.subplots()
+    
+    for pig_id in selected_pig_ids:
+        if pig_id not in series:
+            continue
+        dates, weight_values = series[pig_id]
+        labels = [date.strftime('%Y-%m-%d') for date in dates]
+        
+        if chart_type == 'line':
+            ax.plot(labels, weight_values, marker='o', label=f'Pig {pig_id}', linewidth=2)
+        elif chart_type == 'bar':
+            x_pos = range(len(labels))
+            ax.bar([x + len(selected_pig_ids)*0.1 for x in x_pos], weight_values, label=f'Pig {pig_id}', alpha=0.7, width=0.2)
+    
+    ax.set_xlabel('Date', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Weight (kg)', fontsize=12, fontweight='bold')
+    ax.set_title('Weight Comparison Across Pigs', fontsize=14, fontweight='bold', pad=20)
+    ax.legend()
+    ax.grid(True, alpha=0.2, linestyle='--')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+    return figure_png(fig)
+
+
+def cached_chart_response(key, render):
+    """Serve a chart PNG from the cache, rendering it on a miss.
+
+    The ETag is derived from the cache key, so a client holding the current
+    image gets a 304 before anything is rendered or read from the cache.
+    """
+    chart_type, pig_ids, versions = key
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        entry = chart_cache.get(key)
+        if entry is None:
+            with profile_span('chart'):
+                entry = chart_cache.put(key, render())
+        png, rendered_at = entry
+        response = Response(png, mimetype='image/png')
+        response.last_modified = rendered_at
+    
+    response.set_etag(etag)
+    # Image URLs carry the data version, so the browser may keep them; revalidate daily
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    return response
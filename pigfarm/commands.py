@@ -0,0 +1,584 @@
+"""Command line interface: the `flask` commands added by create_app()"""
+
+from flask import current_app, g, has_request_context, request_finished
+from flask.cli import AppGroup
+from sqlalchemy import event
+from datetime import datetime, timedelta
+import random
+import subprocess
+import statistics
+import sys
+import tracemalloc
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import click
+import io
+import os
+import time
+
+from .extensions import db
+from .models import Barn, Pig, User, Weight
+from .queries import FULL_SCAN_ALLOWED_TABLES, full_table_scans
+from .auth import user_cache
+from .conditional import bump_barn_versions
+from .assets import ASSET_DIST_DIR, build_asset_bundles
+from .summaries import rebuild_weight_summaries
+from .outliers import scan_weight_outliers
+from .weigh_ins import record_weigh_ins
+from .archive import archive_slaughtered_pigs
+from .rollups import rebuild_rollups, rollups_follow
+from .charts import load_matplotlib, render_pig_chart
+from .migrations import MIGRATIONS, migrate_database, pending_migrations
+from .benchmarks import (STARTUP_PROBE, benchmark_scenarios, import_time_breakdown, percentile,
+                         remove_weights_after, seed_farm_data)
+
+
+# CLI commands, added to every app's `flask` command by create_app()
+cli = AppGroup('pig-farm')
+
+
+def protected_page_requests():
+    """Yield (role, path, response) for every protected GET page, per role.
+
+    Logs in as the first user of each role and requests pages built from
+    the first barn and pig in the database. Each request runs in a fresh
+    app context so it gets its own `g`, as it would when served, and
+    streamed bodies are read inside it.
+    """
+    barn = Barn.query.first()
+    pig = Pig.query.first()
+    users = [User.query.filter_by(role=role).first() for role in ['ADMIN', 'FARMER', 'HELPER']]
+    paths = ['/dashboard', '/api/pigs', '/api/pigs?status=ALIVE&sort=breed', '/pig/add', '/pig/import',
+             '/weigh-in/bulk', '/charts/weight-comparison', '/charts/barn-statistics', '/export',
+             '/export?format=csv', '/export/csv', '/api/analytics/growth', '/charts/trends',
+             '/api/rollups?period=day', '/jobs', '/barns', '/users']
+    if barn:
+        paths += [f'/barn/{barn.id}/sections', f'/api/pigs?barn_id={barn.id}&status=ALIVE',
+                  f'/api/sync/barns/{barn.id}/roster', f'/api/sync/barns/{barn.id}/roster?since=0']
+    if pig:
+        paths += [f'/pig/{pig.id}', f'/pig/{pig.id}/edit', f'/api/pig/{pig.id}/weights',
+                  f'/pig/{pig.id}/chart.png', f'/api/weights?pig_ids={pig.id}']
+
+    app = current_app._get_current_object()
+    for user in filter(None, users):
+        client = app.test_client()
+        with client.session_transaction() as client_session:
+            client_session.update(user_id=user.id, username=user.username, role=user.role, barn_id=user.barn_id)
+        for path in paths:
+            user_cache.invalidate()
+            with app.app_context():
+                response = client.get(path)
+                response.get_data()
+            yield user.role, path, response
+
+
+@cli.command('check-route-queries')
+@click.option('--max-user-queries', default=1, help='Allowed user-table lookups per request')
+def check_route_queries_command(max_user_queries):
+    """Report SQL statements per protected GET route for one user of each role.
+
+    Exits non-zero if any route looks the user up more than allowed, so it
+    can run in CI against a seeded database.
+    """
+    counts = {}
+
+    def record_counts(sender, response, **extra):
+        counts['sql'] = g.get('sql_query_count', 0)
+        counts['user'] = g.get('user_query_count', 0)
+
+    report = []
+    failed = False
+    with request_finished.connected_to(record_counts, current_app._get_current_object()):
+        for role, path, response in protected_page_requests():
+            ok = counts.get('user', 0) <= max_user_queries
+            failed = failed or not ok
+            report.append({'role': role, 'path': path, 'status': response.status_code,
+                           'statements': counts.get('sql'), 'user_queries': counts.get('user'), 'ok': ok})
+            counts.clear()
+
+    print(json.dumps(report, indent=2))
+    if failed:
+        raise SystemExit(1)
+
+
+@cli.command('check-query-plans')
+@click.option('--role', 'roles', multiple=True, default=['FARMER', 'HELPER'],
+              help='Roles whose requests are checked (admins read whole tables by design)')
+def check_query_plans_command(roles):
+    """EXPLAIN every SELECT the protected pages run and fail on full table scans.
+
+    Run it against a seeded database; pig, weight and summary tables must be
+    reached through an index for barn-scoped users.
+    """
+    statements = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(statement, parameters)
+
+    report = []
+    failed = False
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        for role, path, response in protected_page_requests():
+            if role not in roles:
+                statements.clear()
+                continue
+            with db.engine.connect() as connection:
+                for statement, parameters in statements.items():
+                    scans = [table for table in full_table_scans(connection, statement, parameters)
+                             if table not in FULL_SCAN_ALLOWED_TABLES]
+                    if scans:
+                        failed = True
+                        report.append({'role': role, 'path': path, 'tables': scans,
+                                       'statement': ' '.join(statement.split())})
+            statements.clear()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    print(json.dumps(report, indent=2))
+    if failed:
+        raise SystemExit(1)
+    print('✅ No full table scans')
+
+
+@cli.command('build-assets')
+@click.option('--clean', is_flag=True, help='Delete bundles from earlier builds that the new manifest no longer names')
+def build_assets_command(clean):
+    """Bundle, minify and fingerprint static assets into static/dist with a manifest"""
+    manifest, sizes = build_asset_bundles(current_app.static_folder)
+    for name, filename in sorted(manifest.items()):
+        size = sizes[name]
+        print(f"  {name:<15} -> {filename:<28} {size['source_bytes']:>7} B source, "
+              f"{size['minified_bytes']:>7} B minified, {size['gzip_bytes']:>6} B gzipped")
+    if clean:
+        dist_folder = os.path.join(current_app.static_folder, ASSET_DIST_DIR)
+        keep = set(manifest.values()) | {'manifest.json'}
+        for filename in os.listdir(dist_folder):
+            if filename not in keep:
+                os.remove(os.path.join(dist_folder, filename))
+    print(f"✅ {len(manifest)} bundles written to static/{ASSET_DIST_DIR}")
+
+
+@cli.command('rebuild-weight-summaries')
+def rebuild_weight_summaries_command():
+    """Rebuild every pig's weight summary from the raw weight history"""
+    count = rebuild_weight_summaries()
+    db.session.commit()
+    print(f"✅ Rebuilt weight summaries for {count} pigs")
+
+
+@cli.command('scan-weight-outliers')
+@click.option('--barn-id', type=int, multiple=True, help='Only scan this barn (repeatable)')
+@click.option('--dry-run', is_flag=True, help='Report the changes without saving them')
+def scan_weight_outliers_command(barn_id, dry_run):
+    """Re-check the weigh-in history for entry errors and update the stored flags"""
+    started = time.perf_counter()
+    changes = scan_weight_outliers(list(barn_id) or None)
+    flagged = [change for change in changes if change['flag']]
+    for change in flagged[:20]:
+        print(f"  {change['pig_id']}: weight #{change['id']} flagged ({change['flag']}), "
+              f"expected ~{change['expected_weight']} kg")
+    if len(flagged) > 20:
+        print(f"  ... and {len(flagged) - 20} more")
+
+    if changes and not dry_run:
+        pig_ids = {change['pig_id'] for change in changes}
+        with rollups_follow(pig_ids):
+            db.session.execute(db.update(Weight), [
+                {'id': change['id'], 'flag': change['flag'], 'expected_weight': change['expected_weight']}
+                for change in changes
+            ])
+            rebuild_weight_summaries(pig_ids)
+        bump_barn_versions(pig_ids=pig_ids)
+        db.session.commit()
+    print(f"{'🔎' if dry_run else '✅'} {len(flagged)} weigh-ins flagged, {len(changes) - len(flagged)} cleared "
+          f"in {time.perf_counter() - started:.1f}s" + (' (dry run, nothing saved)' if dry_run else ''))
+
+
+@cli.command('bench-bulk-weigh')
+@click.option('--rows', default=2000, help='Weigh-ins per batch')
+def bench_bulk_weigh_command(rows):
+    """Time a bulk weigh-in batch against temporary pigs, then roll everything back"""
+    barn = Barn(name=f'Benchmark {datetime.utcnow().isoformat()}')
+    db.session.add(barn)
+    db.session.flush()
+    pig_count = max(rows // 4, 1)
+    db.session.execute(db.insert(Pig), [
+        {'id': f'BENCH{n:06d}', 'barn_id': barn.id, 'dob': datetime(2024, 1, 1).date(),
+         'sex': 'Female', 'breed': 'Benchmark', 'status': 'ALIVE'}
+        for n in range(pig_count)
+    ])
+    entries = [{'pig_id': f'BENCH{n % pig_count:06d}', 'weight': str(20 + n % 80), 'date': '2024-06-01'}
+               for n in range(rows)]
+    admin = User(username='benchmark', role='ADMIN')
+
+    started = time.perf_counter()
+    result = record_weigh_ins(admin, entries)
+    db.session.flush()
+    elapsed = time.perf_counter() - started
+    db.session.rollback()
+
+    print(json.dumps({
+        'rows': rows,
+        'inserted': result['inserted'],
+        'errors': len(result['errors']),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1)
+    }, indent=2))
+
+
+@cli.command('archive-pigs')
+@click.option('--days', type=int, default=None, help='Archive pigs slaughtered more than this many days ago (default ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Pigs per transaction (default ARCHIVE_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Only count the pigs and weights that would be archived')
+def archive_pigs_command(days, batch_size, dry_run):
+    """Move long-slaughtered pigs and their weight history into the archive tables"""
+    migrate_database()
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow().date() - timedelta(days=days)
+    started = time.perf_counter()
+
+    if dry_run:
+        due = db.session.query(Pig.id).filter(Pig.status == 'SLAUGHTERED', Pig.kill_date < cutoff)
+        weights = db.session.query(db.func.count(Weight.id)).filter(Weight.pig_id.in_(due.scalar_subquery())).scalar()
+        print(f"🔎 {due.count()} pigs slaughtered before {cutoff} and {weights} weights would be archived")
+        return
+
+    pigs = weights = 0
+    for batch_pigs, batch_weights in archive_slaughtered_pigs(cutoff, batch_size):
+        pigs += batch_pigs
+        weights += batch_weights
+        print(f"  {pigs} pigs, {weights} weights archived")
+    print(f"✅ Archived {pigs} pigs slaughtered before {cutoff} and {weights} weights "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+@cli.command('rebuild-rollups')
+@click.option('--barn-id', type=int, multiple=True, help='Only rebuild this barn (repeatable)')
+def rebuild_rollups_command(barn_id):
+    """Backfill the daily barn/section rollups from the pig and weight history"""
+    migrate_database()
+    started = time.perf_counter()
+    count = rebuild_rollups(list(barn_id) or None)
+    db.session.commit()
+    print(f"✅ Rebuilt {count} rollup rows in {time.perf_counter() - started:.1f}s")
+
+
+@cli.command('bench-charts')
+@click.option('--renders', default=40, help='Charts to render per run')
+@click.option('--threads', default=4, help='Worker threads for the parallel run')
+@click.option('--points', default=20, help='Weigh-ins per pig')
+def bench_charts_command(renders, threads, points):
+    """Compare chart rendering via the pyplot state machine and the Figure API.
+
+    Each renderer runs serially and then across threads. Reports charts per
+    second and how many threaded images differ from their serial rendering
+    (pyplot shares one "current figure" between threads, so it mixes charts).
+    """
+    load_matplotlib()
+    import matplotlib.pyplot as plt
+    
+    start_date = datetime(2024, 1, 1).date()
+    dates = [start_date + timedelta(days=7 * i) for i in range(points)]
+    series = {f'BENCH{n}': (dates, [20.0 + n + 4.5 * i for i in range(points)]) for n in range(4)}
+    pig_ids = list(series)
+    
+    def render_figure(n):
+        pig_id = pig_ids[n % len(pig_ids)]
+        return render_pig_chart(pig_id, *series[pig_id])
+    
+    def render_pyplot(n):
+        pig_id = pig_ids[n % len(pig_ids)]
+        dates, weight_values = series[pig_id]
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.bar(range(len(dates)), weight_values, width=0.7, color='#667eea', edgecolor='#764ba2', linewidth=2, alpha=0.8)
+        ax.set_title(f'Weight Progress for Pig {pig_id}', fontsize=14, fontweight='bold', pad=20)
+        plt.xticks(range(len(dates)), [date.strftime('%Y-%m-%d') for date in dates], rotation=45, ha='right')
+        plt.tight_layout()
+        img = io.BytesIO()
+        plt.savefig(img, format='png', dpi=100, bbox_inches='tight')
+        plt.close(fig)
+        return img.getvalue()
+    
+    results = {}
+    for name, render in (('pyplot', render_pyplot), ('figure_api', render_figure)):
+        render(0)  # warm up font cache
+        
+        started = time.perf_counter()
+        serial = [render(n) for n in range(renders)]
+        serial_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            parallel = list(pool.map(render, range(renders)))
+        parallel_time = time.perf_counter() - started
+        
+        results[name] = {
+            'serial_per_second': round(renders / serial_time, 2),
+            'parallel_per_second': round(renders / parallel_time, 2),
+            'parallel_mismatched_images': sum(a != b for a, b in zip(serial, parallel))
+        }
+    
+    print(json.dumps({'renders': renders, 'threads': threads, **results}, indent=2))
+
+
+@cli.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations and whether each is applied, without running any')
+def migrate_command(status):
+    """Apply pending schema migrations"""
+    if status:
+        pending = {step[0] for step in pending_migrations()}
+        for version, description, _ in MIGRATIONS:
+            print(f"{version}  {'pending' if version in pending else 'applied'}  {description}")
+        return
+    applied = migrate_database()
+    print(f"✅ Applied migrations: {', '.join(applied)}" if applied else "✅ Schema is up to date")
+
+
+@cli.command('seed-data')
+@click.option('--barns', default=10, help='Barns to create')
+@click.option('--sections', default=4, help='Sections per barn')
+@click.option('--pigs', default=5000, help='Pigs in total, spread evenly over the barns')
+@click.option('--interval', default=7, help='Days between weigh-ins')
+@click.option('--max-age', default=240, help='Age in days of the oldest pigs')
+@click.option('--seed', default=1, help='Random seed, so runs are reproducible')
+@click.option('--prefix', default='SYN', help='Prefix for pig IDs, barn names and usernames')
+def seed_data_command(barns, sections, pigs, interval, max_age, seed, prefix):
+    """Fill the database with a synthetic farm for benchmarking.
+
+    For example 100 barns / 50k pigs / ~2M weigh-ins:
+    --barns 100 --pigs 50000 --interval 4 --max-age 300
+    """
+    migrate_database()
+    if Barn.query.filter(Barn.name.like(f'{prefix} Barn %')).first():
+        raise click.ClickException(f'Data with prefix {prefix} already exists; choose another --prefix')
+
+    started = time.perf_counter()
+    counts = seed_farm_data(barns, sections, max(pigs // barns, 1), interval, max_age, random.Random(seed), prefix)
+    db.session.commit()
+    counts['seconds'] = round(time.perf_counter() - started, 1)
+    print(json.dumps(counts, indent=2))
+
+
+@cli.command('bench-routes')
+@click.option('--requests', 'request_count', default=30, help='Timed requests per route (export runs a tenth)')
+@click.option('--role', default='FARMER', type=click.Choice(['ADMIN', 'FARMER', 'HELPER']), help='Role to benchmark as')
+@click.option('--seed', default=1, help='Random seed for choosing pigs')
+@click.option('--output', type=click.Path(dir_okay=False), help='Also write the JSON report to this file')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Earlier report to compare against')
+def bench_routes_command(request_count, role, seed, output, baseline):
+    """Time the main routes through the test client and report JSON.
+
+    Per route: p50/p95 latency, SQL statements per request and the peak
+    Python memory of one traced request. Weigh-ins recorded by the run are
+    deleted again afterwards. Run against a database filled by seed-data.
+    """
+    user = (User.query.filter_by(role=role).join(Pig, Pig.barn_id == User.barn_id).first()
+            if role != 'ADMIN' else User.query.filter_by(role=role).first())
+    if user is None:
+        raise click.ClickException(f'No {role} user' + (' assigned to a barn with pigs' if role != 'ADMIN' else ''))
+    pig_query = db.session.query(Pig.id).filter(Pig.status == 'ALIVE')
+    if role != 'ADMIN':
+        pig_query = pig_query.filter(Pig.barn_id == user.barn_id)
+    pig_ids = [pig_id for (pig_id,) in pig_query.limit(5000)]
+    if not pig_ids:
+        raise click.ClickException('No live pigs to benchmark against; run seed-data first')
+
+    last_weight_id = db.session.query(db.func.max(Weight.id)).scalar() or 0
+    app = current_app._get_current_object()
+    client = app.test_client()
+    with client.session_transaction() as client_session:
+        client_session.update(user_id=user.id, username=user.username, role=user.role, barn_id=user.barn_id)
+
+    statement_count = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statement_count[0] += 1
+
+    def run(method, path, form):
+        statement_count[0] = 0
+        with app.app_context():
+            response = client.open(path, method=method, data=form)
+            response.get_data()
+        if response.status_code >= 400:
+            raise click.ClickException(f'{method} {path} returned {response.status_code}')
+        return statement_count[0]
+
+    rng = random.Random(seed)
+    routes = {}
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        for name, method, path, form, samples in benchmark_scenarios(pig_ids, rng):
+            run(method, path(), form())  # warm-up
+            tracemalloc.start()
+            run(method, path(), form())
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            timings = []
+            queries = []
+            for _ in range(max(int(request_count * samples), 1)):
+                request_path, request_form = path(), form()
+                started = time.perf_counter()
+                queries.append(run(method, request_path, request_form))
+                timings.append((time.perf_counter() - started) * 1000)
+
+            routes[name] = {
+                'requests': len(timings),
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+                'mean_ms': round(sum(timings) / len(timings), 2),
+                'queries_per_request': round(sum(queries) / len(queries), 1),
+                'max_queries': max(queries),
+                'peak_memory_kb': round(peak_memory / 1024, 1)
+            }
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
+        remove_weights_after(last_weight_id)
+
+    try:
+        import resource
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        max_rss_kb = None
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=app.root_path).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    report = {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': commit,
+        'database': {'dialect': db.engine.dialect.name, 'barns': Barn.query.count(),
+                     'pigs': Pig.query.count(), 'weights': Weight.query.count()},
+        'role': role,
+        'max_rss_kb': max_rss_kb,
+        'routes': routes
+    }
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            previous = json.load(baseline_file).get('routes', {})
+        for name, result in routes.items():
+            if name in previous:
+                for metric in ['p50_ms', 'p95_ms']:
+                    if previous[name].get(metric):
+                        result[f'{metric}_change_pct'] = round((result[metric] / previous[name][metric] - 1) * 100, 1)
+                result['queries_change'] = round(result['queries_per_request'] - previous[name]['queries_per_request'], 1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w') as output_file:
+            output_file.write(text)
+
+
+@cli.command('bench-concurrent-weigh')
+@click.option('--writers', default=16, help='Terminals posting weigh-ins at the same time')
+@click.option('--requests', 'request_count', default=25, help='Weigh-ins posted by each writer')
+def bench_concurrent_weigh_command(writers, request_count):
+    """Post weigh-ins from many threads at once and report any that failed.
+
+    Simulates handheld terminals weighing in parallel through weigh_pig and
+    exits non-zero if any request errors (e.g. "database is locked").
+    Weigh-ins recorded by the run are deleted afterwards.
+    """
+    user = User.query.filter_by(role='ADMIN').first()
+    pig_ids = [pig_id for (pig_id,) in db.session.query(Pig.id).filter(Pig.status == 'ALIVE').limit(2000)]
+    if user is None or not pig_ids:
+        raise click.ClickException('Needs an ADMIN user and live pigs; run seed-data first')
+
+    login = {'user_id': user.id, 'username': user.username, 'role': user.role, 'barn_id': user.barn_id}
+    app = current_app._get_current_object()
+    last_weight_id = db.session.query(db.func.max(Weight.id)).scalar() or 0
+    db.session.commit()
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    outcomes = {}
+    errors = []
+    lock = threading.Lock()
+
+    def writer(number):
+        rng = random.Random(number)
+        client = app.test_client()
+        with client.session_transaction() as client_session:
+            client_session.update(login)
+        timings = []
+        for _ in range(request_count):
+            started = time.perf_counter()
+            try:
+                response = client.post(f'/pig/{rng.choice(pig_ids)}/weigh',
+                                       data={'weight': str(round(rng.uniform(20, 120), 1)), 'date': today})
+                outcome = response.status_code
+            except Exception as error:
+                outcome = type(error).__name__
+                with lock:
+                    errors.append(str(getattr(error, 'orig', None) or error).splitlines()[0])
+            timings.append((time.perf_counter() - started) * 1000)
+            with lock:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return timings
+
+    propagate = app.config['PROPAGATE_EXCEPTIONS']
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            timings = [ms for result in pool.map(writer, range(writers)) for ms in result]
+    finally:
+        elapsed = time.perf_counter() - started
+        app.config['PROPAGATE_EXCEPTIONS'] = propagate
+        recorded = Weight.query.filter(Weight.id > last_weight_id).count()
+        remove_weights_after(last_weight_id)
+
+    failed = sum(count for outcome, count in outcomes.items() if outcome != 302)
+    print(json.dumps({
+        'dialect': db.engine.dialect.name,
+        'writers': writers,
+        'requests': writers * request_count,
+        'recorded': recorded,
+        'failed': failed,
+        'outcomes': {str(outcome): count for outcome, count in outcomes.items()},
+        'errors': sorted(set(errors))[:10],
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'writes_per_second': round(writers * request_count / elapsed, 1)
+    }, indent=2))
+    if failed:
+        raise SystemExit(1)
+
+
+@cli.command('bench-startup')
+@click.option('--runs', default=5, help='Fresh interpreters per scenario')
+def bench_startup_command(runs):
+    """Measure cold start: module import time and time to first request and chart.
+
+    Every run is a new Python process, as a freshly spawned worker would be.
+    Compares the default (matplotlib loaded on the first chart) with
+    CHART_PRELOAD=True, which is how the app behaved when it imported
+    matplotlib at the top.
+    """
+    root_path = current_app.root_path
+    report = {'runs': runs, 'python': sys.version.split()[0], 'scenarios': {}}
+    for name, preload in (('lazy_matplotlib', 'False'), ('chart_preload', 'True')):
+        env = dict(os.environ, CHART_PRELOAD=preload)
+        samples = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, '-c', STARTUP_PROBE], capture_output=True, text=True,
+                                    cwd=root_path, env=env)
+            if result.returncode != 0:
+                raise click.ClickException(result.stderr.strip().splitlines()[-1])
+            samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        report['scenarios'][name] = {
+            key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'first_chart_ms')
+        }
+        report['scenarios'][name]['matplotlib_at_first_request'] = samples[0]['matplotlib_at_first_request']
+
+    import_ms, heaviest = import_time_breakdown(root_path)
+    report['importtime'] = {'app_cumulative_ms': import_ms, 'heaviest_imports_ms': heaviest}
+    print(json.dumps(report, indent=2))
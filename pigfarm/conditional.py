@@ -0,0 +1,192 @@
+"""Conditional requests and response compression"""
+
+from flask import Response, current_app, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from functools import lru_cache, wraps
+from datetime import datetime
+import hashlib
+import zlib
+import threading
+import os
+import time
+
+from .extensions import db
+from .models import Barn, Pig
+from .database import IN_CLAUSE_CHUNK, chunked
+from .auth import current_user
+from .assets import asset_manifest
+
+
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/css', 'application/javascript'}
+COMPRESS_LEVEL = 6
+
+
+class BarnVersionCache:
+    """Process-wide TTL cache of barn data versions, keyed by barn id (None: all barns).
+
+    Lets barn_conditional answer a 304 without a query for `ttl` seconds.
+    Commits that bumped a version and barn creation or deletion clear it;
+    other workers' copies can lag by up to `ttl`. A ttl of 0 disables it.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, barn_id):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(barn_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[barn_id]
+                return None
+            return entry[1]
+
+    def put(self, barn_id, versions):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[barn_id] = (time.monotonic() + self.ttl, versions)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+barn_version_cache = BarnVersionCache(0)  # ttl set by create_app()
+
+
+@event.listens_for(OrmSession, 'after_commit')
+def forget_bumped_barn_versions(orm_session):
+    """Clear cached barn versions once a commit that bumped them lands"""
+    if orm_session.info.pop('barn_versions_bumped', False):
+        barn_version_cache.invalidate()
+
+
+@event.listens_for(OrmSession, 'after_rollback')
+def forget_rolled_back_bump(orm_session):
+    orm_session.info.pop('barn_versions_bumped', None)
+
+
+def bump_barn_versions(barn_ids=(), pig_ids=()):
+    """Advance the data version of `barn_ids` and of the barns holding `pig_ids`.
+
+    Runs in the caller's transaction, so the new version commits with the
+    write it describes. Every route that changes what a barn's pages show
+    calls this; the ETags of those pages are built from the versions. The
+    pigs a write changed should be passed as `pig_ids`: they are stamped
+    with their barn's new version, which terminal delta syncs select on.
+    """
+    db.session.info['barn_versions_bumped'] = True
+    barn_ids = {barn_id for barn_id in barn_ids if barn_id is not None}
+    pig_ids = list(dict.fromkeys(pig_ids))
+    for chunk in chunked(pig_ids, IN_CLAUSE_CHUNK):
+        barn_ids.update(barn_id for (barn_id,) in
+                        db.session.query(Pig.barn_id).filter(Pig.id.in_(chunk)).distinct())
+    if barn_ids:
+        db.session.execute(db.update(Barn).where(Barn.id.in_(barn_ids))
+                           .values(data_version=Barn.data_version + 1)
+                           .execution_options(synchronize_session=False))
+    barn_version = db.select(Barn.data_version).where(Barn.id == Pig.barn_id).scalar_subquery()
+    for chunk in chunked(pig_ids, IN_CLAUSE_CHUNK):
+        db.session.execute(db.update(Pig).where(Pig.id.in_(chunk))
+                           .values(sync_version=barn_version)
+                           .execution_options(synchronize_session=False))
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint(root_path):
+    """Stamp of the app's code and templates, so ETags change when a deploy changes the pages"""
+    paths = [os.path.join(root_path, 'app.py')]
+    for top in ('pigfarm', 'templates'):
+        for folder, _, files in os.walk(os.path.join(root_path, top)):
+            paths.extend(os.path.join(folder, name) for name in files if not name.endswith('.pyc'))
+    stamp = hashlib.sha1()
+    for path in sorted(paths):
+        if os.path.exists(path):
+            info = os.stat(path)
+            stamp.update(f'{path}:{info.st_mtime_ns}:{info.st_size}'.encode())
+    return stamp.hexdigest()[:12]
+
+
+def barn_data_etag(user):
+    """Weak ETag for a page built from the barns `user` can see, from their data versions.
+
+    One indexed read of the barn table, or none while BARN_VERSION_CACHE_TTL
+    keeps the versions in memory. It also covers the built asset bundles
+    the page links to, the user and the date, since pages show the user's
+    own controls and ages or projections that move with the calendar.
+    """
+    cache_key = None if user.role == 'ADMIN' else user.barn_id
+    versions = barn_version_cache.get(cache_key)
+    if versions is None:
+        query = db.session.query(Barn.id, Barn.data_version, Barn.created_at).order_by(Barn.id)
+        if user.role != 'ADMIN':
+            query = query.filter(Barn.id == user.barn_id)
+        versions = [tuple(row) for row in query]
+        barn_version_cache.put(cache_key, versions)
+    key = (source_fingerprint(current_app.root_path), sorted(asset_manifest().items()),
+           user.id, user.role, user.barn_id, datetime.utcnow().date().isoformat(), versions)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def barn_conditional(view):
+    """Answer a GET with 304 when the caller's copy is still current, before the view runs.
+
+    Wrap views whose output depends only on the logged-in user and the barns
+    they can see; apply below login_required. Pages with flash messages
+    waiting are always rendered, since the messages are not part of the ETag.
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET' or '_flashes' in session:
+            return view(*args, **kwargs)
+        
+        etag = barn_data_etag(current_user())
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return decorated_function
+
+
+def compress_response(response):
+    """Compress large HTML and JSON bodies with brotli or gzip as configured and accepted"""
+    encodings = [name.strip() for name in current_app.config['RESPONSE_COMPRESSION'].split(',') if name.strip()]
+    if (not encodings or response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < current_app.config['COMPRESS_MIN_BYTES']:
+        return response
+    
+    for encoding in encodings:
+        if not request.accept_encodings[encoding]:
+            continue
+        if encoding == 'br':
+            try:
+                import brotli
+            except ImportError:
+                continue
+            compressed = brotli.compress(body, quality=5)
+        elif encoding == 'gzip':
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+            compressed = compressor.compress(body) + compressor.flush()
+        else:
+            continue
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+    return response
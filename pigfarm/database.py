@@ -0,0 +1,45 @@
+"""Database connections and batching helpers"""
+
+from sqlalchemy import event
+from functools import partial
+import sqlite3
+
+from .extensions import db
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record, busy_timeout_ms, wal):
+    """Tune each new SQLite connection for several concurrent terminals.
+
+    WAL lets pages keep reading while a weigh-in is written, synchronous=NORMAL
+    is durable under WAL at a fraction of the fsyncs, and the busy timeout
+    makes a second writer wait for the lock instead of failing with
+    "database is locked". Listens on one app's engine (see
+    configure_engine), with that app's settings bound in, so it needs no
+    app context and leaves other engines alone.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+    if wal:
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+    cursor.close()
+
+
+def configure_engine(app):
+    """Attach connection setup to `app`'s engine; creating it opens no connection"""
+    with app.app_context():
+        event.listen(db.engine, 'connect', partial(
+            configure_sqlite_connection,
+            busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS'],
+            wal=app.config['SQLITE_WAL']))
+
+
+IN_CLAUSE_CHUNK = 500
+
+
+def chunked(items, size):
+    """Split a list into consecutive slices of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
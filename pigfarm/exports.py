@@ -0,0 +1,241 @@
+"""Data export engine: streamed CSV and Parquet/Feather"""
+
+from datetime import datetime
+import csv
+import heapq
+import zlib
+import io
+
+from .extensions import db
+from .models import ArchivedPig, ArchivedWeight, Barn, Pig, Section, Weight
+from .outliers import WEIGHT_FLAG_REVIEWED
+from .archive import archive_in_range
+
+
+EXPORT_COLUMNS = [
+    ('pig_id', 'Pig ID'),
+    ('barn', 'Barn'),
+    ('section', 'Section'),
+    ('dob', 'DOB'),
+    ('sex', 'Sex'),
+    ('breed', 'Breed'),
+    ('status', 'Status'),
+    ('kill_date', 'Kill Date'),
+    ('weight', 'Weight (kg)'),
+    ('weight_date', 'Weight Date'),
+    ('weight_flag', 'Weight Flag'),
+    ('weight_change', 'Weight Change (kg)'),
+    ('weight_change_pct', 'Weight Change (%)')
+]
+EXPORT_COLUMN_KEYS = [key for key, label in EXPORT_COLUMNS]
+EXPORT_FORMATS = {
+    'csv': 'CSV',
+    'csv.gz': 'CSV (gzip compressed)',
+    'parquet': 'Parquet',
+    'arrow': 'Arrow IPC stream'
+}
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_ROWS = 500
+
+
+def parse_export_options(args):
+    """(format, columns, start_date, end_date) from export query or JSON parameters.
+
+    Raises ValueError with a message for the user on bad input.
+    """
+    export_format = args.get('format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format}')
+
+    columns = args.getlist('columns') if hasattr(args, 'getlist') else args.get('columns')
+    if isinstance(columns, str):
+        columns = [columns]
+    columns = columns or EXPORT_COLUMN_KEYS
+    unknown = [key for key in columns if key not in EXPORT_COLUMN_KEYS]
+    if unknown:
+        raise ValueError(f'Unknown export columns: {", ".join(map(str, unknown))}')
+    columns = [key for key in EXPORT_COLUMN_KEYS if key in columns]
+
+    try:
+        start_date = datetime.strptime(args['start'], '%Y-%m-%d').date() if args.get('start') else None
+        end_date = datetime.strptime(args['end'], '%Y-%m-%d').date() if args.get('end') else None
+    except (TypeError, ValueError):
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    return export_format, columns, start_date, end_date
+
+
+def export_query(pig_model, weight_model, barn_id=None, end_date=None):
+    """Pig/Barn/Section/weight join behind export_records, over the live or the archive tables"""
+    weight_join = weight_model.pig_id == pig_model.id
+    if end_date is not None:
+        weight_join = db.and_(weight_join, weight_model.date <= end_date)
+
+    query = db.session.query(
+        pig_model.id, Barn.name, Section.name, pig_model.dob, pig_model.sex, pig_model.breed,
+        pig_model.status, pig_model.kill_date, weight_model.weight, weight_model.date, weight_model.flag
+    ).join(Barn, Barn.id == pig_model.barn_id) \
+     .outerjoin(Section, Section.id == pig_model.section_id) \
+     .outerjoin(weight_model, weight_join) \
+     .order_by(pig_model.id, weight_model.date, weight_model.id)
+    if barn_id is not None:
+        query = query.filter(pig_model.barn_id == barn_id)
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def export_records(barn_id=None, start_date=None, end_date=None):
+    """Yield one record per weigh-in (or per unweighed pig), oldest weight first.
+
+    Reads a single Pig/Barn/Section/Weight join ordered by pig and date in
+    batches of EXPORT_BATCH_SIZE (a server-side cursor where the database
+    supports one), computing the change from the previous weigh-in on the fly.
+    When the date range reaches back into the archive, the same join over the
+    archive tables is merged in by pig ID. Records are tuples in
+    EXPORT_COLUMNS order holding native values (dates, floats, None for
+    blanks). With a date range only weigh-ins inside it are returned, but
+    their change is still measured against the previous weigh-in. Weigh-ins
+    flagged as outliers are exported with their flag but, as in summaries
+    and charts, have no change and are skipped when measuring the next one.
+    """
+    rows = export_query(Pig, Weight, barn_id, end_date)
+    if archive_in_range(start_date):
+        rows = heapq.merge(export_query(ArchivedPig, ArchivedWeight, barn_id, end_date), rows,
+                           key=lambda row: row[0])
+
+    date_filtered = start_date is not None or end_date is not None
+    current_pig = None
+    previous_weight = None
+    for pig_id, barn_name, section_name, dob, sex, breed, status, kill_date, weight, weight_date, flag in rows:
+        if pig_id != current_pig:
+            current_pig = pig_id
+            previous_weight = None
+
+        pig_columns = (pig_id, barn_name, section_name, dob, sex, breed, status, kill_date)
+
+        if weight is None:
+            if not date_filtered:
+                yield pig_columns + (None, None, None, None, None)
+            continue
+
+        diff = None
+        pct = None
+        if not flag or flag == WEIGHT_FLAG_REVIEWED:
+            if previous_weight is not None and previous_weight > 0:
+                diff = round(weight - previous_weight, 2)
+                pct = round((diff / previous_weight) * 100, 2)
+            previous_weight = weight
+
+        if start_date is not None and weight_date < start_date:
+            continue
+
+        yield pig_columns + (weight, weight_date, flag, diff, pct)
+
+
+def csv_rows(records, columns):
+    """Format export records as CSV values for the selected column keys"""
+    indexes = [EXPORT_COLUMN_KEYS.index(key) for key in columns]
+    weight_index = EXPORT_COLUMN_KEYS.index('weight')
+    for record in records:
+        row = []
+        for index in indexes:
+            value = record[index]
+            if index == weight_index and value is None:
+                value = 'No weights recorded'
+            elif value is None:
+                value = ''
+            elif hasattr(value, 'strftime'):
+                value = value.strftime('%Y-%m-%d')
+            row.append(value)
+        yield row
+
+
+def stream_csv(header, rows):
+    """Encode rows as CSV text, yielding a chunk every EXPORT_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def gzip_stream(chunks):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def arrow_export_schema(columns):
+    """Arrow schema for the selected export columns.
+
+    Barn, section, sex, breed and status are dictionary-encoded so they load
+    as pandas categoricals; dates become date32 and weights float64.
+    """
+    import pyarrow as pa
+
+    category = pa.dictionary(pa.int32(), pa.string())
+    types = {
+        'pig_id': pa.string(),
+        'barn': category,
+        'section': category,
+        'dob': pa.date32(),
+        'sex': category,
+        'breed': category,
+        'status': category,
+        'kill_date': pa.date32(),
+        'weight': pa.float64(),
+        'weight_date': pa.date32(),
+        'weight_flag': category,
+        'weight_change': pa.float64(),
+        'weight_change_pct': pa.float64()
+    }
+    return pa.schema([(key, types[key]) for key in columns])
+
+
+def arrow_record_batches(records, schema):
+    """Group export records into Arrow record batches of EXPORT_BATCH_SIZE rows"""
+    import pyarrow as pa
+
+    indexes = [EXPORT_COLUMN_KEYS.index(name) for name in schema.names]
+
+    def make_batch(values):
+        arrays = []
+        for field, column in zip(schema, values):
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(column, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(column, type=field.type))
+        return pa.record_batch(arrays, schema=schema)
+
+    values = [[] for _ in indexes]
+    for count, record in enumerate(records, 1):
+        for column, index in zip(values, indexes):
+            column.append(record[index])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield make_batch(values)
+            values = [[] for _ in indexes]
+    if values[0]:
+        yield make_batch(values)
+
+
+def write_arrow_export(records, columns, export_format, sink):
+    """Write export records to `sink` as Parquet or an Arrow IPC stream"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_export_schema(columns)
+    if export_format == 'parquet':
+        with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+            for batch in arrow_record_batches(records, schema):
+                writer.write_batch(batch)
+    else:
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for batch in arrow_record_batches(records, schema):
+                writer.write_batch(batch)
@@ -0,0 +1,7 @@
+"""Flask extensions shared by the app's modules"""
+
+from flask_sqlalchemy import SQLAlchemy
+
+
+# Database extension; create_app() binds it to the application
+db = SQLAlchemy()
@@ -0,0 +1,401 @@
+"""Background jobs: exports, printable charts and reports"""
+
+from flask import current_app, url_for
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import csv
+import logging
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+from .extensions import db
+from .models import ArchivedPig, ArchivedWeight, Barn, Job, Pig, User, Weight
+from .archive import archive_in_range
+from .stats import compute_barn_statistics
+from .analytics import growth_analytics
+from .exports import (EXPORT_BATCH_SIZE, EXPORT_COLUMNS, csv_rows, export_records, gzip_stream, parse_export_options,
+                      stream_csv, write_arrow_export)
+from .charts import render_comparison_chart, render_pig_chart, weight_series
+
+
+JOB_TYPES = {}
+JOB_STALE_SECONDS = 300
+JOB_HEARTBEAT_SECONDS = 30
+JOB_PROGRESS_INTERVAL = 0.5
+JOB_LIST_LIMIT = 50
+CHART_JOB_MAX_PIGS = 50
+
+job_logger = logging.getLogger('pig_farm.jobs')
+
+
+def job_type(name, label, prepare):
+    """Register a background job type.
+
+    `prepare(params, user)` validates the submitted parameters and returns
+    what to store, raising ValueError with a message for the user. The
+    decorated `run(params, user, path, progress)` writes its result to
+    `path` and returns (download_name, mimetype).
+    """
+    def register(run):
+        JOB_TYPES[name] = {'label': label, 'prepare': prepare, 'run': run}
+        return run
+    return register
+
+
+def job_limits():
+    """Running jobs allowed per type, parsed from JOB_LIMITS ('export=2,chart=2'); 1 if unlisted"""
+    limits = {}
+    for item in current_app.config['JOB_LIMITS'].split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+def job_artifact_path(job_id):
+    """Where a job's result file lives"""
+    return os.path.join(current_app.config['JOB_DIR'], job_id)
+
+
+class JobProgress:
+    """Progress callback handed to job functions: progress(fraction, message).
+
+    Writes at most every JOB_PROGRESS_INTERVAL seconds, in its own short
+    transaction so a job can report while it streams rows through the
+    session. Failures to record progress are logged and otherwise ignored.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.reported_at = 0.0
+
+    def __call__(self, fraction, message=None):
+        now = time.monotonic()
+        if now - self.reported_at < JOB_PROGRESS_INTERVAL:
+            return
+        self.reported_at = now
+        values = {'progress': min(max(fraction, 0.0), 1.0), 'heartbeat_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:200]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.update(Job).where(Job.id == self.job_id, Job.status == 'RUNNING')
+                                   .values(**values))
+        except db.exc.OperationalError as error:
+            job_logger.warning('Could not record progress of job %s: %s', self.job_id, error.orig)
+
+
+@contextmanager
+def job_heartbeat(job_id):
+    """Refresh a running job's heartbeat every JOB_HEARTBEAT_SECONDS from a side thread.
+
+    Keeps the stale sweep off jobs that are alive but busy in a step that
+    reports no progress. The thread stops when the block exits.
+    """
+    engine = db.engine
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(db.update(Job).where(Job.id == job_id, Job.status == 'RUNNING')
+                                       .values(heartbeat_at=datetime.utcnow()))
+            except db.exc.OperationalError as error:
+                job_logger.warning('Could not record heartbeat of job %s: %s', job_id, error.orig)
+
+    thread = threading.Thread(target=beat, name=f'job-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class JobRunner:
+    """Runs queued jobs on a thread pool of JOB_WORKERS threads per process.
+
+    The job table is the queue, so queued jobs survive restarts and any
+    worker process can pick them up. A job is claimed with a conditional
+    UPDATE (QUEUED -> RUNNING) that also checks the type's limit against
+    the RUNNING rows, so limits hold across processes. A job whose
+    heartbeat stops for JOB_STALE_SECONDS (its process died) is failed;
+    live jobs refresh theirs every JOB_HEARTBEAT_SECONDS.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.active = 0
+
+    def dispatch(self):
+        """Claim and start queued jobs while this process has idle threads; returns how many started"""
+        with self.lock:
+            workers = current_app.config['JOB_WORKERS']
+            if self.active >= workers:
+                return 0
+            limits = job_limits()
+            now = datetime.utcnow()
+            running = db.aliased(Job)
+            claimed = []
+            with db.engine.begin() as connection:
+                connection.execute(
+                    db.update(Job)
+                    .where(Job.status == 'RUNNING', Job.heartbeat_at < now - timedelta(seconds=JOB_STALE_SECONDS))
+                    .values(status='FAILED', message='Interrupted: the worker running it stopped', finished_at=now))
+                queued = connection.execute(
+                    db.select(Job.id, Job.job_type).where(Job.status == 'QUEUED').order_by(Job.created_at).limit(100)
+                ).all()
+                for job_id, name in queued:
+                    if self.active + len(claimed) >= workers:
+                        break
+                    running_count = db.select(db.func.count()).select_from(running) \
+                        .where(running.job_type == name, running.status == 'RUNNING').scalar_subquery()
+                    result = connection.execute(
+                        db.update(Job)
+                        .where(Job.id == job_id, Job.status == 'QUEUED', running_count < limits.get(name, 1))
+                        .values(status='RUNNING', started_at=now, heartbeat_at=now, message='Started'))
+                    if result.rowcount:
+                        claimed.append(job_id)
+
+            if claimed and self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+            app = current_app._get_current_object()
+            for job_id in claimed:
+                self.active += 1
+                self.executor.submit(self.run, app, job_id)
+            return len(claimed)
+
+    def run(self, app, job_id):
+        """Thread entry point: run the job in `app`, then look for more work"""
+        try:
+            with app.app_context():
+                execute_job(job_id)
+        finally:
+            with self.lock:
+                self.active -= 1
+            with app.app_context():
+                self.dispatch()
+
+
+job_runner = JobRunner()
+
+
+def execute_job(job_id):
+    """Run one claimed job and record its outcome and result file.
+
+    The outcome is only recorded while the job is still RUNNING; a job
+    the stale sweep already failed keeps that status and loses its file.
+    """
+    job = db.session.get(Job, job_id)
+    spec = JOB_TYPES.get(job.job_type)
+    path = job_artifact_path(job_id)
+    started = time.perf_counter()
+    try:
+        user = db.session.get(User, job.user_id)
+        if spec is None or user is None:
+            raise ValueError('Unknown job type' if spec is None else 'The user who submitted this job no longer exists')
+        os.makedirs(current_app.config['JOB_DIR'], exist_ok=True)
+        with job_heartbeat(job_id):
+            download_name, mimetype = spec['run'](json.loads(job.params), user, path, JobProgress(job_id))
+        values = {'status': 'DONE', 'progress': 1.0, 'message': 'Finished',
+                  'download_name': download_name, 'mimetype': mimetype}
+    except Exception as error:
+        job_logger.exception('Job %s (%s) failed', job_id, job.job_type)
+        values = {'status': 'FAILED', 'message': (str(error) or error.__class__.__name__)[:200]}
+        if os.path.exists(path):
+            os.remove(path)
+    db.session.rollback()
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        finished = connection.execute(db.update(Job).where(Job.id == job_id, Job.status == 'RUNNING')
+                                      .values(finished_at=now, heartbeat_at=now, **values)).rowcount
+    if not finished:
+        job_logger.warning('Job %s (%s) finished (%s) after being failed as stale; result discarded',
+                           job_id, job.job_type, values['status'])
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    job_logger.info('Job %s (%s) %s in %.1fs', job_id, job.job_type, values['status'], time.perf_counter() - started)
+
+
+def prune_jobs():
+    """Delete finished jobs older than JOB_RETENTION_HOURS, with their files. The caller commits."""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['JOB_RETENTION_HOURS'])
+    expired = [job_id for (job_id,) in db.session.query(Job.id).filter(
+        Job.status.in_(['DONE', 'FAILED']), Job.finished_at < cutoff)]
+    for job_id in expired:
+        if os.path.exists(job_artifact_path(job_id)):
+            os.remove(job_artifact_path(job_id))
+    if expired:
+        Job.query.filter(Job.id.in_(expired)).delete(synchronize_session=False)
+    return len(expired)
+
+
+def submit_job(user, name, params):
+    """Validate and queue a job of type `name`, starting it if a thread is free"""
+    spec = JOB_TYPES.get(name)
+    if spec is None:
+        raise ValueError(f'Unknown job type: {name}')
+    job = Job(id=os.urandom(16).hex(), job_type=name, user_id=user.id,
+              params=json.dumps(spec['prepare'](params, user)), message='Queued')
+    db.session.add(job)
+    prune_jobs()
+    db.session.commit()
+    job_runner.dispatch()
+    return job
+
+
+def job_to_dict(job):
+    """JSON form of a job for the polling API"""
+    def timestamp(value):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+    return {
+        'id': job.id,
+        'type': job.job_type,
+        'label': JOB_TYPES.get(job.job_type, {}).get('label', job.job_type),
+        'status': job.status,
+        'progress': round(job.progress or 0.0, 3),
+        'message': job.message,
+        'created_at': timestamp(job.created_at),
+        'started_at': timestamp(job.started_at),
+        'finished_at': timestamp(job.finished_at),
+        'status_url': url_for('jobs.job_status', job_id=job.id),
+        'download_url': url_for('jobs.download_job', job_id=job.id) if job.status == 'DONE' else None,
+        'download_name': job.download_name
+    }
+
+
+def prepare_export_job(params, user):
+    export_format, columns, start_date, end_date = parse_export_options(params)
+    if export_format in ('parquet', 'arrow'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError('Parquet and Arrow exports require the pyarrow package')
+    return {'format': export_format, 'columns': columns,
+            'start': start_date.isoformat() if start_date else None,
+            'end': end_date.isoformat() if end_date else None}
+
+
+@job_type('export', 'Data export', prepare_export_job)
+def run_export_job(params, user, path, progress):
+    """Write an export file, reporting progress against the number of weigh-ins in scope"""
+    export_format, columns, start_date, end_date = parse_export_options(params)
+    barn_id = None if user.role == 'ADMIN' else user.barn_id
+
+    sources = [(Pig, Weight)] + ([(ArchivedPig, ArchivedWeight)] if archive_in_range(start_date) else [])
+    total = 0
+    for pig_model, weight_model in sources:
+        total_query = db.session.query(db.func.count(weight_model.id)).join(pig_model, pig_model.id == weight_model.pig_id)
+        if barn_id is not None:
+            total_query = total_query.filter(pig_model.barn_id == barn_id)
+        if start_date is not None:
+            total_query = total_query.filter(weight_model.date >= start_date)
+        if end_date is not None:
+            total_query = total_query.filter(weight_model.date <= end_date)
+        total += total_query.scalar() or 0
+    total = max(total, 1)
+
+    def counted(records):
+        for count, record in enumerate(records, 1):
+            if count % EXPORT_BATCH_SIZE == 0:
+                progress(min(count / total, 0.99), f'{count:,} of ~{total:,} rows')
+            yield record
+
+    records = counted(export_records(barn_id, start_date, end_date))
+    filename = f'pig_farm_data_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+    if export_format in ('csv', 'csv.gz'):
+        labels = dict(EXPORT_COLUMNS)
+        chunks = stream_csv([labels[key] for key in columns], csv_rows(records, columns))
+        if export_format == 'csv.gz':
+            with open(path, 'wb') as output:
+                output.writelines(gzip_stream(chunks))
+            return filename, 'application/gzip'
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            output.writelines(chunks)
+        return filename, 'text/csv'
+
+    with open(path, 'wb') as output:
+        write_arrow_export(records, columns, export_format, output)
+    mimetype = 'application/vnd.apache.parquet' if export_format == 'parquet' else 'application/vnd.apache.arrow.stream'
+    return filename, mimetype
+
+
+def prepare_chart_job(params, user):
+    pig_ids = params.get('pig_ids')
+    if isinstance(pig_ids, str):
+        pig_ids = [pig_ids]
+    pig_ids = list(dict.fromkeys(str(pig_id) for pig_id in pig_ids or []))
+    chart_type = params.get('chart_type') or 'history'
+    if chart_type not in ('history', 'line', 'bar'):
+        raise ValueError('chart_type must be history, line or bar')
+    if not pig_ids or len(pig_ids) > CHART_JOB_MAX_PIGS:
+        raise ValueError(f'Choose between 1 and {CHART_JOB_MAX_PIGS} pigs')
+    if chart_type == 'history' and len(pig_ids) != 1:
+        raise ValueError('A weight history chart is for a single pig')
+
+    query = Pig.query.filter(Pig.id.in_(pig_ids))
+    if user.role != 'ADMIN':
+        query = query.filter(Pig.barn_id == user.barn_id)
+    if query.count() != len(pig_ids):
+        raise ValueError('Unknown pig or access denied')
+    return {'pig_ids': pig_ids, 'chart_type': chart_type}
+
+
+@job_type('chart', 'Printable chart', prepare_chart_job)
+def run_chart_job(params, user, path, progress):
+    """Render a pig's weight history or a comparison of several pigs as a PNG"""
+    pig_ids = params['pig_ids']
+    series = weight_series(pig_ids)
+    progress(0.3, 'Rendering chart')
+    if params['chart_type'] == 'history':
+        dates, weight_values = series.get(pig_ids[0], ([], []))
+        png = render_pig_chart(pig_ids[0], dates, weight_values)
+        filename = f'pig_{pig_ids[0]}_weights.png'
+    else:
+        png = render_comparison_chart(series, pig_ids, params['chart_type'])
+        filename = f'weight_comparison_{datetime.now().strftime("%Y%m%d")}.png'
+    with open(path, 'wb') as output:
+        output.write(png)
+    return filename, 'image/png'
+
+
+def prepare_report_job(params, user):
+    return {'include_archive': str(params.get('include_archive') or '').lower() in ('1', 'true', 'on')}
+
+
+@job_type('report', 'Statistics report', prepare_report_job)
+def run_report_job(params, user, path, progress):
+    """Per-barn and per-section statistics with growth figures as CSV, optionally counting archived pigs"""
+    barns = Barn.query.order_by(Barn.name)
+    if user.role != 'ADMIN':
+        barns = barns.filter(Barn.id == user.barn_id)
+    barns = barns.all()
+    progress(0.1, 'Counting pigs and weights')
+    stats = compute_barn_statistics(barns, include_archive=params.get('include_archive', False))
+    progress(0.4, 'Computing growth rates')
+    growth = growth_analytics(None if user.role == 'ADMIN' else [user.barn_id])
+    progress(0.9, 'Writing report')
+
+    def number(value, digits):
+        return '' if value is None else round(value, digits)
+
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(['Barn', 'Section', 'Total Pigs', 'Alive', 'Slaughtered', 'Avg Weight (kg)',
+                         f'Avg Daily Gain (kg, last {growth["window_days"]} days)',
+                         f'At Market Weight ({growth["market_weight"]:.0f} kg)', 'Due Within 14 Days'])
+        for stat in stats:
+            barn_growth = growth['barns'].get(stat['barn'].id, {})
+            writer.writerow([stat['barn'].name, 'All sections', stat['total_pigs'], stat['alive'], stat['slaughtered'],
+                             number(stat['avg_weight'], 1), number(barn_growth.get('avg_trend_adg'), 3),
+                             barn_growth.get('ready', 0), barn_growth.get('due_within_14_days', 0)])
+            for section in stat['sections']:
+                writer.writerow([stat['barn'].name, section['name'], section['total_pigs'], section['alive'],
+                                 section['slaughtered'], number(section['avg_weight'], 1), '', '', ''])
+    return f'farm_statistics_{datetime.now().strftime("%Y%m%d")}.csv', 'text/csv'
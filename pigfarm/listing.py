@@ -0,0 +1,141 @@
+"""Paginated, filtered and sorted pig listing"""
+
+from flask import url_for
+import json
+import base64
+
+from .extensions import db
+from .models import Barn, Pig, Section
+from .queries import profiled_query
+
+
+PIG_PAGE_SIZE = 50
+PIG_PAGE_SIZE_MAX = 200
+
+PIG_SORT_COLUMNS = {
+    'id': lambda: Pig.id,
+    'barn': lambda: Barn.name,
+    'section': lambda: db.func.coalesce(Section.name, ''),
+    'sex': lambda: Pig.sex,
+    'breed': lambda: Pig.breed,
+    'status': lambda: Pig.status
+}
+
+
+def encode_cursor(sort_value, pig_id):
+    """Encode the last row's sort key as an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, pig_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor, raising ValueError if it is malformed.
+
+    Every sort column holds text, so both values must be strings.
+    """
+    try:
+        sort_value, pig_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(sort_value, str) or not isinstance(pig_id, str):
+        raise ValueError('Invalid cursor')
+    return sort_value, pig_id
+
+
+def prefix_match(expression, prefix):
+    """Condition that `expression` starts with `prefix`.
+
+    The range lets an index on `expression` find the candidates (LIKE with
+    a pattern can't use one on every database); LIKE then keeps exactly
+    the prefixed ones.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return db.and_(expression >= prefix, expression < upper, expression.startswith(prefix, autoescape=True))
+
+
+def list_pigs(user, args):
+    """Return one page of pigs visible to `user`, filtered and sorted by `args`.
+
+    Uses keyset pagination: the cursor holds the sort value and pig ID of
+    the last row returned, so each page is an indexed range scan instead of
+    an OFFSET over everything before it. Returns (pigs, next_cursor); raises
+    ValueError for a malformed cursor.
+    """
+    sort = args.get('sort', 'id')
+    if sort not in PIG_SORT_COLUMNS:
+        sort = 'id'
+    descending = args.get('dir') == 'desc'
+    sort_column = PIG_SORT_COLUMNS[sort]()
+
+    try:
+        limit = min(max(int(args.get('limit', PIG_PAGE_SIZE)), 1), PIG_PAGE_SIZE_MAX)
+    except ValueError:
+        limit = PIG_PAGE_SIZE
+
+    query = profiled_query('listing')
+
+    if user.role != 'ADMIN':
+        query = query.filter(Pig.barn_id == user.barn_id)
+    elif args.get('barn_id'):
+        query = query.filter(Pig.barn_id == args.get('barn_id', type=int))
+
+    if args.get('section_id'):
+        query = query.filter(Pig.section_id == args.get('section_id', type=int))
+
+    status = args.get('status', '').upper()
+    if status in ('ALIVE', 'SLAUGHTERED'):
+        query = query.filter(Pig.status == status)
+
+    # Case-insensitive prefix search on ID, breed or section name, each served by a lower() index
+    search = args.get('q', '').strip().lower()
+    if search:
+        query = query.filter(db.or_(
+            prefix_match(db.func.lower(Pig.id), search),
+            prefix_match(db.func.lower(Pig.breed), search),
+            Pig.section_id.in_(db.select(Section.id).where(prefix_match(db.func.lower(Section.name), search)))
+        ))
+
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+    if cursor:
+        last_value, last_id = cursor
+        if descending:
+            query = query.filter(db.or_(sort_column < last_value,
+                                        db.and_(sort_column == last_value, Pig.id < last_id)))
+        else:
+            query = query.filter(db.or_(sort_column > last_value,
+                                        db.and_(sort_column == last_value, Pig.id > last_id)))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), Pig.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Pig.id.asc())
+
+    pigs = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(pigs) > limit:
+        pigs = pigs[:limit]
+        last = pigs[-1]
+        sort_values = {
+            'id': last.id,
+            'barn': last.barn.name,
+            'section': last.section.name if last.section else '',
+            'sex': last.sex,
+            'breed': last.breed,
+            'status': last.status
+        }
+        next_cursor = encode_cursor(sort_values[sort], last.id)
+
+    return pigs, next_cursor
+
+
+def pig_to_dict(pig):
+    """Serialize a pig for the listing API"""
+    return {
+        'id': pig.id,
+        'barn': pig.barn.name,
+        'section': pig.section.name if pig.section else None,
+        'sex': pig.sex,
+        'breed': pig.breed,
+        'status': pig.status,
+        'url': url_for('pigs.pig_detail', pig_id=pig.id)
+    }
@@ -0,0 +1,154 @@
+"""Schema migrations and database initialization"""
+
+from werkzeug.security import generate_password_hash
+from datetime import datetime
+import os
+
+from .extensions import db
+from .models import BarnDailyRollup, Pig, SchemaMigration, User, Weight, WeightSummary
+from .summaries import rebuild_weight_summaries
+from .rollups import rebuild_rollups
+
+
+# Ordered (version, description, upgrade) steps for databases created by an
+# older release. New tables only need a model (create_all adds them); changes
+# to existing tables - columns, indexes, data fixes - need a migration here,
+# with its DDL written out rather than read from the models, so a step does
+# the same thing whatever the models declare later. Steps receive a
+# Connection inside the migration transaction and must be safe to re-run
+# against a schema that already has the change.
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register an upgrade step; versions must be added in increasing order"""
+    def register(upgrade):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f'Migration {version} is out of order')
+        MIGRATIONS.append((version, description, upgrade))
+        return upgrade
+    return register
+
+
+def create_indexes(connection, *statements):
+    """Run CREATE INDEX IF NOT EXISTS statements"""
+    for statement in statements:
+        connection.execute(db.text(statement))
+
+
+def add_columns(connection, table, *columns):
+    """ALTER TABLE `table` ADD COLUMN for each (name, definition) the table is missing.
+
+    NOT NULL columns need a DEFAULT so existing rows get a value.
+    """
+    existing = {column['name'] for column in db.inspect(connection).get_columns(table)}
+    for name, definition in columns:
+        if name not in existing:
+            connection.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {name} {definition}'))
+
+
+@migration('0001', 'Indexes for pig listing, barn filters and weight history')
+def add_hot_path_indexes(connection):
+    create_indexes(
+        connection,
+        'CREATE INDEX IF NOT EXISTS ix_pig_section_id ON pig (section_id)',
+        'CREATE INDEX IF NOT EXISTS ix_pig_breed ON pig (breed)',
+        'CREATE INDEX IF NOT EXISTS ix_pig_status ON pig (status)',
+        'CREATE INDEX IF NOT EXISTS ix_pig_barn_id_status ON pig (barn_id, status)',
+        'CREATE INDEX IF NOT EXISTS ix_weight_pig_id_date ON weight (pig_id, date)',
+        'CREATE INDEX IF NOT EXISTS ix_weight_date ON weight (date)',
+    )
+
+
+@migration('0002', 'Weigh-in outlier flags')
+def add_weight_flags(connection):
+    add_columns(connection, 'weight', ('flag', 'VARCHAR(30)'), ('expected_weight', 'FLOAT'))
+
+
+@migration('0003', 'Barn data versions for conditional requests')
+def add_barn_data_versions(connection):
+    add_columns(connection, 'barn', ('data_version', 'INTEGER DEFAULT 0 NOT NULL'))
+
+
+@migration('0004', 'Pig sync versions for terminal delta sync')
+def add_pig_sync_versions(connection):
+    add_columns(connection, 'pig', ('sync_version', 'INTEGER DEFAULT 0 NOT NULL'))
+    create_indexes(connection,
+                   'CREATE INDEX IF NOT EXISTS ix_pig_barn_id_sync_version ON pig (barn_id, sync_version)')
+
+
+@migration('0005', 'Indexes for pig search and barn-ordered listing')
+def add_pig_search_indexes(connection):
+    create_indexes(
+        connection,
+        'CREATE INDEX IF NOT EXISTS ix_pig_barn_id_id ON pig (barn_id, id)',
+        'CREATE INDEX IF NOT EXISTS ix_pig_lower_id ON pig (lower(id))',
+        'CREATE INDEX IF NOT EXISTS ix_pig_lower_breed ON pig (lower(breed))',
+        'CREATE INDEX IF NOT EXISTS ix_section_lower_name ON section (lower(name))',
+    )
+
+
+def pending_migrations():
+    """MIGRATIONS not yet recorded in schema_migration, in order"""
+    applied = set()
+    if db.inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    return [step for step in MIGRATIONS if step[0] not in applied]
+
+
+def migrate_database():
+    """Bring the schema up to date and return the versions applied.
+
+    A brand new database gets the current schema from create_all and every
+    migration is only recorded. An existing one gets missing tables from
+    create_all, then each pending migration runs in its own transaction.
+    """
+    fresh = not db.inspect(db.engine).has_table(Pig.__tablename__)
+    db.create_all()
+
+    applied = []
+    for version, description, upgrade in pending_migrations():
+        with db.engine.begin() as connection:
+            if not fresh:
+                upgrade(connection)
+            connection.execute(db.insert(SchemaMigration),
+                               {'version': version, 'description': description, 'applied_at': datetime.utcnow()})
+        applied.append(version)
+    return applied
+
+
+def init_db(app):
+    """Initialize database and create default admin user"""
+    with app.app_context():
+        applied = migrate_database()
+        if applied:
+            print(f"✅ Schema migrations: {', '.join(applied)}")
+        
+        if not WeightSummary.query.first() and Weight.query.first():
+            count = rebuild_weight_summaries()
+            db.session.commit()
+            print(f"✅ Weight summaries built for {count} pigs")
+        
+        if not BarnDailyRollup.query.first() and Pig.query.first():
+            count = rebuild_rollups()
+            db.session.commit()
+            print(f"✅ Daily rollups built ({count} rows)")
+        
+        admin_username = os.getenv('ADMIN_USERNAME', 'admin')
+        admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
+        
+        if not User.query.filter_by(username=admin_username).first():
+            admin = User(
+                username=admin_username,
+                password=generate_password_hash(admin_password),
+                role='ADMIN'
+            )
+            db.session.add(admin)
+            db.session.commit()
+            print("✅ Database created!")
+            print("✅ Default admin user created:")
+            print(f"   Username: {admin_username}")
+            print(f"   Password: {admin_password}")
+            print("   ⚠️  CHANGE THE PASSWORD IMMEDIATELY!")
+        else:
+            print("✅ Database already exists")
@@ -0,0 +1,196 @@
+"""Database models"""
+
+from datetime import datetime
+
+from .extensions import db
+
+
+class User(db.Model):
+    """User model for authentication"""
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), default='HELPER')  # ADMIN, FARMER, HELPER
+    barn_id = db.Column(db.Integer, db.ForeignKey('barn.id'), nullable=True)
+    barn = db.relationship('Barn', backref='users')
+
+
+class Barn(db.Model):
+    """Barn model - separate barns on the farm"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    location = db.Column(db.String(200))
+    capacity = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # bumped by every write to the barn's data
+    sections = db.relationship('Section', backref='barn', lazy=True, cascade='all, delete-orphan')
+    pigs = db.relationship('Pig', backref='barn', lazy=True, cascade='all, delete-orphan')
+
+
+class Section(db.Model):
+    """Section model - sections within barns"""
+    id = db.Column(db.Integer, primary_key=True)
+    barn_id = db.Column(db.Integer, db.ForeignKey('barn.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    capacity = db.Column(db.Integer)
+    pigs = db.relationship('Pig', backref='section', lazy=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('barn_id', 'name', name='_barn_section_uc'),
+        # Case-insensitive prefix search on section names (see list_pigs)
+        db.Index('ix_section_lower_name', db.func.lower(db.text('name'))),
+    )
+
+
+class Pig(db.Model):
+    """Pig model - main table for pig information"""
+    id = db.Column(db.String(50), primary_key=True)
+    barn_id = db.Column(db.Integer, db.ForeignKey('barn.id'), nullable=False)
+    section_id = db.Column(db.Integer, db.ForeignKey('section.id'), nullable=True, index=True)
+    dob = db.Column(db.Date, nullable=False)
+    sex = db.Column(db.String(10), nullable=False)
+    breed = db.Column(db.String(50), nullable=False, index=True)
+    kill_date = db.Column(db.Date, nullable=True)
+    status = db.Column(db.String(20), default='ALIVE', index=True)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sync_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # barn data_version of the pig's last change
+    weights = db.relationship('Weight', backref='pig', lazy=True, cascade='all, delete-orphan')
+    summary = db.relationship('WeightSummary', backref='pig', uselist=False, cascade='all, delete-orphan')
+    
+    # The first also serves barn_id-only lookups as its leading column, the second terminal delta
+    # syncs; the rest the pig listing's barn-ordered pages and case-insensitive prefix search
+    __table_args__ = (
+        db.Index('ix_pig_barn_id_status', 'barn_id', 'status'),
+        db.Index('ix_pig_barn_id_sync_version', 'barn_id', 'sync_version'),
+        db.Index('ix_pig_barn_id_id', 'barn_id', 'id'),
+        db.Index('ix_pig_lower_id', db.func.lower(db.text('id'))),
+        db.Index('ix_pig_lower_breed', db.func.lower(db.text('breed'))),
+    )
+
+
+class Weight(db.Model):
+    """Weight model - tracks pig weights over time"""
+    id = db.Column(db.Integer, primary_key=True)
+    pig_id = db.Column(db.String(50), db.ForeignKey('pig.id'), nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    flag = db.Column(db.String(30))  # None, an outlier reason (excluded from stats) or 'reviewed'
+    expected_weight = db.Column(db.Float)
+    
+    __table_args__ = (
+        db.Index('ix_weight_pig_id_date', 'pig_id', 'date'),
+        db.Index('ix_weight_date', 'date'),
+    )
+
+
+class WeightSummary(db.Model):
+    """WeightSummary model - materialized per-pig weight figures, kept in sync on write"""
+    pig_id = db.Column(db.String(50), db.ForeignKey('pig.id'), primary_key=True)
+    weight_count = db.Column(db.Integer, nullable=False, default=0)
+    first_weight = db.Column(db.Float)
+    first_weight_date = db.Column(db.Date)
+    latest_weight = db.Column(db.Float)
+    latest_weight_date = db.Column(db.Date)
+    avg_daily_gain = db.Column(db.Float)
+    data_version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every weight change
+
+
+class BarnDailyRollup(db.Model):
+    """BarnDailyRollup model - per barn/section day-by-day changes in head count and live weight.
+
+    Running totals over `day` give the figures on any date (see rollup_series).
+    """
+    barn_id = db.Column(db.Integer, db.ForeignKey('barn.id'), primary_key=True)
+    section_id = db.Column(db.Integer, primary_key=True)  # 0 = no section
+    day = db.Column(db.Date, primary_key=True)
+    head_change = db.Column(db.Integer, nullable=False, default=0)
+    weighed_change = db.Column(db.Integer, nullable=False, default=0)
+    weight_change = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class PigSectionMove(db.Model):
+    """PigSectionMove model - a pig's move between sections of its barn, kept for the daily rollups.
+
+    A pig counts in a section from the day it moved there, so its earlier
+    history stays with the section it was in. Rows outlive archiving.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    barn_id = db.Column(db.Integer, nullable=False, index=True)
+    pig_id = db.Column(db.String(50), nullable=False, index=True)  # live or archived pig
+    day = db.Column(db.Date, nullable=False)
+    from_section_id = db.Column(db.Integer)  # None = no section
+    to_section_id = db.Column(db.Integer)
+
+
+class Job(db.Model):
+    """Job model - queued background work (exports, charts, reports) and its downloadable result"""
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column(db.String(30), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='QUEUED', index=True)  # QUEUED, RUNNING, DONE, FAILED
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(200))
+    download_name = db.Column(db.String(200))
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class ArchivedPig(db.Model):
+    """ArchivedPig model - pigs slaughtered longer ago than ARCHIVE_AFTER_DAYS, moved out of the pig table"""
+    id = db.Column(db.String(50), primary_key=True)
+    barn_id = db.Column(db.Integer, nullable=False, index=True)
+    section_id = db.Column(db.Integer)
+    dob = db.Column(db.Date, nullable=False)
+    sex = db.Column(db.String(10), nullable=False)
+    breed = db.Column(db.String(50), nullable=False)
+    kill_date = db.Column(db.Date, index=True)
+    status = db.Column(db.String(20), nullable=False, default='SLAUGHTERED')
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    latest_weight = db.Column(db.Float)  # latest counted weight, from the pig's summary when archived
+    latest_weight_date = db.Column(db.Date)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ArchivedWeight(db.Model):
+    """ArchivedWeight model - weigh-ins of archived pigs, keeping their original ids"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    pig_id = db.Column(db.String(50), db.ForeignKey('archived_pig.id'), nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    flag = db.Column(db.String(30))
+    expected_weight = db.Column(db.Float)
+    
+    __table_args__ = (db.Index('ix_archived_weight_pig_id_date', 'pig_id', 'date'),)
+
+
+class SyncOperation(db.Model):
+    """SyncOperation model - terminal operations already applied, by client-generated ID, so retried uploads apply once"""
+    client_id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # weigh, slaughter, move
+    pig_id = db.Column(db.String(50), nullable=False)
+    result = db.Column(db.Text, nullable=False, default='{}')  # JSON result sent back to the terminal
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class SyncTombstone(db.Model):
+    """SyncTombstone model - pigs deleted from a barn, so delta syncs can tell terminals to drop them"""
+    id = db.Column(db.Integer, primary_key=True)
+    barn_id = db.Column(db.Integer, nullable=False)
+    pig_id = db.Column(db.String(50), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # barn data_version of the deletion
+    
+    __table_args__ = (db.Index('ix_sync_tombstone_barn_id_version', 'barn_id', 'version'),)
+
+
+class SchemaMigration(db.Model):
+    """SchemaMigration model - versions of MIGRATIONS already applied to this database"""
+    version = db.Column(db.String(20), primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
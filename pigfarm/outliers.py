@@ -0,0 +1,246 @@
+"""Weigh-in outlier detection"""
+
+from flask import current_app
+from datetime import timedelta, date as date_type
+import numpy as np
+
+from .extensions import db
+from .models import Pig, Weight
+from .database import IN_CLAUSE_CHUNK, chunked
+
+
+WEIGHT_FLAG_REVIEWED = 'reviewed'
+OUTLIER_RANGE_KG = (0.5, 450.0)
+OUTLIER_MAX_DAILY_LOSS_KG = 1.5
+OUTLIER_TOLERANCE_KG = 3.0
+OUTLIER_TOLERANCE_SHARE = 0.04  # scale noise and gut fill grow with the pig
+OUTLIER_TYPICAL_GAIN_KG = 0.8
+COHORT_AGE_BAND_DAYS = 14
+COHORT_MIN_SIZE = 8
+OUTLIER_REASONS = ((1, 'range'), (2, 'trajectory'), (4, 'cohort'))
+OUTLIER_SCAN_BATCH_SIZE = 50000  # weigh-in rows fetched per round trip
+
+
+def counted_weight(model=None):
+    """Filter for weigh-ins (of `model`, Weight by default) that count towards summaries, statistics and charts"""
+    model = model or Weight
+    return db.or_(model.flag.is_(None), model.flag == WEIGHT_FLAG_REVIEWED)
+
+
+def outlier_label(reasons):
+    """Flag text such as 'trajectory+cohort' for a reason bitmask, None when clean"""
+    return '+'.join(label for bit, label in OUTLIER_REASONS if reasons & bit) or None
+
+
+def cohort_keys(barn_ids, breed_codes, dob_days, days):
+    """Integer cohort per weigh-in (barn, breed, age band); -1 before birth"""
+    band = (days - dob_days) // COHORT_AGE_BAND_DAYS
+    keys = (barn_ids.astype(np.int64) << 40) | (breed_codes.astype(np.int64) << 20) | band
+    return np.where(band >= 0, keys, -1)
+
+
+def grouped_median(groups, values, sizes):
+    """Median of `values` per group code 0..len(sizes)-1; NaN for empty groups"""
+    ordered = values[np.lexsort((values, groups))]
+    starts = np.cumsum(sizes) - sizes
+    low = starts + (sizes - 1) // 2
+    high = np.minimum(starts + sizes // 2, len(ordered) - 1)
+    return np.where(sizes > 0, (ordered[low] + ordered[high]) / 2, np.nan)
+
+
+def detect_weight_outliers(pig_index, days, weights, keys, max_gain=None, cohort_z=None):
+    """Score weigh-ins against their pig's own series and against their cohort.
+
+    Arrays hold one weigh-in per element, sorted by pig, then day. Each test
+    is a few vectorized passes however many rows there are:
+    - range: outside OUTLIER_RANGE_KG
+    - trajectory: the steps from the previous and to the next weigh-in are
+      both implausible and point opposite ways (a lone spike or dip). A step
+      is implausible when it gains more than `max_gain` kg/day (or loses more
+      than OUTLIER_MAX_DAILY_LOSS_KG) beyond a tolerance of
+      OUTLIER_TOLERANCE_KG plus OUTLIER_TOLERANCE_SHARE of the weight. A pig's
+      first and last weigh-in have a single step, which is enough unless the
+      neighbour is itself a spike.
+    - cohort: more than `cohort_z` robust standard deviations (1.4826 x MAD)
+      from the median of its cohort (`keys`, see cohort_keys) when the
+      cohort holds at least COHORT_MIN_SIZE weigh-ins. Only weigh-ins
+      without a plausible step to a neighbour are judged this way, so a pig
+      that is consistently small for its age is not flagged.
+    Returns (reason bitmasks, expected weights): expected is interpolated
+    from the neighbouring weigh-ins, or the cohort median for a lone weigh-in.
+    """
+    max_gain = max_gain or current_app.config['OUTLIER_MAX_DAILY_GAIN_KG']
+    cohort_z = cohort_z or current_app.config['OUTLIER_COHORT_Z']
+    count = len(weights)
+    reasons = np.zeros(count, dtype=np.int64)
+    if not count:
+        return reasons, np.zeros(0)
+
+    low, high = OUTLIER_RANGE_KG
+    reasons[(weights < low) | (weights > high)] |= 1
+
+    none = np.zeros(1, dtype=bool)
+    same = pig_index[1:] == pig_index[:-1]
+    gap = np.maximum(days[1:] - days[:-1], 1)
+    step = weights[1:] - weights[:-1]
+    tolerance = OUTLIER_TOLERANCE_KG + OUTLIER_TOLERANCE_SHARE * np.minimum(weights[1:], weights[:-1])
+    implausible = same & ((step > max_gain * gap + tolerance) |
+                          (step < -OUTLIER_MAX_DAILY_LOSS_KG * gap - tolerance))
+    has_prev, has_next = np.concatenate((none, same)), np.concatenate((same, none))
+    bad_prev, bad_next = np.concatenate((none, implausible)), np.concatenate((implausible, none))
+    rising_prev, rising_next = np.concatenate((none, step > 0)), np.concatenate((step > 0, none))
+    spike = bad_prev & bad_next & (rising_prev != rising_next)
+    spike_before, spike_after = np.concatenate((none, spike[:-1])), np.concatenate((spike[1:], none))
+    reasons[spike | (bad_prev & ~has_next & ~spike_before) | (bad_next & ~has_prev & ~spike_after)] |= 2
+
+    # Expected weight from the neighbours: interpolated between both, or one
+    # extended at a typical gain
+    prev_weight = np.concatenate(([np.nan], weights[:-1]))
+    next_weight = np.concatenate((weights[1:], [np.nan]))
+    prev_day = np.concatenate((days[:1], days[:-1]))
+    next_day = np.concatenate((days[1:], days[-1:]))
+    span = np.maximum(next_day - prev_day, 1)
+    expected = np.where(
+        has_prev & has_next, prev_weight + (next_weight - prev_weight) * (days - prev_day) / span,
+        np.where(has_prev, prev_weight + OUTLIER_TYPICAL_GAIN_KG * (days - prev_day),
+                 np.where(has_next, next_weight - OUTLIER_TYPICAL_GAIN_KG * (next_day - days), np.nan)))
+
+    in_cohort = keys >= 0
+    if in_cohort.any():
+        cohort_ids, groups = np.unique(keys[in_cohort], return_inverse=True)
+        values = weights[in_cohort]
+        sizes = np.bincount(groups, minlength=len(cohort_ids))
+        median = grouped_median(groups, values, sizes)
+        deviation = np.abs(values - median[groups])
+        sigma = np.maximum(1.4826 * grouped_median(groups, deviation, sizes), np.maximum(0.02 * median, 0.5))
+        unsupported = ~((has_prev & ~bad_prev) | (has_next & ~bad_next))[in_cohort]
+        outlying = unsupported & (sizes[groups] >= COHORT_MIN_SIZE) & (deviation > cohort_z * sigma[groups])
+        reasons[np.flatnonzero(in_cohort)[outlying]] |= 4
+        lone = in_cohort & np.isnan(expected)
+        expected[lone] = median[groups[lone[in_cohort]]]
+
+    return reasons, np.round(expected, 1)
+
+
+def check_new_weigh_ins(rows):
+    """Flag implausible weights in a batch of weigh-ins before it is inserted.
+
+    `rows` are {'pig_id', 'weight', 'date'} dicts for existing pigs; each
+    gains 'flag' and 'expected_weight' keys. The context is each pig's
+    counted history plus the counted weigh-ins of pigs in the same barn and
+    breed within an age band of the batch, so the cost follows the batch
+    size rather than the farm's.
+    """
+    if not rows:
+        return rows
+
+    pigs = {}
+    history = []
+    for chunk in chunked(list(dict.fromkeys(row['pig_id'] for row in rows)), IN_CLAUSE_CHUNK):
+        pigs.update((pig_id, (barn_id, breed, dob)) for pig_id, barn_id, breed, dob in
+                    db.session.query(Pig.id, Pig.barn_id, Pig.breed, Pig.dob).filter(Pig.id.in_(chunk)))
+        history.extend(db.session.query(Weight.pig_id, Weight.date, Weight.weight)
+                       .filter(Weight.pig_id.in_(chunk), counted_weight()))
+
+    # Cohort neighbours: per barn and breed, the birth and weigh dates the batch reaches
+    reach = {}
+    for row in rows:
+        barn_id, breed, dob = pigs[row['pig_id']]
+        low_dob, high_dob, low_date, high_date = reach.get((barn_id, breed), (dob, dob, row['date'], row['date']))
+        reach[(barn_id, breed)] = (min(low_dob, dob), max(high_dob, dob),
+                                   min(low_date, row['date']), max(high_date, row['date']))
+    band = timedelta(days=COHORT_AGE_BAND_DAYS)
+    neighbours = []
+    for (barn_id, breed), (low_dob, high_dob, low_date, high_date) in reach.items():
+        neighbours.extend(
+            (pig_id, barn_id, breed, dob, date, weight) for pig_id, dob, date, weight in
+            db.session.query(Weight.pig_id, Pig.dob, Weight.date, Weight.weight)
+            .join(Pig, Pig.id == Weight.pig_id)
+            .filter(Pig.barn_id == barn_id, Pig.breed == breed,
+                    Pig.dob.between(low_dob - band, high_dob + band),
+                    Weight.date.between(low_date - band, high_date + band), counted_weight())
+            if pig_id not in pigs)
+
+    pig_codes, breed_codes, columns = {}, {}, []
+    def add(pig_id, barn_id, breed, dob, date, weight):
+        columns.append((pig_codes.setdefault(pig_id, len(pig_codes)), barn_id,
+                        breed_codes.setdefault(breed, len(breed_codes)), dob.toordinal(), date.toordinal(), weight))
+    for pig_id, date, weight in history:
+        add(pig_id, *pigs[pig_id], date, weight)
+    for neighbour in neighbours:
+        add(*neighbour)
+    first_new = len(columns)
+    for row in rows:
+        add(row['pig_id'], *pigs[row['pig_id']], row['date'], row['weight'])
+
+    pig_index, barn_ids, breeds, dob_days, days, weights = (np.array(column) for column in zip(*columns))
+    # New rows sort after existing weigh-ins on the same day, as they will be stored
+    order = np.lexsort((np.arange(len(columns)), days, pig_index))
+    reasons, expected = detect_weight_outliers(
+        pig_index[order], days[order], weights[order].astype(float),
+        cohort_keys(barn_ids, breeds, dob_days, days)[order])
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    for offset, row in enumerate(rows):
+        at = position[first_new + offset]
+        row['flag'] = outlier_label(int(reasons[at]))
+        row['expected_weight'] = float(expected[at]) if row['flag'] and not np.isnan(expected[at]) else None
+    return rows
+
+
+def scan_weight_outliers(barn_ids=None):
+    """Re-score the stored weigh-in history and list the flags that change.
+
+    Every weigh-in is streamed into arrays (as in growth_analytics) and
+    scored by one detect_weight_outliers call, including already flagged
+    ones, so a spike keeps its flag and a jump later weigh-ins confirm loses
+    it. Weigh-ins marked reviewed are left alone. Returns
+    [{'id', 'pig_id', 'flag', 'expected_weight'}] for the rows to update.
+    """
+    pig_query = db.session.query(Pig.id, Pig.barn_id, Pig.breed, Pig.dob)
+    weight_query = db.session.query(Weight.id, Weight.pig_id, Weight.date, Weight.weight, Weight.flag)
+    if barn_ids is not None:
+        pig_query = pig_query.filter(Pig.barn_id.in_(barn_ids))
+        weight_query = weight_query.join(Pig, Pig.id == Weight.pig_id).filter(Pig.barn_id.in_(barn_ids))
+
+    pig_rows = pig_query.all()
+    if not pig_rows:
+        return []
+    pig_ids, pig_barns, pig_breeds, pig_dobs = zip(*pig_rows)
+    pig_id_array = np.array(pig_ids)
+    pig_order = np.argsort(pig_id_array)
+    sorted_pig_ids = pig_id_array[pig_order]
+    breed_codes = np.unique(np.array(pig_breeds), return_inverse=True)[1]
+    pig_barns = np.array(pig_barns, dtype=np.int64)
+    dob_days = np.fromiter(map(date_type.toordinal, pig_dobs), np.int64, len(pig_dobs))
+
+    id_chunks, index_chunks, day_chunks, weight_chunks, flag_chunks = [], [], [], [], []
+    connection = db.session.connection()
+    result_rows = connection.execute(weight_query.statement.execution_options(yield_per=OUTLIER_SCAN_BATCH_SIZE))
+    for partition in result_rows.partitions():
+        ids, pig_id_values, dates, values, flags = zip(*partition)
+        id_chunks.append(np.array(ids, dtype=np.int64))
+        index_chunks.append(pig_order[np.searchsorted(sorted_pig_ids, np.array(pig_id_values))])
+        day_chunks.append(np.fromiter(map(date_type.toordinal, dates), np.int64, len(dates)))
+        weight_chunks.append(np.array(values, dtype=float))
+        flag_chunks.append(np.array(flags, dtype=object))
+    if not id_chunks:
+        return []
+
+    weight_ids, pig_index, days, weights, flags = (np.concatenate(chunks) for chunks in
+                                                   (id_chunks, index_chunks, day_chunks, weight_chunks, flag_chunks))
+    order = np.lexsort((weight_ids, days, pig_index))
+    weight_ids, pig_index, days, weights, flags = (column[order] for column in (weight_ids, pig_index, days, weights, flags))
+    reasons, expected = detect_weight_outliers(
+        pig_index, days, weights, cohort_keys(pig_barns[pig_index], breed_codes[pig_index], dob_days[pig_index], days))
+
+    labels = np.array([outlier_label(mask) for mask in range(1 << len(OUTLIER_REASONS))], dtype=object)
+    new_flags = labels[reasons]
+    changed = np.flatnonzero((flags != new_flags) & (flags != WEIGHT_FLAG_REVIEWED))
+    return [{
+        'id': int(weight_ids[position]),
+        'pig_id': pig_ids[pig_index[position]],
+        'flag': new_flags[position],
+        'expected_weight': None if new_flags[position] is None or np.isnan(expected[position])
+                           else float(expected[position])
+    } for position in changed]
@@ -0,0 +1,179 @@
+"""Request profiling: timing breakdowns, sampled cProfile dumps and latency metrics"""
+
+from flask import current_app, request, session, g, has_request_context
+from contextlib import contextmanager
+from datetime import datetime
+import random
+import cProfile
+import logging
+import json
+import threading
+import os
+import time
+
+
+# Upper bounds (seconds) of the request duration histogram on /metrics
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# One JSON line per request; attach handlers here or via logging config to ship them
+profile_logger = logging.getLogger('pig_farm.requests')
+
+
+def configure_profile_logger():
+    """Print request log lines to stderr unless logging config already handles them"""
+    if profile_logger.handlers:
+        return
+    profile_handler = logging.StreamHandler()
+    profile_handler.setFormatter(logging.Formatter('%(message)s'))
+    profile_logger.addHandler(profile_handler)
+    profile_logger.setLevel(logging.INFO)
+    profile_logger.propagate = False
+
+
+@contextmanager
+def profile_span(name):
+    """Add the time spent in the block to the current request's `name` timer"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and 'profile_spans' in g:
+            g.profile_spans[name] = g.profile_spans.get(name, 0.0) + time.perf_counter() - started
+
+
+class RequestMetrics:
+    """Per-process request counters and timings, rendered as Prometheus text.
+
+    Each worker process keeps its own figures; scrape every worker (or run
+    one) for farm-wide numbers.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._requests = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, seconds, sql_count, sql_seconds, spans):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            route = self._routes.setdefault(endpoint, {
+                'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0,
+                'sql_statements': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0, 'chart_seconds': 0.0
+            })
+            route['count'] += 1
+            route['sum'] += seconds
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    route['buckets'][position] += 1
+            route['sql_statements'] += sql_count
+            route['sql_seconds'] += sql_seconds
+            route['template_seconds'] += spans.get('template', 0.0)
+            route['chart_seconds'] += spans.get('chart', 0.0)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            requests = dict(self._requests)
+            routes = {endpoint: dict(route, buckets=list(route['buckets'])) for endpoint, route in self._routes.items()}
+
+        lines = ['# HELP pigfarm_requests_total Requests handled, by endpoint, method and status.',
+                 '# TYPE pigfarm_requests_total counter']
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'pigfarm_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+        lines += ['# HELP pigfarm_request_duration_seconds Time to build each response (excludes streamed bodies).',
+                  '# TYPE pigfarm_request_duration_seconds histogram']
+        for endpoint, route in sorted(routes.items()):
+            for bound, count in zip(self.buckets, route['buckets']):
+                lines.append(f'pigfarm_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'pigfarm_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {route["count"]}')
+            lines.append(f'pigfarm_request_duration_seconds_sum{{endpoint="{endpoint}"}} {route["sum"]:.6f}')
+            lines.append(f'pigfarm_request_duration_seconds_count{{endpoint="{endpoint}"}} {route["count"]}')
+
+        for metric, key, help_text in [
+            ('pigfarm_sql_statements_total', 'sql_statements', 'SQL statements executed.'),
+            ('pigfarm_sql_seconds_total', 'sql_seconds', 'Time spent executing SQL.'),
+            ('pigfarm_template_seconds_total', 'template_seconds', 'Time spent rendering Jinja templates.'),
+            ('pigfarm_chart_seconds_total', 'chart_seconds', 'Time spent rendering matplotlib charts.')
+        ]:
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            for endpoint, route in sorted(routes.items()):
+                value = route[key]
+                lines.append(f'{metric}{{endpoint="{endpoint}"}} {value:.6f}' if isinstance(value, float)
+                             else f'{metric}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics(REQUEST_DURATION_BUCKETS)
+
+
+def start_template_timer(sender, template, context, **extra):
+    if current_app.config['REQUEST_PROFILING']:
+        g.template_started_at = time.perf_counter()
+
+
+def stop_template_timer(sender, template, context, **extra):
+    started = g.pop('template_started_at', None)
+    if started is not None and 'profile_spans' in g:
+        g.profile_spans['template'] = g.profile_spans.get('template', 0.0) + time.perf_counter() - started
+
+
+def start_request_profile():
+    """Start the request clock, and cProfile for a sampled share of requests"""
+    if not current_app.config['REQUEST_PROFILING']:
+        return
+    g.request_started_at = time.perf_counter()
+    g.profile_spans = {}
+    if random.random() < current_app.config['PROFILE_SAMPLE_RATE']:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # another thread is already profiling (one profiler per process on Python 3.12+)
+        g.profiler = profiler
+
+
+def finish_request_profile(response):
+    """Report the request's timings as Server-Timing, a log line and /metrics figures"""
+    started = g.pop('request_started_at', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+    endpoint = request.endpoint or 'unmatched'
+    sql_count = g.get('sql_query_count', 0)
+    sql_seconds = g.get('sql_seconds', 0.0)
+    spans = g.get('profile_spans', {})
+
+    timings = [('app', elapsed, None), ('db', sql_seconds, f'{sql_count} queries'),
+               ('tpl', spans.get('template', 0.0), None), ('chart', spans.get('chart', 0.0), None)]
+    response.headers.add('Server-Timing', ', '.join(
+        f'{name};dur={seconds * 1000:.1f}' + (f';desc="{desc}"' if desc else '') for name, seconds, desc in timings
+    ))
+
+    request_metrics.observe(endpoint, request.method, response.status_code, elapsed, sql_count, sql_seconds, spans)
+    profile_logger.info(json.dumps({
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2),
+        'sql_statements': sql_count,
+        'sql_ms': round(sql_seconds * 1000, 2),
+        'template_ms': round(spans.get('template', 0.0) * 1000, 2),
+        'chart_ms': round(spans.get('chart', 0.0) * 1000, 2),
+        'user_id': session.get('user_id')
+    }))
+
+    if profiler is not None and elapsed * 1000 >= current_app.config['PROFILE_SLOW_MS']:
+        os.makedirs(current_app.config['PROFILE_DIR'], exist_ok=True)
+        path = os.path.join(current_app.config['PROFILE_DIR'],
+                            f'{datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")}-{endpoint}-{elapsed * 1000:.0f}ms.prof')
+        profiler.dump_stats(path)
+        profile_logger.warning(f'Slow request profile written to {path}')
+    return response
@@ -0,0 +1,95 @@
+"""Query profiles: per-request statement limits and the query plan check"""
+
+from flask import current_app, request, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import re
+import click
+import time
+
+from .extensions import db
+from .models import Barn, Pig, User
+
+
+# Relationship loading strategy per use case, so each route loads exactly
+# what its template touches in a fixed number of statements.
+QUERY_PROFILES = {
+    # Dashboard rows: barn and section names, joined so they can be sorted on
+    'listing': (Pig, lambda query: query.join(Pig.barn).outerjoin(Pig.section)
+                .options(db.contains_eager(Pig.barn), db.contains_eager(Pig.section))),
+    # Pig detail page: one row with its barn, section and weight summary
+    'detail': (Pig, lambda query: query.options(db.joinedload(Pig.barn), db.joinedload(Pig.section),
+                                                db.joinedload(Pig.summary))),
+    # Pig pickers (weight comparison): ID and barn name only
+    'picker': (Pig, lambda query: query.options(db.joinedload(Pig.barn))),
+    # Barn pickers that list each barn's sections (add pig form)
+    'barn_sections': (Barn, lambda query: query.options(db.selectinload(Barn.sections))),
+    # User management table
+    'user_admin': (User, lambda query: query.options(db.joinedload(User.barn)))
+}
+
+
+def profiled_query(profile):
+    """Return a query for the profile's model with its loading strategy applied"""
+    model, apply_profile = QUERY_PROFILES[profile]
+    return apply_profile(model.query)
+
+
+class QueryLimitExceeded(RuntimeError):
+    """Raised in debug/testing mode when a request runs too many SQL statements"""
+
+
+# Single-user lookups by id, i.e. authentication rather than user listings
+USER_LOOKUP_PATTERN = re.compile(r'\bFROM\s+["`]?user["`]?\s+WHERE\s+["`]?user["`]?\.id\s*=', re.IGNORECASE)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    """Count SQL statements issued while handling the current request"""
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+        if USER_LOOKUP_PATTERN.search(statement):
+            g.user_query_count = g.get('user_query_count', 0) + 1
+        if context is not None:
+            context.request_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def time_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    """Add the statement's execution time to the current request's SQL total"""
+    started = getattr(context, 'request_started_at', None)
+    if started is not None and has_request_context():
+        g.sql_seconds = g.get('sql_seconds', 0.0) + time.perf_counter() - started
+
+
+def enforce_query_limit(response):
+    """Flag requests that exceed SQL_QUERY_LIMIT statements (usually an N+1 regression)"""
+    limit = current_app.config.get('SQL_QUERY_LIMIT')
+    count = g.get('sql_query_count', 0)
+    if limit and count > limit:
+        message = f'{request.endpoint} issued {count} SQL statements (limit {limit})'
+        if current_app.debug or current_app.testing:
+            raise QueryLimitExceeded(message)
+        current_app.logger.warning(message)
+    return response
+
+
+# Reference tables small enough that reading them whole is the right plan
+FULL_SCAN_ALLOWED_TABLES = {'user', 'barn', 'section', 'schema_migration'}
+
+
+def full_table_scans(connection, statement, parameters):
+    """Tables the database would read in full to run `statement`.
+
+    On SQLite this includes walking a whole index (SCAN t USING INDEX),
+    which costs the same as a table scan once the table is large.
+    """
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        matches = (re.match(r'SCAN (\w+)', row[-1]) for row in plan)
+    elif connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).fetchall()
+        matches = (re.search(r'Seq Scan on (\w+)', row[0]) for row in plan)
+    else:
+        raise click.ClickException(f'No plan check for {connection.dialect.name} databases')
+    return sorted({match.group(1) for match in matches if match} & set(db.metadata.tables))
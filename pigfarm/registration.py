@@ -0,0 +1,115 @@
+"""Bulk pig registration"""
+
+from datetime import datetime
+
+from .extensions import db
+from .models import ArchivedPig, Barn, Pig, Section
+from .database import IN_CLAUSE_CHUNK, chunked
+from .conditional import bump_barn_versions
+from .rollups import add_pig_rollup_changes, apply_rollup_changes
+
+
+BULK_REGISTER_MAX_ROWS = 10000
+
+# Accepted header spellings for pig import CSVs, after normalize_header()
+PIG_IMPORT_HEADERS = {
+    'pig_id': ('pig_id', 'pig', 'id', 'tag', 'ear_tag'),
+    'section': ('section', 'section_name', 'pen'),
+    'dob': ('dob', 'date_of_birth', 'birth_date', 'born'),
+    'sex': ('sex', 'gender'),
+    'breed': ('breed',),
+    'notes': ('notes', 'note', 'comments')
+}
+PIG_SEX_VALUES = {'m': 'Male', 'male': 'Male', 'f': 'Female', 'female': 'Female'}
+
+
+def register_pigs(user, barn_id, entries, defaults=None, dry_run=False, skip_invalid=False):
+    """Validate and create a batch of pigs in one barn for `user`.
+
+    Missing row values fall back to `defaults` (e.g. a litter's shared DOB
+    and breed). Sections are resolved by name within the barn, and IDs that
+    already exist are found with set-based IN queries. Valid rows are
+    written with one executemany INSERT unless `dry_run` is set; nothing is
+    committed here. Returns {'created': n, 'errors': [...], 'pigs': [...]}
+    where `pigs` previews every valid row.
+    """
+    defaults = defaults or {}
+    if user.role != 'ADMIN' and user.barn_id != barn_id:
+        return {'created': 0, 'errors': [{'row': 0, 'pig_id': '', 'error': 'Access denied'}], 'pigs': []}
+    if db.session.get(Barn, barn_id) is None:
+        return {'created': 0, 'errors': [{'row': 0, 'pig_id': '', 'error': f'Unknown barn {barn_id}'}], 'pigs': []}
+
+    sections = {section.name.lower(): section for section in Section.query.filter_by(barn_id=barn_id)}
+    errors = []
+    parsed = []
+    seen = set()
+    for row_number, entry in enumerate(entries, 1):
+        value = lambda field: str(entry.get(field) or defaults.get(field) or '').strip()
+        pig_id = value('pig_id')
+        if not pig_id:
+            errors.append({'row': row_number, 'pig_id': '', 'error': 'Missing pig ID'})
+            continue
+        if pig_id in seen:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Duplicate pig ID in this import'})
+            continue
+        seen.add(pig_id)
+
+        try:
+            dob = datetime.strptime(value('dob'), '%Y-%m-%d').date()
+        except ValueError:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Date of birth must be YYYY-MM-DD'})
+            continue
+        sex = PIG_SEX_VALUES.get(value('sex').lower())
+        if sex is None:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Sex must be Male or Female'})
+            continue
+        breed = value('breed')
+        if not breed:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Missing breed'})
+            continue
+        section = None
+        if value('section'):
+            section = sections.get(value('section').lower())
+            if section is None:
+                errors.append({'row': row_number, 'pig_id': pig_id,
+                               'error': f"Unknown section '{value('section')}'"})
+                continue
+
+        parsed.append((row_number, {
+            'id': pig_id,
+            'barn_id': barn_id,
+            'section_id': section.id if section else None,
+            'dob': dob,
+            'sex': sex,
+            'breed': breed,
+            'notes': value('notes'),
+            'status': 'ALIVE'
+        }))
+
+    existing = set()
+    candidate_ids = [row['id'] for _, row in parsed]
+    for chunk in chunked(candidate_ids, IN_CLAUSE_CHUNK):
+        existing.update(pig_id for (pig_id,) in db.session.query(Pig.id).filter(Pig.id.in_(chunk)))
+        existing.update(pig_id for (pig_id,) in db.session.query(ArchivedPig.id).filter(ArchivedPig.id.in_(chunk)))
+
+    valid = []
+    for row_number, row in parsed:
+        if row['id'] in existing:
+            errors.append({'row': row_number, 'pig_id': row['id'], 'error': 'Pig ID already exists'})
+        else:
+            valid.append(row)
+
+    errors.sort(key=lambda error: error['row'])
+    section_names = {section.id: section.name for section in sections.values()}
+    preview = [{**row, 'section': section_names.get(row['section_id'])} for row in valid]
+
+    if dry_run or (errors and not skip_invalid) or not valid:
+        return {'created': 0, 'errors': errors, 'pigs': preview}
+
+    changes = {}
+    for row in valid:
+        add_pig_rollup_changes(changes, barn_id, row['section_id'], row['dob'], None, ())
+    db.session.execute(db.insert(Pig), valid)
+    apply_rollup_changes(changes)
+    bump_barn_versions([barn_id], [row['id'] for row in valid])
+    return {'created': len(valid), 'errors': errors, 'pigs': preview}
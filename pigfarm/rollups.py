@@ -0,0 +1,387 @@
+"""Daily barn and section rollups"""
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date as date_type
+import numpy as np
+
+from .extensions import db
+from .models import ArchivedPig, ArchivedWeight, BarnDailyRollup, Pig, PigSectionMove, Weight
+from .database import IN_CLAUSE_CHUNK, chunked
+from .outliers import counted_weight
+from .analytics import ANALYTICS_BATCH_SIZE
+
+
+ROLLUP_MAX_DAYS = 3660
+ROLLUP_PERIODS = {'day': 1, 'week': 7}
+ROLLUP_INSERT_CHUNK = 20000
+
+
+def add_pig_rollup_changes(changes, barn_id, section_id, dob, kill_date, weights, moves=()):
+    """Add one pig's day-by-day rollup changes to `changes`.
+
+    The pig counts towards head count from dob until kill_date, and towards
+    weighed count and live weight with its latest counted weigh-in from its
+    first weigh-in on, always in the section it was in on the day: `moves`
+    are its (day, from_section_id, to_section_id) moves in order, and
+    `section_id` is where it is now. `weights` are (date, weight) pairs in
+    date order. `changes` maps (barn_id, section_id, day) to
+    [head, weighed, weight] changes.
+    """
+    def add(section, day, head, weighed, weight):
+        entry = changes.setdefault((barn_id, section or 0, day), [0, 0, 0.0])
+        entry[0] += head
+        entry[1] += weighed
+        entry[2] += weight
+
+    start = dob
+    if kill_date is not None and kill_date <= start:
+        return changes
+    section = moves[0][1] if moves else section_id
+    moves = [move for move in moves if kill_date is None or move[0] < kill_date]
+    pending = iter(moves)
+    move = next(pending, None)
+    while move is not None and move[0] <= start:
+        section = move[2]
+        move = next(pending, None)
+    start_section = section
+    add(start_section, start, 1, 0, 0.0)
+
+    initial = current = None
+
+    def move_until(day):
+        # Take the pig and its current weight over to the sections it moved to before `day`
+        nonlocal move, section
+        while move is not None and (day is None or move[0] <= day):
+            add(section, move[0], -1, 0 if current is None else -1, -(current or 0.0))
+            section = move[2]
+            add(section, move[0], 1, 0 if current is None else 1, current or 0.0)
+            move = next(pending, None)
+
+    for date, weight in weights:
+        if kill_date is not None and date >= kill_date:
+            break
+        if date <= start:
+            initial = current = weight
+            continue
+        move_until(date)
+        if current is None:
+            add(section, date, 0, 1, weight)
+        else:
+            add(section, date, 0, 0, weight - current)
+        current = weight
+    move_until(None)
+    if initial is not None:
+        add(start_section, start, 0, 1, initial)
+    if kill_date is not None:
+        add(section, kill_date, -1, 0 if current is None else -1, -(current or 0.0))
+    return changes
+
+
+def section_moves(pig_ids):
+    """{pig_id: [(day, from_section_id, to_section_id), ...]} in order, for the pigs that moved"""
+    moves = {}
+    for chunk in chunked(list(pig_ids), IN_CLAUSE_CHUNK):
+        for pig_id, day, from_section_id, to_section_id in db.session.query(
+                PigSectionMove.pig_id, PigSectionMove.day, PigSectionMove.from_section_id,
+                PigSectionMove.to_section_id).filter(PigSectionMove.pig_id.in_(chunk)) \
+                .order_by(PigSectionMove.pig_id, PigSectionMove.day, PigSectionMove.id):
+            moves.setdefault(pig_id, []).append((day, from_section_id, to_section_id))
+    return moves
+
+
+def move_pig_to_section(pig, section_id):
+    """Move `pig` to `section_id` (None: no section) from today on, logging the move for the rollups.
+
+    Call inside the rollups_follow block covering the pig. The caller commits.
+    """
+    if pig.section_id == section_id:
+        return
+    db.session.add(PigSectionMove(barn_id=pig.barn_id, pig_id=pig.id, day=datetime.utcnow().date(),
+                                  from_section_id=pig.section_id, to_section_id=section_id))
+    pig.section_id = section_id
+
+
+def pig_rollup_changes(pig_ids):
+    """Rollup changes the given pigs make as currently stored; missing pigs make none"""
+    pig_ids = list(pig_ids)
+    pigs = {}
+    weights = {}
+    for chunk in chunked(pig_ids, IN_CLAUSE_CHUNK):
+        pigs.update((pig_id, details) for pig_id, *details in db.session.query(
+            Pig.id, Pig.barn_id, Pig.section_id, Pig.dob, Pig.kill_date).filter(Pig.id.in_(chunk)))
+        for pig_id, date, weight in db.session.query(Weight.pig_id, Weight.date, Weight.weight) \
+                .filter(Weight.pig_id.in_(chunk), counted_weight()) \
+                .order_by(Weight.pig_id, Weight.date, Weight.id):
+            weights.setdefault(pig_id, []).append((date, weight))
+    moves = section_moves(pig_ids)
+
+    changes = {}
+    for pig_id, (barn_id, section_id, dob, kill_date) in pigs.items():
+        add_pig_rollup_changes(changes, barn_id, section_id, dob, kill_date, weights.get(pig_id, ()),
+                               moves.get(pig_id, ()))
+    return changes
+
+
+def apply_rollup_changes(changes):
+    """Add {(barn_id, section_id, day): [head, weighed, weight]} changes to the rollup table.
+
+    Uses an additive INSERT ... ON CONFLICT DO UPDATE on SQLite and
+    PostgreSQL, so concurrent writers touching the same day never lose an
+    update.
+    """
+    rows = [{'barn_id': barn_id, 'section_id': section_id, 'day': day,
+             'head_change': head, 'weighed_change': weighed, 'weight_change': weight}
+            for (barn_id, section_id, day), (head, weighed, weight) in changes.items()
+            if head or weighed or abs(weight) > 1e-9]
+    if not rows:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite_insert if dialect == 'sqlite' else postgresql_insert)(BarnDailyRollup)
+        statement = statement.on_conflict_do_update(
+            index_elements=['barn_id', 'section_id', 'day'],
+            set_={name: getattr(BarnDailyRollup, name) + getattr(statement.excluded, name)
+                  for name in ('head_change', 'weighed_change', 'weight_change')})
+        db.session.execute(statement, rows)
+        return len(rows)
+
+    for row in rows:
+        updated = BarnDailyRollup.query.filter_by(
+            barn_id=row['barn_id'], section_id=row['section_id'], day=row['day']
+        ).update({
+            BarnDailyRollup.head_change: BarnDailyRollup.head_change + row['head_change'],
+            BarnDailyRollup.weighed_change: BarnDailyRollup.weighed_change + row['weighed_change'],
+            BarnDailyRollup.weight_change: BarnDailyRollup.weight_change + row['weight_change']
+        }, synchronize_session=False)
+        if not updated:
+            db.session.execute(db.insert(BarnDailyRollup), [row])
+    return len(rows)
+
+
+def lock_pigs(pig_ids):
+    """Take the write lock on `pig_ids` before reading state that a write will be derived from.
+
+    A no-op UPDATE of the pig rows: on SQLite it starts the transaction and
+    waits for the database write lock, on PostgreSQL it locks the rows, so
+    concurrent writers to the same pigs read each other's committed changes
+    instead of racing them. Held until the caller commits.
+    """
+    for chunk in chunked(list(pig_ids), IN_CLAUSE_CHUNK):
+        db.session.execute(db.update(Pig).where(Pig.id.in_(chunk)).values(sync_version=Pig.sync_version)
+                           .execution_options(synchronize_session=False))
+
+
+@contextmanager
+def rollups_follow(pig_ids):
+    """Keep the daily rollups in step with whatever the block changes about `pig_ids`.
+
+    The pigs are locked, then their rollup changes are computed from their
+    whole history before and after the block and the difference is applied. Bulk weigh-ins use
+    appended_weigh_in_changes instead where they can. The caller commits.
+    """
+    pig_ids = list(pig_ids)
+    lock_pigs(pig_ids)
+    before = pig_rollup_changes(pig_ids)
+    yield
+    db.session.flush()
+    changes = pig_rollup_changes(pig_ids)
+    for key, (head, weighed, weight) in before.items():
+        entry = changes.setdefault(key, [0, 0, 0.0])
+        entry[0] -= head
+        entry[1] -= weighed
+        entry[2] -= weight
+    apply_rollup_changes(changes)
+
+
+def rebuild_rollups(barn_ids=None):
+    """Recompute the rollup table from the pig and weight history, for all barns or `barn_ids`.
+
+    Live and archived pigs are read alike. Weigh-ins are streamed into
+    arrays (as in growth_analytics) and turned into changes with a few
+    vectorized passes. Pigs that changed section go through
+    add_pig_rollup_changes instead, so their history stays with the section
+    they were in at the time, exactly as incremental upkeep leaves it. The
+    caller commits.
+    """
+    pig_selects, weight_selects = [], []
+    for pig_model, weight_model in ((Pig, Weight), (ArchivedPig, ArchivedWeight)):
+        pig_select = db.select(pig_model.id, pig_model.barn_id, pig_model.section_id, pig_model.dob, pig_model.kill_date)
+        weight_select = db.select(weight_model.pig_id, weight_model.date, weight_model.weight, weight_model.id) \
+            .where(counted_weight(weight_model))
+        if barn_ids is not None:
+            pig_select = pig_select.where(pig_model.barn_id.in_(barn_ids))
+            weight_select = weight_select.join(pig_model, pig_model.id == weight_model.pig_id) \
+                .where(pig_model.barn_id.in_(barn_ids))
+        pig_selects.append(pig_select)
+        weight_selects.append(weight_select)
+    delete_query = BarnDailyRollup.query
+    if barn_ids is not None:
+        delete_query = delete_query.filter(BarnDailyRollup.barn_id.in_(barn_ids))
+    delete_query.delete(synchronize_session=False)
+
+    pig_rows = db.session.execute(db.union_all(*pig_selects)).all()
+    if not pig_rows:
+        return 0
+    move_query = db.session.query(PigSectionMove.pig_id, PigSectionMove.day, PigSectionMove.from_section_id,
+                                  PigSectionMove.to_section_id)
+    if barn_ids is not None:
+        move_query = move_query.filter(PigSectionMove.barn_id.in_(barn_ids))
+    moves = {}
+    for pig_id, *move in move_query.order_by(PigSectionMove.pig_id, PigSectionMove.day, PigSectionMove.id):
+        moves.setdefault(pig_id, []).append(tuple(move))
+
+    pig_ids, pig_barns, pig_sections, pig_dobs, pig_kills = zip(*pig_rows)
+    pig_id_array = np.array(pig_ids)
+    pig_order = np.argsort(pig_id_array)
+    sorted_pig_ids = pig_id_array[pig_order]
+    pig_barns = np.array(pig_barns, dtype=np.int64)
+    pig_sections = np.array([section_id or 0 for section_id in pig_sections], dtype=np.int64)
+    dob_days = np.fromiter(map(date_type.toordinal, pig_dobs), np.int64, len(pig_dobs))
+    never = np.iinfo(np.int64).max
+    kill_days = np.array([date.toordinal() if date else never for date in pig_kills], dtype=np.int64)
+    moved = np.isin(pig_id_array, list(moves)) if moves else np.zeros(len(pig_ids), bool)
+
+    index_chunks, day_chunks, weight_chunks, id_chunks = [], [], [], []
+    connection = db.session.connection()
+    result_rows = connection.execute(db.union_all(*weight_selects).execution_options(yield_per=ANALYTICS_BATCH_SIZE))
+    for partition in result_rows.partitions():
+        ids, dates, values, weight_ids = zip(*partition)
+        index_chunks.append(pig_order[np.searchsorted(sorted_pig_ids, np.array(ids))])
+        day_chunks.append(np.fromiter(map(date_type.toordinal, dates), np.int64, len(dates)))
+        weight_chunks.append(np.array(values, dtype=float))
+        id_chunks.append(np.array(weight_ids, dtype=np.int64))
+
+    # Head count: +1 at dob, -1 at kill date; pigs that moved are added one by one below
+    alive = (kill_days > dob_days) & ~moved
+    slaughtered = alive & (kill_days != never)
+    change_pigs = [np.flatnonzero(alive), np.flatnonzero(slaughtered)]
+    change_days = [dob_days[change_pigs[0]], kill_days[change_pigs[1]]]
+    change_head = [np.ones(len(change_pigs[0]), np.int64), -np.ones(len(change_pigs[1]), np.int64)]
+    change_weighed = [np.zeros(len(change_pigs[0]), np.int64), np.zeros(len(change_pigs[1]), np.int64)]
+    change_weight = [np.zeros(len(change_pigs[0])), np.zeros(len(change_pigs[1]))]
+
+    moved_weights = {}
+    if index_chunks:
+        pig_index = np.concatenate(index_chunks)
+        days = np.concatenate(day_chunks)
+        weights = np.concatenate(weight_chunks)
+        order = np.lexsort((np.concatenate(id_chunks), days, pig_index))
+        pig_index, days, weights = pig_index[order], days[order], weights[order]
+        moved_rows = moved[pig_index]
+        for index, day, weight in zip(pig_index[moved_rows].tolist(), days[moved_rows].tolist(),
+                                      weights[moved_rows].tolist()):
+            moved_weights.setdefault(index, []).append((date_type.fromordinal(day), weight))
+        keep = alive[pig_index] & (days < kill_days[pig_index])
+        pig_index, days, weights = pig_index[keep], days[keep], weights[keep]
+        days = np.maximum(days, dob_days[pig_index])
+
+        # Each weigh-in replaces the pig's previous weight; the first also adds it to the weighed count
+        first = np.concatenate(([True], pig_index[1:] != pig_index[:-1]))
+        previous = np.concatenate(([0.0], weights[:-1]))
+        change_pigs.append(pig_index)
+        change_days.append(days)
+        change_head.append(np.zeros(len(days), np.int64))
+        change_weighed.append(first.astype(np.int64))
+        change_weight.append(np.where(first, weights, weights - previous))
+
+        # Slaughtered pigs leave with their last weight
+        last = np.concatenate((pig_index[1:] != pig_index[:-1], [True])) if len(days) else np.zeros(0, bool)
+        leaving = last & (kill_days[pig_index] != never)
+        change_pigs.append(pig_index[leaving])
+        change_days.append(kill_days[pig_index[leaving]])
+        change_head.append(np.zeros(leaving.sum(), np.int64))
+        change_weighed.append(-np.ones(leaving.sum(), np.int64))
+        change_weight.append(-weights[leaving])
+
+    change_pigs = np.concatenate(change_pigs)
+    change_barns, change_sections = [pig_barns[change_pigs]], [pig_sections[change_pigs]]
+    moved_changes = {}
+    for index in np.flatnonzero(moved).tolist():
+        add_pig_rollup_changes(moved_changes, int(pig_barns[index]), int(pig_sections[index]), pig_dobs[index],
+                               pig_kills[index], moved_weights.get(index, ()), moves[pig_ids[index]])
+    if moved_changes:
+        keys, values = zip(*moved_changes.items())
+        barns, sections, dates = zip(*keys)
+        heads, counts, totals = zip(*values)
+        change_barns.append(np.array(barns, dtype=np.int64))
+        change_sections.append(np.array(sections, dtype=np.int64))
+        change_days.append(np.fromiter(map(date_type.toordinal, dates), np.int64, len(dates)))
+        change_head.append(np.array(heads, dtype=np.int64))
+        change_weighed.append(np.array(counts, dtype=np.int64))
+        change_weight.append(np.array(totals, dtype=float))
+
+    # Sum the changes per (barn, section, day), packed into one int64 key
+    change_barns = np.concatenate(change_barns)
+    change_sections = np.concatenate(change_sections)
+    change_days = np.concatenate(change_days)
+    first_day = change_days.min()
+    keys = (change_barns << 42) | (change_sections << 20) | (change_days - first_day)
+    unique_keys, groups = np.unique(keys, return_inverse=True)
+    heads = np.rint(np.bincount(groups, np.concatenate(change_head), len(unique_keys))).astype(np.int64)
+    weighed = np.rint(np.bincount(groups, np.concatenate(change_weighed), len(unique_keys))).astype(np.int64)
+    totals = np.bincount(groups, np.concatenate(change_weight), len(unique_keys))
+    keep = (heads != 0) | (weighed != 0) | (np.abs(totals) > 1e-9)
+
+    rows = [{'barn_id': barn_id, 'section_id': section_id, 'day': date_type.fromordinal(day),
+             'head_change': head, 'weighed_change': count, 'weight_change': total}
+            for barn_id, section_id, day, head, count, total in zip(
+                (unique_keys[keep] >> 42).tolist(), ((unique_keys[keep] >> 20) & ((1 << 22) - 1)).tolist(),
+                ((unique_keys[keep] & ((1 << 20) - 1)) + first_day).tolist(),
+                heads[keep].tolist(), weighed[keep].tolist(), totals[keep].tolist())]
+    for chunk in chunked(rows, ROLLUP_INSERT_CHUNK):
+        db.session.execute(db.insert(BarnDailyRollup), chunk)
+    return len(rows)
+
+
+def rollup_series(barn_ids=None, section_id=None, start=None, end=None, period='week'):
+    """Head count, weighed pigs, total and mean live weight per day or week.
+
+    Reads only the rollup table: one grouped query returns the daily changes
+    up to `end` and a cumulative sum turns them into totals, sampled every
+    day or every 7 days back from `end`. `section_id` 0 means pigs without
+    a section.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=364)
+    step = ROLLUP_PERIODS[period]
+
+    query = db.session.query(
+        BarnDailyRollup.day,
+        db.func.sum(BarnDailyRollup.head_change),
+        db.func.sum(BarnDailyRollup.weighed_change),
+        db.func.sum(BarnDailyRollup.weight_change)
+    ).filter(BarnDailyRollup.day <= end)
+    if barn_ids is not None:
+        query = query.filter(BarnDailyRollup.barn_id.in_(barn_ids))
+    if section_id is not None:
+        query = query.filter(BarnDailyRollup.section_id == section_id)
+    rows = query.group_by(BarnDailyRollup.day).order_by(BarnDailyRollup.day).all()
+
+    samples = np.arange(end.toordinal(), start.toordinal() - 1, -step)[::-1]
+    head = np.zeros(len(samples))
+    weighed = np.zeros(len(samples))
+    total = np.zeros(len(samples))
+    if rows:
+        days, heads, counts, weights = zip(*rows)
+        days = np.fromiter(map(date_type.toordinal, days), np.int64, len(days))
+        at = np.searchsorted(days, samples, side='right') - 1
+        found = at >= 0
+        for target, values in ((head, heads), (weighed, counts), (total, weights)):
+            running = np.cumsum(np.array(values, dtype=float))
+            target[found] = running[at[found]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(weighed > 0, total / weighed, np.nan)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'period': period,
+        'dates': [date_type.fromordinal(int(day)).isoformat() for day in samples],
+        'head_count': np.rint(head).astype(int).tolist(),
+        'weighed': np.rint(weighed).astype(int).tolist(),
+        'total_weight': np.round(total, 1).tolist(),
+        'mean_weight': [None if np.isnan(value) else round(float(value), 1) for value in mean]
+    }
@@ -0,0 +1,92 @@
+"""Barn and section statistics"""
+
+from .extensions import db
+from .models import ArchivedPig, Pig, Section, WeightSummary
+
+
+def compute_barn_statistics(barns, include_archive=False):
+    """Compute pig counts and average latest weight for each barn and section.
+
+    Runs a fixed number of SQL statements no matter how many pigs or weights
+    exist: one for the sections and one grouped aggregate over pigs joined to
+    their weight summary, plus one over the archive with `include_archive`.
+    Returns a list of dicts in the same order as `barns`.
+    """
+    barn_ids = [barn.id for barn in barns]
+    if not barn_ids:
+        return []
+
+    sections = Section.query.filter(Section.barn_id.in_(barn_ids)).order_by(Section.name).all()
+
+    rows = db.session.query(
+        Pig.barn_id,
+        Pig.section_id,
+        db.func.count(Pig.id),
+        db.func.sum(db.case((Pig.status == 'ALIVE', 1), else_=0)),
+        db.func.sum(db.case((Pig.status == 'SLAUGHTERED', 1), else_=0)),
+        db.func.count(WeightSummary.latest_weight),
+        db.func.sum(WeightSummary.latest_weight)
+    ).outerjoin(WeightSummary, WeightSummary.pig_id == Pig.id) \
+     .filter(Pig.barn_id.in_(barn_ids)) \
+     .group_by(Pig.barn_id, Pig.section_id) \
+     .all()
+    if include_archive:
+        rows += db.session.query(
+            ArchivedPig.barn_id,
+            ArchivedPig.section_id,
+            db.func.count(ArchivedPig.id),
+            db.literal(0),
+            db.func.count(ArchivedPig.id),
+            db.func.count(ArchivedPig.latest_weight),
+            db.func.sum(ArchivedPig.latest_weight)
+        ).filter(ArchivedPig.barn_id.in_(barn_ids)) \
+         .group_by(ArchivedPig.barn_id, ArchivedPig.section_id) \
+         .all()
+
+    def empty_totals():
+        return {'total_pigs': 0, 'alive': 0, 'slaughtered': 0, 'weighed': 0, 'weight_sum': 0.0}
+
+    def add_totals(target, source):
+        for key in target:
+            target[key] += source[key]
+
+    def finish(entry):
+        weighed = entry.pop('weighed')
+        weight_sum = entry.pop('weight_sum')
+        entry['avg_weight'] = weight_sum / weighed if weighed else None
+        return entry
+
+    grouped = {}
+    section_ids = {section.id for section in sections}
+    for barn_id, section_id, total, alive, slaughtered, weighed, weight_sum in rows:
+        # Archived pigs may name sections deleted since; they count as unassigned
+        key = (barn_id, section_id if section_id in section_ids else None)
+        add_totals(grouped.setdefault(key, empty_totals()), {
+            'total_pigs': total,
+            'alive': alive or 0,
+            'slaughtered': slaughtered or 0,
+            'weighed': weighed,
+            'weight_sum': weight_sum or 0.0
+        })
+
+    sections_by_barn = {}
+    for section in sections:
+        sections_by_barn.setdefault(section.barn_id, []).append(section)
+
+    stats = []
+    for barn in barns:
+        barn_totals = empty_totals()
+        section_stats = []
+        for section in sections_by_barn.get(barn.id, []):
+            totals = grouped.get((barn.id, section.id), empty_totals())
+            add_totals(barn_totals, totals)
+            section_stats.append(finish({'section': section, 'name': section.name, **totals}))
+
+        unassigned = grouped.get((barn.id, None))
+        if unassigned:
+            add_totals(barn_totals, unassigned)
+            section_stats.append(finish({'section': None, 'name': 'Unassigned', **unassigned}))
+
+        stats.append(finish({'barn': barn, 'sections': section_stats, **barn_totals}))
+
+    return stats
@@ -0,0 +1,112 @@
+"""Weight summary maintenance"""
+
+from .extensions import db
+from .models import Pig, Weight, WeightSummary
+from .outliers import counted_weight
+
+
+def average_daily_gain(first_weight, first_date, latest_weight, latest_date):
+    """Average kg gained per day between two weigh-ins, None if they share a day"""
+    if first_date is None or latest_date is None:
+        return None
+    days = (latest_date - first_date).days
+    if days <= 0:
+        return None
+    return (latest_weight - first_weight) / days
+
+
+def apply_weight_to_summary(pig, weight, date):
+    """Fold a newly inserted weigh-in into the pig's summary row"""
+    summary = pig.summary
+    if summary is None:
+        summary = WeightSummary(pig_id=pig.id, weight_count=0, data_version=0)
+        pig.summary = summary
+    return fold_weight_into_summary(summary, weight, date)
+
+
+def fold_weight_into_summary(summary, weight, date):
+    """Update a summary row for one newly inserted weigh-in.
+
+    Latest/first ties are broken by insertion order, so a new row on the
+    current latest date becomes the latest and a new row on the first date
+    does not replace the first. Back-dated rows only move `first_*` when they
+    precede it, which keeps the summary exact without rescanning the history.
+    """
+    if not summary.weight_count:
+        summary.first_weight = weight
+        summary.first_weight_date = date
+        summary.latest_weight = weight
+        summary.latest_weight_date = date
+    elif date >= summary.latest_weight_date:
+        summary.latest_weight = weight
+        summary.latest_weight_date = date
+    elif date < summary.first_weight_date:
+        summary.first_weight = weight
+        summary.first_weight_date = date
+
+    summary.weight_count = (summary.weight_count or 0) + 1
+    summary.data_version = (summary.data_version or 0) + 1
+    summary.avg_daily_gain = average_daily_gain(summary.first_weight, summary.first_weight_date,
+                                                summary.latest_weight, summary.latest_weight_date)
+    return summary
+
+
+def rebuild_weight_summaries(pig_ids=None):
+    """Recompute weight summaries from the Weight table.
+
+    Rebuilds every pig when `pig_ids` is None, otherwise only the given pigs.
+    Flagged outliers are skipped. Weights are streamed in one ordered query and the summary rows are
+    replaced in bulk, keeping each pig's data_version increasing. The caller
+    is responsible for committing.
+    """
+    weights_query = db.session.query(Weight.pig_id, Weight.weight, Weight.date) \
+        .filter(counted_weight()) \
+        .order_by(Weight.pig_id, Weight.date, Weight.id)
+    pigs_query = db.session.query(Pig.id)
+    if pig_ids is not None:
+        pig_ids = list(pig_ids)
+        if not pig_ids:
+            return 0
+        weights_query = weights_query.filter(Weight.pig_id.in_(pig_ids))
+        pigs_query = pigs_query.filter(Pig.id.in_(pig_ids))
+
+    summaries = {}
+    for pig_id, weight, date in weights_query.yield_per(1000):
+        summary = summaries.get(pig_id)
+        if summary is None:
+            summaries[pig_id] = {
+                'pig_id': pig_id,
+                'weight_count': 1,
+                'first_weight': weight,
+                'first_weight_date': date,
+                'latest_weight': weight,
+                'latest_weight_date': date
+            }
+        else:
+            summary['weight_count'] += 1
+            summary['latest_weight'] = weight
+            summary['latest_weight_date'] = date
+
+    versions_query = db.session.query(WeightSummary.pig_id, WeightSummary.data_version)
+    if pig_ids is not None:
+        versions_query = versions_query.filter(WeightSummary.pig_id.in_(pig_ids))
+    versions = dict(versions_query.all())
+
+    rows = []
+    for (pig_id,) in pigs_query:
+        summary = summaries.get(pig_id, {'pig_id': pig_id, 'weight_count': 0, 'first_weight': None,
+                                         'first_weight_date': None, 'latest_weight': None,
+                                         'latest_weight_date': None})
+        summary['avg_daily_gain'] = average_daily_gain(summary['first_weight'], summary['first_weight_date'],
+                                                       summary['latest_weight'], summary['latest_weight_date'])
+        summary['data_version'] = (versions.get(pig_id) or 0) + 1
+        rows.append(summary)
+
+    delete_query = WeightSummary.query
+    if pig_ids is not None:
+        delete_query = delete_query.filter(WeightSummary.pig_id.in_(pig_ids))
+    delete_query.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(WeightSummary), rows)
+    db.session.expire_all()
+    return len(rows)
@@ -0,0 +1,252 @@
+"""Terminal sync: delta rosters and batched offline operations"""
+
+from flask import current_app
+from datetime import datetime, timedelta
+import json
+
+from .extensions import db
+from .models import Barn, Pig, Section, SyncOperation, SyncTombstone, WeightSummary
+from .database import IN_CLAUSE_CHUNK, chunked
+from .conditional import bump_barn_versions
+from .weigh_ins import BULK_WEIGH_MAX_ROWS, record_weigh_ins
+from .rollups import move_pig_to_section, rollups_follow
+
+
+# Handheld scale terminals download their barn's roster once, then pull only
+# what changed since the barn data_version they last saw (their cursor), and
+# upload queued fieldwork as batches of operations with client-generated IDs.
+SYNC_MAX_OPERATIONS = BULK_WEIGH_MAX_ROWS
+SYNC_OPERATION_TYPES = ('weigh', 'slaughter', 'move')
+SYNC_CLIENT_ID_LENGTH = 64
+
+
+def add_sync_tombstones(pig_barns):
+    """Record pigs ({pig_id: barn_id}) leaving their barns, after bump_barn_versions. The caller commits."""
+    versions = dict(db.session.query(Barn.id, Barn.data_version).filter(Barn.id.in_(set(pig_barns.values()))))
+    db.session.execute(db.insert(SyncTombstone), [
+        {'barn_id': barn_id, 'pig_id': pig_id, 'version': versions[barn_id]}
+        for pig_id, barn_id in pig_barns.items()
+    ])
+
+
+def sync_pig_to_dict(row):
+    """Roster entry for a pig row with its latest counted weight"""
+    return {
+        'id': row.id,
+        'section_id': row.section_id,
+        'dob': row.dob.isoformat(),
+        'sex': row.sex,
+        'breed': row.breed,
+        'status': row.status,
+        'kill_date': row.kill_date.isoformat() if row.kill_date else None,
+        'latest_weight': row.latest_weight,
+        'latest_weight_date': row.latest_weight_date.isoformat() if row.latest_weight_date else None,
+        'version': row.sync_version
+    }
+
+
+def sync_roster(barn, since=None):
+    """Roster of `barn` for a terminal: all of it, or what changed after cursor `since`.
+
+    A full roster lists the barn's live pigs. A delta lists every pig stamped
+    after `since` (slaughtered ones too, so terminals drop them) and the IDs
+    of pigs deleted since. Sections are always sent whole. A cursor ahead of
+    the barn's version, e.g. after a database restore, gets a full roster.
+    The version is read before the pigs, so a write landing in between is
+    sent again next time rather than missed.
+    """
+    version = barn.data_version
+    full = since is None or since > version
+    pigs = db.session.query(
+        Pig.id, Pig.section_id, Pig.dob, Pig.sex, Pig.breed, Pig.status, Pig.kill_date, Pig.sync_version,
+        WeightSummary.latest_weight, WeightSummary.latest_weight_date
+    ).outerjoin(WeightSummary, WeightSummary.pig_id == Pig.id).filter(Pig.barn_id == barn.id)
+    removed = []
+    if full:
+        pigs = pigs.filter(Pig.status == 'ALIVE')
+    else:
+        pigs = pigs.filter(Pig.sync_version > since)
+        removed = [pig_id for (pig_id,) in db.session.query(SyncTombstone.pig_id).filter(
+            SyncTombstone.barn_id == barn.id, SyncTombstone.version > since)]
+
+    pigs = [sync_pig_to_dict(row) for row in pigs.order_by(Pig.id)]
+    current = {pig['id'] for pig in pigs}
+    sections = db.session.query(Section.id, Section.name).filter_by(barn_id=barn.id).order_by(Section.name)
+    return {
+        'barn_id': barn.id,
+        'version': version,
+        'full': full,
+        'sections': [{'id': section_id, 'name': name} for section_id, name in sections],
+        'pigs': pigs,
+        'removed': sorted(set(removed) - current)
+    }
+
+
+def parse_sync_date(value):
+    """YYYY-MM-DD string to a date, or None when missing or malformed"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def sync_conflict(pig, reason):
+    """Conflict result carrying the server's copy of the fields the operation disagreed with"""
+    return {'status': 'conflict', 'error': reason, 'pig': None if pig is None else {
+        'id': pig.id,
+        'section_id': pig.section_id,
+        'status': pig.status,
+        'kill_date': pig.kill_date.isoformat() if pig.kill_date else None,
+        'version': pig.sync_version
+    }}
+
+
+def apply_sync_operations(user, operations):
+    """Apply a terminal's queued operations, each at most once. Nothing is committed here.
+
+    Operations are {"client_id", "type", "pig_id"} plus, per type: weigh
+    "weight" and "date"; slaughter "kill_date"; move "section_id" and
+    optionally "from_section_id", the section the terminal saw the pig in.
+    Each gets a result in input order:
+    - applied: done now (weigh-ins also report an outlier "flag")
+    - duplicate: already applied under this client_id; the original result
+      is returned and nothing changes, so terminals can retry freely
+    - conflict: the pig no longer fits - it is unknown, was slaughtered
+      before the weigh date (by this batch too) or on another date, or was
+      moved elsewhere since the terminal saw it; the server's copy of the
+      pig is included
+    - rejected: malformed or not allowed for this user
+    Only applied operations are recorded, so a corrected operation can be
+    re-sent under its client_id. Weigh-ins are applied first, as one batch,
+    then moves, then slaughters. Returns {'results': [...], 'pig_ids': [...]}.
+    """
+    results = [None] * len(operations)
+    pending = []
+    seen = set()
+    for index, operation in enumerate(operations):
+        client_id = str(operation.get('client_id') or '').strip()
+        if not client_id or len(client_id) > SYNC_CLIENT_ID_LENGTH:
+            results[index] = {'status': 'rejected', 'error': f'client_id must be 1-{SYNC_CLIENT_ID_LENGTH} characters'}
+        elif client_id in seen:
+            results[index] = {'status': 'rejected', 'error': 'client_id repeated in this batch'}
+        elif operation.get('type') not in SYNC_OPERATION_TYPES:
+            results[index] = {'status': 'rejected', 'error': f"type must be one of {', '.join(SYNC_OPERATION_TYPES)}"}
+        elif not str(operation.get('pig_id') or '').strip():
+            results[index] = {'status': 'rejected', 'error': 'Missing pig ID'}
+        else:
+            pending.append((index, client_id, operation['type'], str(operation['pig_id']).strip(), operation))
+        seen.add(client_id)
+
+    applied_before = {}
+    client_ids = [client_id for _, client_id, _, _, _ in pending]
+    for chunk in chunked(client_ids, IN_CLAUSE_CHUNK):
+        applied_before.update(db.session.query(SyncOperation.client_id, SyncOperation.result)
+                              .filter(SyncOperation.client_id.in_(chunk)))
+    pigs = {}
+    pig_ids = list(dict.fromkeys(pig_id for _, client_id, _, pig_id, _ in pending if client_id not in applied_before))
+    for chunk in chunked(pig_ids, IN_CLAUSE_CHUNK):
+        pigs.update((pig.id, pig) for pig in Pig.query.filter(Pig.id.in_(chunk)))
+    barn_sections = {}
+    for section_id, barn_id in db.session.query(Section.id, Section.barn_id).filter(
+            Section.barn_id.in_({pig.barn_id for pig in pigs.values()})):
+        barn_sections[section_id] = barn_id
+
+    # Kill dates as they will stand after this batch, so weigh-ins and repeated
+    # slaughters are checked against slaughters queued alongside them
+    kill_dates = {pig.id: pig.kill_date for pig in pigs.values()}
+    for _, client_id, kind, pig_id, operation in pending:
+        if kind == 'slaughter' and client_id not in applied_before and pig_id in kill_dates \
+                and kill_dates[pig_id] is None:
+            kill_dates[pig_id] = parse_sync_date(operation.get('kill_date'))
+
+    weighs, moves, slaughters = [], [], []
+    for index, client_id, kind, pig_id, operation in pending:
+        if client_id in applied_before:
+            results[index] = {**json.loads(applied_before[client_id]), 'status': 'duplicate'}
+            continue
+        pig = pigs.get(pig_id)
+        if pig is None:
+            results[index] = sync_conflict(None, 'Unknown pig')
+        elif not user.can_access_barn(pig.barn_id):
+            results[index] = {'status': 'rejected', 'error': 'Access denied'}
+        elif kind == 'weigh':
+            try:
+                weight = float(operation.get('weight'))
+            except (TypeError, ValueError):
+                weight = None
+            date = parse_sync_date(operation.get('date'))
+            if weight is None or weight <= 0:
+                results[index] = {'status': 'rejected', 'error': 'Weight must be a positive number'}
+            elif date is None:
+                results[index] = {'status': 'rejected', 'error': 'Date must be YYYY-MM-DD'}
+            elif kill_dates[pig_id] is not None and date > kill_dates[pig_id]:
+                results[index] = sync_conflict(pig, 'Pig was slaughtered before this weigh-in')
+            else:
+                weighs.append((index, client_id, {'pig_id': pig_id, 'weight': weight, 'date': date}))
+        elif kind == 'move':
+            try:
+                section_id = int(operation.get('section_id'))
+                expected = operation.get('from_section_id', pig.section_id)
+                expected = None if expected is None else int(expected)
+            except (TypeError, ValueError):
+                section_id = None
+            if barn_sections.get(section_id) != pig.barn_id:
+                results[index] = {'status': 'rejected', 'error': "Section is not in the pig's barn"}
+            elif pig.status != 'ALIVE':
+                results[index] = sync_conflict(pig, 'Pig is no longer alive')
+            elif pig.section_id not in (expected, section_id):
+                results[index] = sync_conflict(pig, 'Pig was moved to another section since the last sync')
+            else:
+                moves.append((index, client_id, pig, section_id))
+        else:
+            kill_date = parse_sync_date(operation.get('kill_date'))
+            if kill_date is None:
+                results[index] = {'status': 'rejected', 'error': 'kill_date must be YYYY-MM-DD'}
+            elif kill_dates[pig_id] != kill_date:
+                results[index] = sync_conflict(pig, 'Pig was already slaughtered on another date')
+            else:
+                slaughters.append((index, client_id, pig, kill_date))
+
+    applied = []
+    changed = []
+    if weighs:
+        recorded = record_weigh_ins(user, [entry for _, _, entry in weighs], skip_invalid=True)
+        flags = {flag['row']: flag for flag in recorded['flagged']}
+        for row_number, (index, client_id, entry) in enumerate(weighs, 1):
+            flag = flags.get(row_number, {})
+            results[index] = {'status': 'applied', 'flag': flag.get('flag'), 'expected_weight': flag.get('expected_weight')}
+            applied.append((index, client_id, 'weigh', entry['pig_id']))
+    if moves:
+        with rollups_follow([pig.id for _, _, pig, _ in moves]):
+            for index, client_id, pig, section_id in moves:
+                move_pig_to_section(pig, section_id)
+                results[index] = {'status': 'applied'}
+                applied.append((index, client_id, 'move', pig.id))
+                changed.append(pig.id)
+    if slaughters:
+        with rollups_follow([pig.id for _, _, pig, _ in slaughters]):
+            for index, client_id, pig, kill_date in slaughters:
+                pig.status = 'SLAUGHTERED'
+                pig.kill_date = kill_date
+                results[index] = {'status': 'applied'}
+                applied.append((index, client_id, 'slaughter', pig.id))
+                changed.append(pig.id)
+
+    if changed:
+        bump_barn_versions(pig_ids=changed)
+    if applied:
+        db.session.execute(db.insert(SyncOperation), [
+            {'client_id': client_id, 'user_id': user.id, 'kind': kind, 'pig_id': pig_id,
+             'result': json.dumps(results[index]), 'created_at': datetime.utcnow()}
+            for index, client_id, kind, pig_id in applied
+        ])
+    for result, operation in zip(results, operations):
+        result['client_id'] = operation.get('client_id')
+    pig_ids = list(dict.fromkeys(pig_id for _, _, _, pig_id in applied))
+    return {'results': results, 'pig_ids': pig_ids}
+
+
+def prune_sync_operations():
+    """Forget applied operations older than SYNC_RETENTION_DAYS. The caller commits."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['SYNC_RETENTION_DAYS'])
+    return SyncOperation.query.filter(SyncOperation.created_at < cutoff).delete(synchronize_session=False)
@@ -0,0 +1,14 @@
+"""Blueprints, one module per area of the app"""
+
+from .auth import auth_bp
+from .pigs import pigs_bp
+from .barns import barns_bp
+from .charts import charts_bp
+from .export import export_bp
+from .jobs import jobs_bp
+from .sync import sync_bp
+from .monitoring import monitoring_bp
+from .users import users_bp
+
+
+BLUEPRINTS = [auth_bp, pigs_bp, barns_bp, charts_bp, export_bp, jobs_bp, sync_bp, monitoring_bp, users_bp]
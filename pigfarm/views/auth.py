@@ -0,0 +1,47 @@
+"""Login and logout"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from werkzeug.security import check_password_hash
+
+from ..models import User
+
+
+auth_bp = Blueprint('auth', __name__)
+
+
+@auth_bp.route('/')
+def index():
+    """Home page - redirects to dashboard or login"""
+    if 'user_id' in session:
+        return redirect(url_for('pigs.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Login page"""
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        if user and check_password_hash(user.password, password):
+            session['user_id'] = user.id
+            session['username'] = user.username
+            session['role'] = user.role
+            session['barn_id'] = user.barn_id
+            flash('Login successful!', 'success')
+            return redirect(url_for('pigs.dashboard'))
+        else:
+            flash('Invalid username or password', 'danger')
+    
+    return render_template('login.html')
+
+
+@auth_bp.route('/logout')
+def logout():
+    """Logout user"""
+    session.clear()
+    flash('You have been logged out', 'info')
+    return redirect(url_for('auth.login'))
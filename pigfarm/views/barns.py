@@ -0,0 +1,184 @@
+"""Barn and section management routes"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+
+from ..extensions import db
+from ..models import ArchivedPig, ArchivedWeight, Barn, BarnDailyRollup, PigSectionMove, Section, SyncTombstone
+from ..auth import admin_required, check_barn_access, farmer_or_admin_required, login_required, user_cache
+from ..conditional import barn_conditional, barn_version_cache, bump_barn_versions
+from ..stats import compute_barn_statistics
+from ..rollups import move_pig_to_section, rollups_follow
+
+
+barns_bp = Blueprint('barns', __name__)
+
+
+@barns_bp.route('/barns')
+@admin_required
+def manage_barns():
+    """Admin only - manage barns"""
+    barns = Barn.query.all()
+    barn_stats = {stat['barn'].id: stat for stat in compute_barn_statistics(barns)}
+    return render_template('manage_barns.html', barns=barns, barn_stats=barn_stats)
+
+
+@barns_bp.route('/barn/add', methods=['GET', 'POST'])
+@admin_required
+def add_barn():
+    """Add a new barn"""
+    if request.method == 'POST':
+        name = request.form.get('name')
+        location = request.form.get('location')
+        capacity = request.form.get('capacity')
+        
+        if Barn.query.filter_by(name=name).first():
+            flash('Barn name already exists!', 'danger')
+            return redirect(url_for('barns.add_barn'))
+        
+        new_barn = Barn(
+            name=name,
+            location=location,
+            capacity=int(capacity) if capacity else None
+        )
+        
+        db.session.add(new_barn)
+        db.session.commit()
+        barn_version_cache.invalidate()
+        
+        flash(f'Barn {name} added successfully!', 'success')
+        return redirect(url_for('barns.manage_barns'))
+    
+    return render_template('add_barn.html')
+
+
+@barns_bp.route('/barn/<int:barn_id>/edit', methods=['GET', 'POST'])
+@admin_required
+def edit_barn(barn_id):
+    """Edit barn details"""
+    barn = Barn.query.get_or_404(barn_id)
+    
+    if request.method == 'POST':
+        barn.name = request.form.get('name')
+        barn.location = request.form.get('location')
+        barn.capacity = int(request.form.get('capacity')) if request.form.get('capacity') else None
+        
+        bump_barn_versions([barn_id])
+        db.session.commit()
+        flash(f'Barn {barn.name} updated successfully!', 'success')
+        return redirect(url_for('barns.manage_barns'))
+    
+    return render_template('edit_barn.html', barn=barn)
+
+
+@barns_bp.route('/barn/<int:barn_id>/delete', methods=['POST'])
+@admin_required
+def delete_barn(barn_id):
+    """Delete barn"""
+    barn = Barn.query.get_or_404(barn_id)
+    barn_name = barn.name
+    
+    BarnDailyRollup.query.filter_by(barn_id=barn_id).delete(synchronize_session=False)
+    SyncTombstone.query.filter_by(barn_id=barn_id).delete(synchronize_session=False)
+    PigSectionMove.query.filter_by(barn_id=barn_id).delete(synchronize_session=False)
+    archived = db.session.query(ArchivedPig.id).filter_by(barn_id=barn_id).scalar_subquery()
+    ArchivedWeight.query.filter(ArchivedWeight.pig_id.in_(archived)).delete(synchronize_session=False)
+    ArchivedPig.query.filter_by(barn_id=barn_id).delete(synchronize_session=False)
+    db.session.delete(barn)
+    db.session.commit()
+    user_cache.invalidate()
+    barn_version_cache.invalidate()
+    
+    flash(f'Barn {barn_name} deleted successfully!', 'success')
+    return redirect(url_for('barns.manage_barns'))
+
+
+@barns_bp.route('/barn/<int:barn_id>/sections')
+@login_required
+@barn_conditional
+def manage_sections(barn_id):
+    """Manage sections in a barn"""
+    if not check_barn_access(barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    barn = Barn.query.get_or_404(barn_id)
+    section_counts = {entry['section'].id: entry['total_pigs']
+                      for entry in compute_barn_statistics([barn])[0]['sections'] if entry['section']}
+    return render_template('manage_sections.html', barn=barn, section_counts=section_counts)
+
+
+@barns_bp.route('/section/add', methods=['POST'])
+@farmer_or_admin_required
+def add_section():
+    """Add a new section to a barn"""
+    barn_id = request.form.get('barn_id')
+    
+    if not check_barn_access(int(barn_id)):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    name = request.form.get('name')
+    capacity = request.form.get('capacity')
+    
+    if Section.query.filter_by(barn_id=barn_id, name=name).first():
+        flash('Section name already exists in this barn!', 'danger')
+        return redirect(url_for('barns.manage_sections', barn_id=barn_id))
+    
+    new_section = Section(
+        barn_id=int(barn_id),
+        name=name,
+        capacity=int(capacity) if capacity else None
+    )
+    
+    db.session.add(new_section)
+    bump_barn_versions([int(barn_id)])
+    db.session.commit()
+    
+    flash(f'Section {name} added successfully!', 'success')
+    return redirect(url_for('barns.manage_sections', barn_id=barn_id))
+
+
+@barns_bp.route('/section/<int:section_id>/edit', methods=['GET', 'POST'])
+@farmer_or_admin_required
+def edit_section(section_id):
+    """Edit section details"""
+    section = Section.query.get_or_404(section_id)
+    
+    if not check_barn_access(section.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    if request.method == 'POST':
+        section.name = request.form.get('name')
+        section.capacity = int(request.form.get('capacity')) if request.form.get('capacity') else None
+        
+        bump_barn_versions([section.barn_id])
+        db.session.commit()
+        flash(f'Section {section.name} updated successfully!', 'success')
+        return redirect(url_for('barns.manage_sections', barn_id=section.barn_id))
+    
+    return render_template('edit_section.html', section=section)
+
+
+@barns_bp.route('/section/<int:section_id>/delete', methods=['POST'])
+@farmer_or_admin_required
+def delete_section(section_id):
+    """Delete section"""
+    section = Section.query.get_or_404(section_id)
+    barn_id = section.barn_id
+    
+    if not check_barn_access(barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    section_name = section.name
+    pigs = list(section.pigs)
+    pig_ids = [pig.id for pig in pigs]
+    with rollups_follow(pig_ids):
+        for pig in pigs:
+            move_pig_to_section(pig, None)
+        db.session.delete(section)
+    bump_barn_versions([barn_id], pig_ids)
+    db.session.commit()
+    
+    flash(f'Section {section_name} deleted successfully!', 'success')
+    return redirect(url_for('barns.manage_sections', barn_id=barn_id))
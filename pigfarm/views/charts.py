@@ -0,0 +1,191 @@
+"""Chart, statistics and analytics routes"""
+
+from flask import Blueprint, Response, render_template, request, url_for, jsonify
+from datetime import datetime, timedelta
+
+from ..models import Barn, Pig, Section
+from ..auth import check_barn_access, current_user, login_required
+from ..queries import profiled_query
+from ..conditional import barn_conditional
+from ..stats import compute_barn_statistics
+from ..analytics import ANALYTICS_WINDOW_MAX_DAYS, growth_analytics
+from ..rollups import ROLLUP_MAX_DAYS, ROLLUP_PERIODS, rollup_series
+from ..charts import (cached_chart_response, render_comparison_chart, render_pig_chart, versions_stamp,
+                      weight_series, weight_versions)
+
+
+charts_bp = Blueprint('charts', __name__)
+
+
+@charts_bp.route('/pig/<pig_id>/chart.png')
+@login_required
+def pig_chart(pig_id):
+    """Weight history chart image for a pig"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        return Response(status=403)
+    
+    def render():
+        dates, weight_values = weight_series([pig_id]).get(pig_id, ([], []))
+        return render_pig_chart(pig_id, dates, weight_values)
+    
+    return cached_chart_response(('pig', (pig_id,), weight_versions([pig_id])), render)
+
+
+@charts_bp.route('/charts/weight-comparison', methods=['GET', 'POST'])
+@login_required
+def weight_comparison():
+    """Compare weight progress across multiple pigs"""
+    user = current_user()
+    chart_url = None
+    
+    if user.role == 'ADMIN':
+        pigs = profiled_query('picker').all()
+    else:
+        pigs = profiled_query('picker').filter_by(barn_id=user.barn_id).all()
+    
+    if request.method == 'POST':
+        selected_pig_ids = request.form.getlist('pig_ids')
+        chart_type = request.form.get('chart_type', 'line')
+        
+        if selected_pig_ids:
+            chart_url = url_for('charts.weight_comparison_chart', pig_ids=selected_pig_ids, chart_type=chart_type,
+                                v=versions_stamp(weight_versions(selected_pig_ids)))
+    
+    return render_template('weight_comparison.html', pigs=pigs, chart_url=chart_url)
+
+
+@charts_bp.route('/charts/weight-comparison.png')
+@login_required
+def weight_comparison_chart():
+    """Weight comparison chart image for the pigs in the query string"""
+    user = current_user()
+    selected_pig_ids = request.args.getlist('pig_ids')
+    chart_type = request.args.get('chart_type', 'line')
+    
+    if not selected_pig_ids or chart_type not in ('line', 'bar'):
+        return Response(status=404)
+    
+    if user.role != 'ADMIN':
+        allowed = Pig.query.filter(Pig.id.in_(selected_pig_ids), Pig.barn_id == user.barn_id).count()
+        if allowed != len(set(selected_pig_ids)):
+            return Response(status=403)
+    
+    key = ('comparison-' + chart_type, tuple(selected_pig_ids), weight_versions(selected_pig_ids))
+    return cached_chart_response(key, lambda: render_comparison_chart(weight_series(selected_pig_ids),
+                                                                      selected_pig_ids, chart_type))
+
+
+@charts_bp.route('/charts/barn-statistics')
+@login_required
+@barn_conditional
+def barn_statistics():
+    """View statistics for barn(s)"""
+    user = current_user()
+    
+    if user.role == 'ADMIN':
+        barns = Barn.query.all()
+    else:
+        barns = Barn.query.filter_by(id=user.barn_id).all()
+    
+    stats = compute_barn_statistics(barns)
+    growth = growth_analytics(None if user.role == 'ADMIN' else [user.barn_id])
+    
+    return render_template('barn_statistics.html', stats=stats, growth=growth)
+
+
+@charts_bp.route('/api/analytics/growth')
+@login_required
+@barn_conditional
+def api_growth_analytics():
+    """Growth rates and projected market dates for live pigs, as JSON.
+
+    Query parameters: barn_id (admins; default all barns), window (days of
+    weigh-ins behind the trend), market_weight (kg), summary=1 to omit the
+    per-pig list.
+    """
+    user = current_user()
+    barn_id = request.args.get('barn_id', type=int)
+    
+    if user.role != 'ADMIN':
+        if barn_id not in (None, user.barn_id):
+            return jsonify({'error': 'Access denied'}), 403
+        barn_id = user.barn_id
+    
+    window = request.args.get('window', type=int)
+    market_weight = request.args.get('market_weight', type=float)
+    if window is not None and not 1 <= window <= ANALYTICS_WINDOW_MAX_DAYS:
+        return jsonify({'error': f'window must be between 1 and {ANALYTICS_WINDOW_MAX_DAYS} days'}), 400
+    if market_weight is not None and market_weight <= 0:
+        return jsonify({'error': 'market_weight must be positive'}), 400
+    
+    growth = growth_analytics(None if barn_id is None else [barn_id], window, market_weight)
+    
+    def serialize(pig):
+        return {**pig,
+                'latest_weight_date': pig['latest_weight_date'].strftime('%Y-%m-%d') if pig['latest_weight_date'] else None,
+                'projected_market_date': pig['projected_market_date'].strftime('%Y-%m-%d') if pig['projected_market_date'] else None}
+    
+    payload = {
+        'as_of': growth['as_of'].strftime('%Y-%m-%d'),
+        'window_days': growth['window_days'],
+        'market_weight': growth['market_weight'],
+        'barns': {barn: {**summary, 'next_to_market': [serialize(pig) for pig in summary['next_to_market']]}
+                  for barn, summary in growth['barns'].items()}
+    }
+    if not request.args.get('summary'):
+        payload['pigs'] = [serialize(pig) for pig in growth['pigs']]
+    return jsonify(payload)
+
+
+@charts_bp.route('/charts/trends')
+@login_required
+def herd_trends():
+    """Head count and live weight over time per barn and section"""
+    user = current_user()
+    
+    if user.role == 'ADMIN':
+        barns = profiled_query('barn_sections').all()
+    else:
+        barns = profiled_query('barn_sections').filter_by(id=user.barn_id).all()
+    
+    return render_template('trends.html', barns=barns)
+
+
+@charts_bp.route('/api/rollups')
+@login_required
+@barn_conditional
+def api_rollups():
+    """Daily or weekly head count and live weight from the rollup tables, as JSON.
+
+    Query parameters: barn_id (admins; default all barns), section_id (0 for
+    pigs without a section), start and end (YYYY-MM-DD; default the last
+    year), period (day or week).
+    """
+    user = current_user()
+    barn_id = request.args.get('barn_id', type=int)
+    section_id = request.args.get('section_id', type=int)
+    
+    if user.role != 'ADMIN':
+        if barn_id not in (None, user.barn_id):
+            return jsonify({'error': 'Access denied'}), 403
+        barn_id = user.barn_id
+    if section_id and not Section.query.filter_by(id=section_id, barn_id=barn_id).first():
+        return jsonify({'error': 'section_id must be a section of barn_id'}), 400
+    
+    period = request.args.get('period', 'week')
+    if period not in ROLLUP_PERIODS:
+        return jsonify({'error': f"period must be one of {', '.join(ROLLUP_PERIODS)}"}), 400
+    try:
+        start, end = (datetime.strptime(request.args[name], '%Y-%m-%d').date() if request.args.get(name) else None
+                      for name in ('start', 'end'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=364)
+    if not 0 <= (end - start).days <= ROLLUP_MAX_DAYS:
+        return jsonify({'error': f'start must be before end and at most {ROLLUP_MAX_DAYS} days earlier'}), 400
+    
+    series = rollup_series(None if barn_id is None else [barn_id], section_id, start, end, period)
+    return jsonify({'barn_id': barn_id, 'section_id': section_id, **series})
@@ -0,0 +1,79 @@
+"""Export routes"""
+
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, send_file, stream_with_context
+from datetime import datetime
+import tempfile
+
+from ..auth import current_user, login_required
+from ..exports import (EXPORT_COLUMNS, EXPORT_COLUMN_KEYS, EXPORT_FORMATS, csv_rows, export_records, gzip_stream,
+                       parse_export_options, stream_csv, write_arrow_export)
+
+
+export_bp = Blueprint('export', __name__)
+
+
+@export_bp.route('/export/csv')
+@login_required
+def export_csv():
+    """Export all pig data with complete weight history to CSV"""
+    user = current_user()
+    
+    barn_id = None if user.role == 'ADMIN' else user.barn_id
+    filename = f'pig_farm_complete_data_{datetime.now().strftime("%Y%m%d")}.csv'
+    header = [label for key, label in EXPORT_COLUMNS]
+    
+    return Response(
+        stream_with_context(stream_csv(header, csv_rows(export_records(barn_id), EXPORT_COLUMN_KEYS))),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+@export_bp.route('/export')
+@login_required
+def export_data():
+    """Export pig and weight data as CSV, gzip CSV, Parquet or Arrow with column and date filters"""
+    user = current_user()
+    export_format = request.args.get('format')
+    
+    if not export_format:
+        return render_template('export.html', columns=EXPORT_COLUMNS, formats=EXPORT_FORMATS)
+    
+    try:
+        export_format, columns, start_date, end_date = parse_export_options(request.args)
+    except ValueError as error:
+        flash(str(error), 'danger')
+        return redirect(url_for('export.export_data'))
+    
+    barn_id = None if user.role == 'ADMIN' else user.barn_id
+    records = export_records(barn_id, start_date, end_date)
+    filename = f'pig_farm_data_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+    
+    if export_format in ('csv', 'csv.gz'):
+        labels = dict(EXPORT_COLUMNS)
+        chunks = stream_csv([labels[key] for key in columns], csv_rows(records, columns))
+        if export_format == 'csv.gz':
+            return Response(
+                stream_with_context(gzip_stream(chunks)),
+                mimetype='application/gzip',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+        return Response(
+            stream_with_context(chunks),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        flash('Parquet and Arrow exports require the pyarrow package', 'danger')
+        return redirect(url_for('export.export_data'))
+    
+    # Columnar files are written in record batches to a spooled temp file,
+    # so only the compressed output (not the row data) is held at once
+    output = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    write_arrow_export(records, columns, export_format, output)
+    output.seek(0)
+    mimetype = 'application/vnd.apache.parquet' if export_format == 'parquet' else 'application/vnd.apache.arrow.stream'
+    return send_file(output, mimetype=mimetype, as_attachment=True, download_name=filename)
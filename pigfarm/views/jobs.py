@@ -0,0 +1,84 @@
+"""Background job routes"""
+
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, send_file, jsonify
+import os
+
+from ..extensions import db
+from ..models import Job
+from ..auth import current_user, login_required
+from ..jobs import JOB_LIST_LIMIT, JOB_TYPES, job_artifact_path, job_runner, job_to_dict, submit_job
+
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def own_job_or_none(job_id):
+    """The job if the current user submitted it (admins see every job)"""
+    user = current_user()
+    job = db.session.get(Job, job_id)
+    if job is None or (user.role != 'ADMIN' and job.user_id != user.id):
+        return None
+    return job
+
+
+@jobs_bp.route('/jobs', methods=['GET', 'POST'])
+@login_required
+def list_jobs():
+    """List recent background jobs, or submit one.
+
+    POST takes JSON {"type": ..., "params": {...}} and answers 202 with the
+    job; a plain form post (type plus parameter fields) redirects here.
+    """
+    user = current_user()
+    
+    if request.method == 'POST':
+        payload = request.get_json(silent=True)
+        if payload is not None:
+            name, params = payload.get('type'), payload.get('params') or {}
+        else:
+            name, params = request.form.get('type'), request.form
+        try:
+            if not isinstance(params, dict) and not hasattr(params, 'getlist'):
+                raise ValueError('params must be an object')
+            job = submit_job(user, name, params)
+        except ValueError as error:
+            if payload is not None:
+                return jsonify({'error': str(error)}), 400
+            flash(str(error), 'danger')
+            return redirect(url_for('jobs.list_jobs'))
+        if payload is not None:
+            return jsonify(job_to_dict(job)), 202
+        flash(f'{JOB_TYPES[job.job_type]["label"]} queued', 'info')
+        return redirect(url_for('jobs.list_jobs'))
+    
+    query = Job.query.order_by(Job.created_at.desc())
+    if user.role != 'ADMIN':
+        query = query.filter(Job.user_id == user.id)
+    recent = query.limit(JOB_LIST_LIMIT).all()
+    if any(job.status == 'QUEUED' for job in recent):
+        job_runner.dispatch()
+    return render_template('jobs.html', jobs=[job_to_dict(job) for job in recent])
+
+
+@jobs_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Status and progress of one job, for polling"""
+    job = own_job_or_none(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == 'QUEUED' and job_runner.dispatch():
+        db.session.refresh(job)
+    return jsonify(job_to_dict(job))
+
+
+@jobs_bp.route('/jobs/<job_id>/download')
+@login_required
+def download_job(job_id):
+    """Download a finished job's result file"""
+    job = own_job_or_none(job_id)
+    path = job_artifact_path(job_id)
+    if job is None or job.status != 'DONE' or not os.path.exists(path):
+        return Response('Job result not found', status=404)
+    return send_file(os.path.abspath(path), mimetype=job.mimetype, as_attachment=True,
+                     download_name=job.download_name)
@@ -0,0 +1,21 @@
+"""Monitoring routes"""
+
+from flask import Blueprint, Response, current_app, request
+
+from ..profiling import request_metrics
+
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+
+@monitoring_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for this worker's request figures (REQUEST_PROFILING only)"""
+    if not current_app.config['REQUEST_PROFILING']:
+        return Response(status=404)
+    
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,530 @@
+"""Dashboard, pig management and weigh-in routes"""
+
+from flask import Blueprint, abort, render_template, request, redirect, url_for, flash, jsonify
+from datetime import datetime
+
+from ..extensions import db
+from ..models import ArchivedPig, Barn, Pig, PigSectionMove, Section, Weight
+from ..auth import check_barn_access, current_user, farmer_or_admin_required, login_required
+from ..queries import profiled_query
+from ..conditional import barn_conditional, bump_barn_versions
+from ..summaries import apply_weight_to_summary, rebuild_weight_summaries
+from ..outliers import WEIGHT_FLAG_REVIEWED, check_new_weigh_ins
+from ..weigh_ins import BULK_WEIGH_MAX_ROWS, parse_import_csv, parse_weigh_in_csv, record_weigh_ins
+from ..registration import BULK_REGISTER_MAX_ROWS, PIG_IMPORT_HEADERS, register_pigs
+from ..sync import add_sync_tombstones
+from ..stats import compute_barn_statistics
+from ..rollups import move_pig_to_section, rollups_follow
+from ..listing import list_pigs, pig_to_dict
+from ..charts import WEIGHT_SERIES_MAX_PIGS, chart_cache, compact_series, versions_stamp, weight_series
+
+
+pigs_bp = Blueprint('pigs', __name__)
+
+
+@pigs_bp.route('/dashboard')
+@login_required
+@barn_conditional
+def dashboard():
+    """Main dashboard showing all pigs"""
+    user = current_user()
+    
+    if user.role == 'ADMIN':
+        barns = Barn.query.all()
+    else:  # FARMER or HELPER
+        barns = Barn.query.filter_by(id=user.barn_id).all()
+    
+    try:
+        pigs, next_cursor = list_pigs(user, request.args)
+    except ValueError:
+        abort(400)
+    barn_stats = compute_barn_statistics(barns)
+    alive_count = sum(stat['alive'] for stat in barn_stats)
+    slaughtered_count = sum(stat['slaughtered'] for stat in barn_stats)
+    total_count = sum(stat['total_pigs'] for stat in barn_stats)
+    
+    return render_template('dashboard.html', 
+                         pigs=pigs, 
+                         next_cursor=next_cursor,
+                         alive_count=alive_count, 
+                         slaughtered_count=slaughtered_count,
+                         total_count=total_count,
+                         barn_stats=barn_stats,
+                         user_role=user.role)
+
+
+@pigs_bp.route('/api/pigs')
+@login_required
+@barn_conditional
+def api_pigs():
+    """JSON listing of pigs with search, sorting and cursor pagination"""
+    user = current_user()
+    try:
+        pigs, next_cursor = list_pigs(user, request.args)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify({
+        'pigs': [pig_to_dict(pig) for pig in pigs],
+        'next_cursor': next_cursor
+    })
+
+
+@pigs_bp.route('/pig/add', methods=['GET', 'POST'])
+@farmer_or_admin_required
+def add_pig():
+    """Add a new pig"""
+    user = current_user()
+    
+    if request.method == 'POST':
+        pig_id = request.form.get('pig_id')
+        barn_id = int(request.form.get('barn_id'))
+        section_id = request.form.get('section_id')
+        dob = datetime.strptime(request.form.get('dob'), '%Y-%m-%d').date()
+        sex = request.form.get('sex')
+        breed = request.form.get('breed')
+        notes = request.form.get('notes', '')
+        
+        if not check_barn_access(barn_id):
+            flash('Access denied', 'danger')
+            return redirect(url_for('pigs.dashboard'))
+        
+        if Pig.query.get(pig_id) or ArchivedPig.query.get(pig_id):
+            flash('Pig ID already exists! Please use a different ID.', 'danger')
+            return redirect(url_for('pigs.add_pig'))
+        
+        new_pig = Pig(
+            id=pig_id,
+            barn_id=barn_id,
+            section_id=int(section_id) if section_id else None,
+            dob=dob,
+            sex=sex,
+            breed=breed,
+            notes=notes,
+            status='ALIVE'
+        )
+        
+        with rollups_follow([pig_id]):
+            db.session.add(new_pig)
+        bump_barn_versions([barn_id], [pig_id])
+        db.session.commit()
+        
+        flash(f'Pig {pig_id} added successfully!', 'success')
+        return redirect(url_for('pigs.dashboard'))
+    
+    if user.role == 'ADMIN':
+        barns = profiled_query('barn_sections').all()
+    else:
+        barns = profiled_query('barn_sections').filter_by(id=user.barn_id).all()
+    
+    return render_template('add_pig.html', barns=barns)
+
+
+@pigs_bp.route('/pig/import', methods=['GET', 'POST'])
+@farmer_or_admin_required
+def import_pigs():
+    """Register many pigs (e.g. a litter or a new barn) from a CSV, with a preview step"""
+    user = current_user()
+    
+    if user.role == 'ADMIN':
+        barns = Barn.query.all()
+    else:
+        barns = Barn.query.filter_by(id=user.barn_id).all()
+    
+    result = None
+    form = request.form
+    rows_text = ''
+    
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        rows_text = upload.read().decode('utf-8-sig') if upload and upload.filename else form.get('rows', '')
+        barn_id = form.get('barn_id', type=int)
+        
+        if not barn_id:
+            flash('Please choose a barn', 'danger')
+            return redirect(url_for('pigs.import_pigs'))
+        
+        try:
+            entries = parse_import_csv(rows_text, PIG_IMPORT_HEADERS, ('pig_id',))
+        except ValueError as error:
+            flash(str(error), 'danger')
+            return redirect(url_for('pigs.import_pigs'))
+        
+        if not entries:
+            flash('No pig rows found', 'warning')
+            return redirect(url_for('pigs.import_pigs'))
+        if len(entries) > BULK_REGISTER_MAX_ROWS:
+            flash(f'At most {BULK_REGISTER_MAX_ROWS} rows per import', 'danger')
+            return redirect(url_for('pigs.import_pigs'))
+        
+        defaults = {field: form.get(field) for field in ('dob', 'sex', 'breed', 'section')}
+        dry_run = form.get('action') != 'import'
+        result = register_pigs(user, barn_id, entries, defaults, dry_run=dry_run,
+                               skip_invalid=bool(form.get('skip_invalid')))
+        result['dry_run'] = dry_run
+        
+        if not dry_run:
+            db.session.commit()
+            if result['created']:
+                flash(f"Registered {result['created']} pigs", 'success')
+                return redirect(url_for('pigs.dashboard'))
+            flash(f"{len(result['errors'])} rows have errors - nothing was saved", 'danger')
+    
+    return render_template('import_pigs.html', barns=barns, result=result, form=form, rows_text=rows_text,
+                           max_rows=BULK_REGISTER_MAX_ROWS)
+
+
+@pigs_bp.route('/api/pigs/import', methods=['POST'])
+@farmer_or_admin_required
+def api_import_pigs():
+    """Register pigs posted as JSON: {"barn_id", "dry_run", "skip_invalid", "defaults", "pigs": [...]}"""
+    user = current_user()
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get('pigs')
+    barn_id = payload.get('barn_id')
+    
+    if not isinstance(barn_id, int):
+        return jsonify({'error': 'Expected an integer "barn_id"'}), 400
+    if not isinstance(entries, list) or not entries or not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({'error': 'Expected a non-empty "pigs" list of objects'}), 400
+    if len(entries) > BULK_REGISTER_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_REGISTER_MAX_ROWS} rows per request'}), 400
+    
+    result = register_pigs(user, barn_id, entries, payload.get('defaults') or {},
+                           dry_run=bool(payload.get('dry_run')), skip_invalid=bool(payload.get('skip_invalid')))
+    db.session.commit()
+    
+    pigs = [{**pig, 'dob': pig['dob'].strftime('%Y-%m-%d')} for pig in result['pigs']]
+    status = 422 if result['errors'] and not result['created'] and not payload.get('dry_run') else 200
+    return jsonify({'created': result['created'], 'errors': result['errors'], 'pigs': pigs}), status
+
+
+@pigs_bp.route('/pig/<pig_id>')
+@login_required
+@barn_conditional
+def pig_detail(pig_id):
+    """View pig details and weight history"""
+    pig = profiled_query('detail').filter(Pig.id == pig_id).first_or_404()
+    
+    if not check_barn_access(pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    user = current_user()
+    weights_db = Weight.query.filter_by(pig_id=pig_id).order_by(Weight.date.asc()).all()
+    
+    previous_weight = None
+    weight_history = []
+    
+    for w in weights_db:
+        if w.flag and w.flag != WEIGHT_FLAG_REVIEWED:
+            weight_history.append({
+                "id": w.id,
+                "date": w.date,
+                "weight": w.weight,
+                "diff": None,
+                "pct": None,
+                "flag": w.flag,
+                "expected_weight": w.expected_weight
+            })
+            continue
+        if previous_weight is None:
+            weight_history.append({
+                "id": w.id,
+                "date": w.date,
+                "weight": w.weight,
+                "diff": None,
+                "pct": None
+            })
+        else:
+            diff = w.weight - previous_weight
+            pct = (diff / previous_weight) * 100 if previous_weight > 0 else 0
+            weight_history.append({
+                "id": w.id,
+                "date": w.date,
+                "weight": w.weight,
+                "diff": diff,
+                "pct": pct
+            })
+        previous_weight = w.weight
+    
+    weight_history.reverse()
+    
+    chart_url = None
+    if weights_db:
+        chart_url = url_for('charts.pig_chart', pig_id=pig_id,
+                            v=versions_stamp(((pig.created_at, pig.summary.data_version if pig.summary else 0),)))
+    
+    return render_template('pig_detail.html', pig=pig, weights=weight_history, chart_url=chart_url, user_role=user.role)
+
+
+@pigs_bp.route('/api/pig/<pig_id>/weights')
+@login_required
+@barn_conditional
+def api_pig_weights(pig_id):
+    """Weight series for one pig as compact columnar JSON"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    dates, weights = weight_series([pig_id]).get(pig_id, ([], []))
+    epoch = dates[0] if dates else None
+    return jsonify({
+        'epoch': epoch.strftime('%Y-%m-%d') if epoch else None,
+        **compact_series(pig_id, dates, weights, epoch)
+    })
+
+
+@pigs_bp.route('/api/weights')
+@login_required
+@barn_conditional
+def api_weights():
+    """Weight series for several pigs (?pig_ids=A&pig_ids=B or ?pig_ids=A,B) as compact columnar JSON"""
+    user = current_user()
+    pig_ids = [pig_id for value in request.args.getlist('pig_ids') for pig_id in value.split(',') if pig_id]
+    pig_ids = list(dict.fromkeys(pig_ids))
+    
+    if not pig_ids:
+        return jsonify({'error': 'No pig_ids given'}), 400
+    if len(pig_ids) > WEIGHT_SERIES_MAX_PIGS:
+        return jsonify({'error': f'At most {WEIGHT_SERIES_MAX_PIGS} pigs per request'}), 400
+    
+    if user.role != 'ADMIN':
+        allowed = Pig.query.filter(Pig.id.in_(pig_ids), Pig.barn_id == user.barn_id).count()
+        if allowed != len(pig_ids):
+            return jsonify({'error': 'Access denied'}), 403
+    
+    series = weight_series(pig_ids)
+    first_dates = [dates[0] for dates, weights in series.values()]
+    epoch = min(first_dates) if first_dates else None
+    return jsonify({
+        'epoch': epoch.strftime('%Y-%m-%d') if epoch else None,
+        'series': [compact_series(pig_id, *series.get(pig_id, ([], [])), epoch) for pig_id in pig_ids]
+    })
+
+
+@pigs_bp.route('/pig/<pig_id>/edit', methods=['GET', 'POST'])
+@farmer_or_admin_required
+def edit_pig(pig_id):
+    """Edit pig details"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    if request.method == 'POST':
+        pig.sex = request.form.get('sex')
+        pig.breed = request.form.get('breed')
+        pig.notes = request.form.get('notes', '')
+        
+        section_id = request.form.get('section_id')
+        if section_id and int(section_id) != pig.section_id:
+            # The move counts in the rollups from today; earlier days stay with the old section
+            with rollups_follow([pig_id]):
+                move_pig_to_section(pig, int(section_id))
+        
+        bump_barn_versions([pig.barn_id], [pig_id])
+        db.session.commit()
+        flash(f'Pig {pig_id} updated successfully!', 'success')
+        return redirect(url_for('pigs.pig_detail', pig_id=pig_id))
+    
+    sections = Section.query.filter_by(barn_id=pig.barn_id).all()
+    return render_template('edit_pig.html', pig=pig, sections=sections)
+
+
+@pigs_bp.route('/pig/<pig_id>/delete', methods=['POST'])
+@farmer_or_admin_required
+def delete_pig(pig_id):
+    """Delete a pig"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    with rollups_follow([pig_id]):
+        db.session.delete(pig)
+    PigSectionMove.query.filter_by(pig_id=pig_id).delete(synchronize_session=False)
+    bump_barn_versions([pig.barn_id])
+    add_sync_tombstones({pig_id: pig.barn_id})
+    db.session.commit()
+    chart_cache.invalidate_pig(pig_id)
+    
+    flash(f'Pig {pig_id} deleted successfully!', 'success')
+    return redirect(url_for('pigs.dashboard'))
+
+
+@pigs_bp.route('/pig/<pig_id>/weigh', methods=['POST'])
+@farmer_or_admin_required
+def weigh_pig(pig_id):
+    """Add weight record for a pig"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    weight = float(request.form.get('weight'))
+    date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
+    
+    check = check_new_weigh_ins([{'pig_id': pig_id, 'weight': weight, 'date': date}])[0]
+    new_weight = Weight(
+        pig_id=pig_id,
+        weight=weight,
+        date=date,
+        flag=check['flag'],
+        expected_weight=check['expected_weight']
+    )
+    
+    with rollups_follow([pig_id]):
+        db.session.add(new_weight)
+        if not check['flag']:
+            apply_weight_to_summary(pig, weight, date)
+    bump_barn_versions([pig.barn_id], [pig_id])
+    db.session.commit()
+    chart_cache.invalidate_pig(pig_id)
+    
+    if check['flag']:
+        expected = f" (expected about {check['expected_weight']}kg)" if check['expected_weight'] is not None else ''
+        flash(f'Weight {weight}kg on {date} looks like an entry error{expected} - it is left out of '
+              f'statistics until you mark it as correct', 'warning')
+    else:
+        flash(f'Weight recorded: {weight}kg on {date}', 'success')
+    return redirect(url_for('pigs.pig_detail', pig_id=pig_id))
+
+
+@pigs_bp.route('/weigh-in/bulk', methods=['GET', 'POST'])
+@farmer_or_admin_required
+def bulk_weigh_in():
+    """Record a whole weighing session from an uploaded scale CSV"""
+    user = current_user()
+    result = None
+    
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        text = upload.read().decode('utf-8-sig') if upload and upload.filename else request.form.get('rows', '')
+        default_date = request.form.get('date') or None
+        
+        try:
+            entries = parse_weigh_in_csv(text)
+        except ValueError as error:
+            flash(str(error), 'danger')
+            return redirect(url_for('pigs.bulk_weigh_in'))
+        
+        if not entries:
+            flash('No weigh-in rows found', 'warning')
+            return redirect(url_for('pigs.bulk_weigh_in'))
+        if len(entries) > BULK_WEIGH_MAX_ROWS:
+            flash(f'At most {BULK_WEIGH_MAX_ROWS} rows per upload', 'danger')
+            return redirect(url_for('pigs.bulk_weigh_in'))
+        
+        result = record_weigh_ins(user, entries, default_date, skip_invalid=bool(request.form.get('skip_invalid')))
+        db.session.commit()
+        for pig_id in result['pig_ids']:
+            chart_cache.invalidate_pig(pig_id)
+        
+        if result['inserted']:
+            flash(f"Recorded {result['inserted']} weights", 'success')
+        if result['flagged']:
+            flash(f"{len(result['flagged'])} weights look like entry errors and are left out of statistics", 'warning')
+        if result['errors']:
+            flash(f"{len(result['errors'])} rows have errors" +
+                  ('' if result['inserted'] else ' - nothing was saved'), 'danger')
+    
+    return render_template('bulk_weigh.html', result=result, max_rows=BULK_WEIGH_MAX_ROWS)
+
+
+@pigs_bp.route('/api/weigh-ins', methods=['POST'])
+@farmer_or_admin_required
+def api_bulk_weigh_in():
+    """Record a batch of weigh-ins posted as JSON: {"date", "skip_invalid", "weights": [{"pig_id", "weight", "date"}]}"""
+    user = current_user()
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get('weights')
+    
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Expected a non-empty "weights" list'}), 400
+    if len(entries) > BULK_WEIGH_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_WEIGH_MAX_ROWS} rows per request'}), 400
+    if not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({'error': 'Each weight must be an object'}), 400
+    
+    result = record_weigh_ins(user, entries, payload.get('date'), skip_invalid=bool(payload.get('skip_invalid')))
+    db.session.commit()
+    for pig_id in result['pig_ids']:
+        chart_cache.invalidate_pig(pig_id)
+    
+    status = 422 if result['errors'] and not result['inserted'] else 200
+    return jsonify({'inserted': result['inserted'], 'errors': result['errors'], 'flagged': result['flagged']}), status
+
+
+@pigs_bp.route('/weight/<int:weight_id>/delete', methods=['POST'])
+@farmer_or_admin_required
+def delete_weight(weight_id):
+    """Delete a weight record"""
+    weight = Weight.query.get_or_404(weight_id)
+    pig_id = weight.pig_id
+    weight_date = weight.date
+    
+    if not check_barn_access(weight.pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    with rollups_follow([pig_id]):
+        db.session.delete(weight)
+        db.session.flush()
+        rebuild_weight_summaries([pig_id])
+    bump_barn_versions(pig_ids=[pig_id])
+    db.session.commit()
+    chart_cache.invalidate_pig(pig_id)
+    
+    flash(f'Weight record from {weight_date} deleted', 'success')
+    return redirect(url_for('pigs.pig_detail', pig_id=pig_id))
+
+
+@pigs_bp.route('/weight/<int:weight_id>/review', methods=['POST'])
+@farmer_or_admin_required
+def review_weight(weight_id):
+    """Confirm a flagged weight is correct so it counts towards statistics again"""
+    weight = Weight.query.get_or_404(weight_id)
+    pig_id = weight.pig_id
+    weight_date = weight.date
+    
+    if not check_barn_access(weight.pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    with rollups_follow([pig_id]):
+        weight.flag = WEIGHT_FLAG_REVIEWED
+        db.session.flush()
+        rebuild_weight_summaries([pig_id])
+    bump_barn_versions(pig_ids=[pig_id])
+    db.session.commit()
+    chart_cache.invalidate_pig(pig_id)
+    
+    flash(f'Weight record from {weight_date} marked as correct', 'success')
+    return redirect(url_for('pigs.pig_detail', pig_id=pig_id))
+
+
+@pigs_bp.route('/pig/<pig_id>/slaughter', methods=['POST'])
+@farmer_or_admin_required
+def slaughter_pig(pig_id):
+    """Mark pig as slaughtered"""
+    pig = Pig.query.get_or_404(pig_id)
+    
+    if not check_barn_access(pig.barn_id):
+        flash('Access denied', 'danger')
+        return redirect(url_for('pigs.dashboard'))
+    
+    kill_date = datetime.strptime(request.form.get('kill_date'), '%Y-%m-%d').date()
+    
+    with rollups_follow([pig_id]):
+        pig.status = 'SLAUGHTERED'
+        pig.kill_date = kill_date
+    
+    bump_barn_versions([pig.barn_id], [pig_id])
+    db.session.commit()
+    
+    flash(f'Pig {pig_id} marked as slaughtered on {kill_date}', 'info')
+    return redirect(url_for('pigs.pig_detail', pig_id=pig_id))
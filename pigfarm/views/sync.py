@@ -0,0 +1,62 @@
+"""Terminal sync routes"""
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Barn
+from ..auth import check_barn_access, current_user, farmer_or_admin_required, login_required
+from ..sync import SYNC_MAX_OPERATIONS, apply_sync_operations, prune_sync_operations, sync_roster
+from ..charts import chart_cache
+
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('/api/sync/barns/<int:barn_id>/roster')
+@login_required
+def sync_barn_roster(barn_id):
+    """Pig roster of a barn for a terminal; ?since=<version> returns only the changes after that cursor"""
+    if not check_barn_access(barn_id):
+        return jsonify({'error': 'Access denied'}), 403
+    barn = Barn.query.get_or_404(barn_id)
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be a version number'}), 400
+    return jsonify(sync_roster(barn, since))
+
+
+@sync_bp.route('/api/sync/batch', methods=['POST'])
+@farmer_or_admin_required
+def sync_batch():
+    """Apply a batch of queued terminal operations: {"operations": [{"client_id", "type", "pig_id", ...}]}"""
+    user = current_user()
+    payload = request.get_json(silent=True) or {}
+    operations = payload.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Expected a non-empty "operations" list'}), 400
+    if len(operations) > SYNC_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {SYNC_MAX_OPERATIONS} operations per request'}), 400
+    if not all(isinstance(operation, dict) for operation in operations):
+        return jsonify({'error': 'Each operation must be an object'}), 400
+    
+    try:
+        outcome = apply_sync_operations(user, operations)
+        prune_sync_operations()
+        db.session.commit()
+    except IntegrityError:
+        # A retry of this batch was applied concurrently; its operations now come back as duplicates
+        db.session.rollback()
+        outcome = apply_sync_operations(user, operations)
+        db.session.commit()
+    for pig_id in outcome['pig_ids']:
+        chart_cache.invalidate_pig(pig_id)
+    
+    counts = {status: 0 for status in ('applied', 'duplicate', 'conflict', 'rejected')}
+    for result in outcome['results']:
+        counts[result['status']] += 1
+    return jsonify({'results': outcome['results'], **counts})
@@ -0,0 +1,74 @@
+"""User management routes (admin only)"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from werkzeug.security import generate_password_hash
+import os
+
+from ..extensions import db
+from ..models import Barn, Job, SyncOperation, User
+from ..auth import admin_required, user_cache
+from ..queries import profiled_query
+from ..jobs import job_artifact_path
+
+
+users_bp = Blueprint('users', __name__)
+
+
+@users_bp.route('/users')
+@admin_required
+def manage_users():
+    """Admin only - manage users"""
+    users = profiled_query('user_admin').all()
+    barns = Barn.query.all()
+    return render_template('manage_users.html', users=users, barns=barns)
+
+
+@users_bp.route('/users/add', methods=['POST'])
+@admin_required
+def add_user():
+    """Admin only - add new user"""
+    username = request.form.get('username')
+    password = request.form.get('password')
+    role = request.form.get('role', 'HELPER')
+    barn_id = request.form.get('barn_id')
+    
+    if User.query.filter_by(username=username).first():
+        flash('Username already exists!', 'danger')
+        return redirect(url_for('users.manage_users'))
+    
+    new_user = User(
+        username=username,
+        password=generate_password_hash(password),
+        role=role,
+        barn_id=int(barn_id) if barn_id else None
+    )
+    
+    db.session.add(new_user)
+    db.session.commit()
+    user_cache.invalidate(new_user.id)
+    
+    flash(f'User {username} created successfully!', 'success')
+    return redirect(url_for('users.manage_users'))
+
+
+@users_bp.route('/users/delete/<int:user_id>', methods=['POST'])
+@admin_required
+def delete_user(user_id):
+    """Admin only - delete user"""
+    if user_id == session['user_id']:
+        flash('You cannot delete your own account!', 'danger')
+        return redirect(url_for('users.manage_users'))
+    
+    user = User.query.get_or_404(user_id)
+    username = user.username
+    for job in Job.query.filter_by(user_id=user_id):
+        if os.path.exists(job_artifact_path(job.id)):
+            os.remove(job_artifact_path(job.id))
+        db.session.delete(job)
+    SyncOperation.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.delete(user)
+    db.session.commit()
+    user_cache.invalidate(user_id)
+    
+    flash(f'User {username} deleted successfully!', 'success')
+    return redirect(url_for('users.manage_users'))
@@ -0,0 +1,202 @@
+"""Bulk weigh-in import"""
+
+from datetime import datetime
+import csv
+import re
+import io
+
+from .extensions import db
+from .models import Pig, PigSectionMove, Weight, WeightSummary
+from .database import IN_CLAUSE_CHUNK, chunked
+from .conditional import bump_barn_versions
+from .summaries import fold_weight_into_summary
+from .outliers import check_new_weigh_ins
+from .rollups import apply_rollup_changes, lock_pigs, rollups_follow
+
+
+BULK_WEIGH_MAX_ROWS = 10000
+
+
+# Accepted header spellings for scale CSV exports, after normalize_header()
+WEIGH_IN_HEADERS = {
+    'pig_id': ('pig_id', 'pig', 'id', 'tag', 'ear_tag'),
+    'weight': ('weight', 'weight_kg', 'kg'),
+    'date': ('date', 'weight_date', 'weighed_on')
+}
+
+
+def normalize_header(name):
+    """Lower-case a CSV header and collapse punctuation to underscores ('Weight (kg)' -> 'weight_kg')"""
+    return re.sub(r'[^a-z0-9]+', '_', name.strip().lower()).strip('_')
+
+
+def parse_import_csv(text, header_aliases, required_fields):
+    """Read CSV text into dicts keyed by field name.
+
+    `header_aliases` maps each field to the normalized header spellings it
+    may appear under; the first matching column wins. Missing optional
+    columns are simply absent from the returned dicts.
+    """
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if header is None:
+        return []
+
+    normalized = [normalize_header(name) for name in header]
+    positions = {}
+    for field, aliases in header_aliases.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[field] = normalized.index(alias)
+                break
+    missing = [field for field in required_fields if field not in positions]
+    if missing:
+        raise ValueError(f'CSV is missing required columns: {", ".join(missing)}')
+
+    entries = []
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        entries.append({
+            field: row[position].strip() if position < len(row) else ''
+            for field, position in positions.items()
+        })
+    return entries
+
+
+def parse_weigh_in_csv(text):
+    """Read weigh-in rows (pig ID, weight and optional date) from scale CSV text"""
+    return parse_import_csv(text, WEIGH_IN_HEADERS, ('pig_id', 'weight'))
+
+
+def appended_weigh_in_changes(rows, summaries):
+    """Rollup changes of new weigh-in `rows`, worked out from the rows alone where possible.
+
+    A live pig whose counted new weigh-ins all come on or after its latest
+    counted one (from its weight summary) and its last section move only
+    changes weight from those days on, in its current section. `summaries`
+    maps pig IDs to their WeightSummary rows as before the insert; call
+    with the pigs locked. Returns (changes, pig_ids): the pigs with any
+    other weigh-in need rollups_follow.
+    """
+    pig_rows = {}
+    for row in rows:
+        if not row['flag']:
+            pig_rows.setdefault(row['pig_id'], []).append(row)
+    pigs = {}
+    last_moves = {}
+    for chunk in chunked(list(pig_rows), IN_CLAUSE_CHUNK):
+        pigs.update((pig_id, details) for pig_id, *details in db.session.query(
+            Pig.id, Pig.barn_id, Pig.section_id, Pig.dob, Pig.kill_date).filter(Pig.id.in_(chunk)))
+        last_moves.update(db.session.query(PigSectionMove.pig_id, db.func.max(PigSectionMove.day))
+                          .filter(PigSectionMove.pig_id.in_(chunk)).group_by(PigSectionMove.pig_id))
+
+    changes = {}
+    followed = []
+    for pig_id, new_rows in pig_rows.items():
+        barn_id, section_id, dob, kill_date = pigs[pig_id]
+        summary = summaries.get(pig_id)
+        latest = (summary.latest_weight_date, summary.latest_weight) if summary and summary.weight_count else None
+        since = max(filter(None, (latest and latest[0], last_moves.get(pig_id))), default=None)
+        if kill_date is not None or any(since is not None and row['date'] < since for row in new_rows) \
+                or any(later['date'] < earlier['date'] for earlier, later in zip(new_rows, new_rows[1:])):
+            followed.append(pig_id)
+            continue
+        for row in new_rows:
+            entry = changes.setdefault((barn_id, section_id or 0, max(row['date'], dob)), [0, 0, 0.0])
+            if latest is None:
+                entry[1] += 1
+                entry[2] += row['weight']
+            else:
+                entry[2] += row['weight'] - latest[1]
+            latest = (row['date'], row['weight'])
+    return changes, followed
+
+
+def record_weigh_ins(user, entries, default_date=None, skip_invalid=False):
+    """Validate and insert a batch of weigh-ins for `user`.
+
+    Every pig ID is looked up in set-based IN queries and checked against
+    the user's barn access. When all rows are valid (or `skip_invalid` is
+    set) the batch is checked for outliers, the weights are written with one
+    executemany INSERT and the unflagged ones are folded into the weight
+    summaries and daily rollups in memory. Nothing is committed here. Returns {'inserted': n,
+    'errors': [{'row', 'pig_id', 'error'}], 'flagged': [{'row', 'pig_id',
+    'weight', 'expected_weight', 'flag'}], 'pig_ids': [...]}.
+    """
+    errors = []
+    parsed = []
+    for row_number, entry in enumerate(entries, 1):
+        pig_id = str(entry.get('pig_id') or '').strip()
+        if not pig_id:
+            errors.append({'row': row_number, 'pig_id': '', 'error': 'Missing pig ID'})
+            continue
+        try:
+            weight = float(entry.get('weight'))
+        except (TypeError, ValueError):
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Weight is not a number'})
+            continue
+        if weight <= 0:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Weight must be positive'})
+            continue
+        date = entry.get('date') or default_date
+        try:
+            if isinstance(date, str):
+                date = datetime.strptime(date.strip(), '%Y-%m-%d').date()
+            elif date is not None and not hasattr(date, 'toordinal'):
+                raise ValueError(date)
+        except ValueError:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Date must be YYYY-MM-DD'})
+            continue
+        if date is None:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Missing date'})
+            continue
+        parsed.append((row_number, pig_id, weight, date))
+
+    pig_barns = {}
+    unique_ids = list(dict.fromkeys(pig_id for _, pig_id, _, _ in parsed))
+    for chunk in chunked(unique_ids, IN_CLAUSE_CHUNK):
+        pig_barns.update(db.session.query(Pig.id, Pig.barn_id).filter(Pig.id.in_(chunk)).all())
+
+    valid = []
+    valid_rows = []
+    for row_number, pig_id, weight, date in parsed:
+        if pig_id not in pig_barns:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Unknown pig'})
+        elif user.role != 'ADMIN' and pig_barns[pig_id] != user.barn_id:
+            errors.append({'row': row_number, 'pig_id': pig_id, 'error': 'Access denied'})
+        else:
+            valid.append({'pig_id': pig_id, 'weight': weight, 'date': date})
+            valid_rows.append(row_number)
+
+    errors.sort(key=lambda error: error['row'])
+    if (errors and not skip_invalid) or not valid:
+        return {'inserted': 0, 'errors': errors, 'flagged': [], 'pig_ids': []}
+
+    check_new_weigh_ins(valid)
+    pig_ids = list(dict.fromkeys(row['pig_id'] for row in valid))
+    lock_pigs(pig_ids)
+    summaries = {}
+    for chunk in chunked(pig_ids, IN_CLAUSE_CHUNK):
+        summaries.update((summary.pig_id, summary) for summary in
+                         WeightSummary.query.filter(WeightSummary.pig_id.in_(chunk)))
+    changes, followed = appended_weigh_in_changes(valid, summaries)
+    with rollups_follow(followed):
+        db.session.execute(db.insert(Weight), valid)
+    apply_rollup_changes(changes)
+    bump_barn_versions({pig_barns[pig_id] for pig_id in pig_ids}, pig_ids)
+    flagged = [{'row': row_number, 'pig_id': row['pig_id'], 'weight': row['weight'],
+                'expected_weight': row['expected_weight'], 'flag': row['flag']}
+               for row_number, row in zip(valid_rows, valid) if row['flag']]
+
+    for row in valid:
+        if row['flag']:
+            continue
+        summary = summaries.get(row['pig_id'])
+        if summary is None:
+            summary = WeightSummary(pig_id=row['pig_id'], weight_count=0, data_version=0)
+            db.session.add(summary)
+            summaries[row['pig_id']] = summary
+        fold_weight_into_summary(summary, row['weight'], row['date'])
+
+    return {'inserted': len(valid), 'errors': errors, 'flagged': flagged, 'pig_ids': pig_ids}
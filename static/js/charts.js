@@ -0,0 +1,219 @@
+// ==========================================
+// CHARTS.JS - Client-side weight charts
+// ==========================================
+// Draws weight charts in the browser from the compact series API
+// (/api/pig/<id>/weights, /api/weights). Falls back to the server-rendered
+// PNG when Chart.js is unavailable or the request fails. Herd trends come
+// from the rollup API (/api/rollups).
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.client-chart[data-series-url]').forEach(drawPigChart);
+    initializeComparisonForm();
+    initializeTrendForm();
+});
+
+const chartColors = ['#667eea', '#f56565', '#48bb78', '#ed8936', '#38b2ac', '#9f7aea', '#ecc94b', '#4299e1', '#ed64a6', '#a0aec0'];
+
+// Convert an epoch date plus day offsets back into YYYY-MM-DD labels
+function seriesDates(epoch, days) {
+    const start = Date.parse(epoch + 'T00:00:00Z');
+    return days.map(day => new Date(start + day * 86400000).toISOString().split('T')[0]);
+}
+
+// Replace a chart container's contents with the server-rendered image
+function showFallbackImage(container, src) {
+    if (!src) return;
+    container.innerHTML = `<img src="${src}" class="img-fluid" alt="Weight Chart">`;
+}
+
+function fetchSeries(url) {
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        });
+}
+
+// Single pig bar chart
+function drawPigChart(container) {
+    const fallbackSrc = container.dataset.fallbackSrc;
+    if (typeof Chart === 'undefined') {
+        showFallbackImage(container, fallbackSrc);
+        return;
+    }
+    
+    fetchSeries(container.dataset.seriesUrl)
+        .then(data => {
+            const canvas = container.querySelector('canvas');
+            new Chart(canvas, {
+                type: 'bar',
+                data: {
+                    labels: seriesDates(data.epoch, data.days),
+                    datasets: [{
+                        label: 'Weight (kg)',
+                        data: data.weights,
+                        backgroundColor: 'rgba(102, 126, 234, 0.8)',
+                        borderColor: '#764ba2',
+                        borderWidth: 2
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    plugins: {
+                        title: { display: true, text: container.dataset.title || 'Weight Progress' },
+                        legend: { display: false },
+                        tooltip: { callbacks: { label: context => `${context.parsed.y}kg` } }
+                    },
+                    scales: {
+                        x: { title: { display: true, text: 'Date' } },
+                        y: { beginAtZero: true, title: { display: true, text: 'Weight (kg)' } }
+                    }
+                }
+            });
+        })
+        .catch(error => {
+            log(`Chart data unavailable: ${error.message}`, 'warning');
+            showFallbackImage(container, fallbackSrc);
+        });
+}
+
+// Multi-pig comparison chart - one dataset per pig over the union of weigh dates
+let comparisonChart = null;
+
+function drawComparisonChart(container, data, chartType) {
+    const labelSet = new Set();
+    const datasets = data.series.map((series, index) => {
+        const dates = seriesDates(data.epoch, series.days);
+        dates.forEach(date => labelSet.add(date));
+        const color = chartColors[index % chartColors.length];
+        return {
+            label: `Pig ${series.pig_id}`,
+            points: Object.fromEntries(dates.map((date, i) => [date, series.weights[i]])),
+            borderColor: color,
+            backgroundColor: chartType === 'bar' ? color + 'b3' : color,
+            borderWidth: 2,
+            spanGaps: true
+        };
+    });
+    const labels = Array.from(labelSet).sort();
+    datasets.forEach(dataset => {
+        dataset.data = labels.map(date => dataset.points[date] ?? null);
+        delete dataset.points;
+    });
+    
+    container.innerHTML = '<canvas></canvas>';
+    if (comparisonChart) comparisonChart.destroy();
+    comparisonChart = new Chart(container.querySelector('canvas'), {
+        type: chartType === 'bar' ? 'bar' : 'line',
+        data: { labels: labels, datasets: datasets },
+        options: {
+            responsive: true,
+            plugins: { title: { display: true, text: 'Weight Comparison Across Pigs' } },
+            scales: {
+                x: { title: { display: true, text: 'Date' } },
+                y: { title: { display: true, text: 'Weight (kg)' } }
+            }
+        }
+    });
+}
+
+// Draw the comparison in place instead of posting the form for a PNG
+function initializeComparisonForm() {
+    const form = document.getElementById('comparisonForm');
+    const container = document.getElementById('comparisonChart');
+    if (!form || !container || typeof Chart === 'undefined') return;
+    
+    form.addEventListener('submit', function(e) {
+        const pigIds = Array.from(form.querySelectorAll('input[name="pig_ids"]:checked')).map(input => input.value);
+        if (pigIds.length === 0) return; // Let the server show its empty state
+        
+        e.preventDefault();
+        const chartType = form.querySelector('#chart_type').value;
+        const params = new URLSearchParams();
+        pigIds.forEach(pigId => params.append('pig_ids', pigId));
+        
+        const submitBtn = form.querySelector('button[type="submit"]');
+        setLoadingState(submitBtn, true);
+        
+        fetchSeries(`${container.dataset.seriesUrl}?${params.toString()}`)
+            .then(data => {
+                document.getElementById('comparisonPlaceholder')?.remove();
+                container.closest('.card').style.display = '';
+                drawComparisonChart(container, data, chartType);
+            })
+            .catch(error => {
+                log(`Comparison data unavailable: ${error.message}`, 'warning');
+                form.submit();
+            })
+            .finally(() => setLoadingState(submitBtn, false));
+    });
+}
+
+// Herd trends - head count on the left axis, mean and total live weight on the right
+let trendChart = null;
+
+function drawTrendChart(container, data) {
+    container.innerHTML = '<canvas></canvas>';
+    if (trendChart) trendChart.destroy();
+    trendChart = new Chart(container.querySelector('canvas'), {
+        type: 'line',
+        data: {
+            labels: data.dates,
+            datasets: [
+                { label: 'Head count', data: data.head_count, borderColor: chartColors[0], yAxisID: 'head', pointRadius: 0 },
+                { label: 'Mean weight (kg)', data: data.mean_weight, borderColor: chartColors[2], yAxisID: 'mean', pointRadius: 0, spanGaps: true },
+                { label: 'Total live weight (t)', data: data.total_weight.map(kg => Math.round(kg / 100) / 10), borderColor: chartColors[3], yAxisID: 'total', pointRadius: 0 }
+            ]
+        },
+        options: {
+            responsive: true,
+            interaction: { mode: 'index', intersect: false },
+            plugins: { title: { display: true, text: `Herd trends (${data.period === 'day' ? 'daily' : 'weekly'})` } },
+            scales: {
+                x: { title: { display: true, text: 'Date' } },
+                head: { position: 'left', beginAtZero: true, title: { display: true, text: 'Pigs' } },
+                mean: { position: 'right', beginAtZero: true, title: { display: true, text: 'Mean weight (kg)' }, grid: { drawOnChartArea: false } },
+                total: { position: 'right', beginAtZero: true, title: { display: true, text: 'Total (t)' }, grid: { drawOnChartArea: false } }
+            }
+        }
+    });
+}
+
+// Only offer the sections of the chosen barn
+function filterTrendSections(form) {
+    const barnId = form.querySelector('#trend_barn').value;
+    const sectionSelect = form.querySelector('#trend_section');
+    sectionSelect.querySelectorAll('option[data-barn-id]').forEach(option => {
+        option.hidden = option.dataset.barnId !== barnId;
+    });
+    if (sectionSelect.selectedOptions[0]?.hidden) sectionSelect.value = '';
+}
+
+function initializeTrendForm() {
+    const form = document.getElementById('trendForm');
+    const container = document.getElementById('trendChart');
+    if (!form || !container) return;
+    if (typeof Chart === 'undefined') {
+        container.innerHTML = '<p class="text-muted">Charts are unavailable.</p>';
+        return;
+    }
+    
+    const loadTrends = function() {
+        const params = new URLSearchParams();
+        new FormData(form).forEach((value, name) => { if (value !== '') params.append(name, value); });
+        fetchSeries(`${container.dataset.seriesUrl}?${params.toString()}`)
+            .then(data => drawTrendChart(container, data))
+            .catch(error => {
+                log(`Trend data unavailable: ${error.message}`, 'warning');
+                container.innerHTML = '<p class="text-danger">Could not load trend data.</p>';
+            });
+    };
+    
+    form.querySelector('#trend_barn').addEventListener('change', () => filterTrendSections(form));
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        loadTrends();
+    });
+    filterTrendSections(form);
+    loadTrends();
+}
@@ -5,97 +5,80 @@
 document.addEventListener('DOMContentLoaded', function() {
     initializeSearch();
     initializeTableSorting();
+    initializeLoadMore();
     initializeExportButton();
     animateCounters();
 });
 
-// Real-time table search
+// Current listing state - mirrors the query parameters of /api/pigs
+const pigListing = {
+    q: '',
+    status: '',
+    sort: 'id',
+    dir: 'asc',
+    cursor: null,
+    request: 0
+};
+
+// Server-side search with debounced requests
 function initializeSearch() {
-    const table = document.querySelector('table tbody');
+    const table = document.getElementById('pigsTableBody');
     if (!table) return;
     
-    const cardHeader = document.querySelector('.card-header');
+    const cardHeader = document.querySelector('#pigsCard .card-header');
     if (!cardHeader) return;
     
     const searchHTML = `
-        <div class="d-flex justify-content-between align-items-center">
+        <div class="d-flex justify-content-between align-items-center w-100 gap-2">
             <h5 class="mb-0">All Pigs</h5>
-            <div class="input-group" style="max-width: 300px;">
-                <span class="input-group-text"><i class="bi bi-search"></i></span>
-                <input type="text" id="pigSearch" class="form-control" placeholder="Search pigs...">
+            <div class="d-flex gap-2">
+                <select id="pigStatusFilter" class="form-select" style="max-width: 160px;">
+                    <option value="">All statuses</option>
+                    <option value="ALIVE">Alive</option>
+                    <option value="SLAUGHTERED">Slaughtered</option>
+                </select>
+                <div class="input-group" style="max-width: 300px;">
+                    <span class="input-group-text"><i class="bi bi-search"></i></span>
+                    <input type="text" id="pigSearch" class="form-control" placeholder="ID, breed or section starts with...">
+                </div>
             </div>
         </div>
     `;
     cardHeader.innerHTML = searchHTML;
     
-    // Search functionality
-    document.getElementById('pigSearch').addEventListener('keyup', function() {
-        const searchValue = this.value.toLowerCase();
-        const rows = table.querySelectorAll('tr');
-        let visibleCount = 0;
-        
-        rows.forEach(row => {
-            if (row.querySelector('td[colspan]')) return; // Skip "no data" row
-            
-            const text = row.textContent.toLowerCase();
-            if (text.includes(searchValue)) {
-                row.style.display = '';
-                visibleCount++;
-            } else {
-                row.style.display = 'none';
-            }
-        });
-        
-        // Show "no results" message if needed
-        if (visibleCount === 0 && searchValue !== '') {
-            if (!document.getElementById('noResults')) {
-                const noResultsRow = document.createElement('tr');
-                noResultsRow.id = 'noResults';
-                noResultsRow.innerHTML = `
-                    <td colspan="7" class="text-center text-muted py-4">
-                        <i class="bi bi-search" style="font-size: 2rem;"></i><br>
-                        No pigs found matching "${searchValue}"
-                    </td>
-                `;
-                table.appendChild(noResultsRow);
-            }
-        } else {
-            const noResults = document.getElementById('noResults');
-            if (noResults) noResults.remove();
-        }
+    const runSearch = debounce(function() {
+        pigListing.q = document.getElementById('pigSearch').value.trim();
+        reloadPigs();
+    }, 300);
+    
+    document.getElementById('pigSearch').addEventListener('input', runSearch);
+    document.getElementById('pigStatusFilter').addEventListener('change', function() {
+        pigListing.status = this.value;
+        reloadPigs();
     });
 }
 
-// Table sorting
+// Table sorting - each click asks the server for the first page in the new order
 function initializeTableSorting() {
-    const headers = document.querySelectorAll('thead th');
-    
-    headers.forEach((header, index) => {
-        if (index < headers.length - 1) { // Skip "Actions" column
-            header.style.cursor = 'pointer';
-            header.classList.add('sortable');
-            header.innerHTML += ' <i class="bi bi-chevron-expand sort-icon" style="font-size: 0.7rem; opacity: 0.5;"></i>';
-            
-            header.addEventListener('click', function() {
-                sortTable(index, this);
-            });
-        }
+    const headers = document.querySelectorAll('#pigsCard thead th[data-sort]');
+    
+    headers.forEach(header => {
+        header.style.cursor = 'pointer';
+        header.classList.add('sortable');
+        header.innerHTML += ' <i class="bi bi-chevron-expand sort-icon" style="font-size: 0.7rem; opacity: 0.5;"></i>';
+        
+        header.addEventListener('click', function() {
+            sortTable(this.dataset.sort, this);
+        });
     });
 }
 
-function sortTable(columnIndex, headerElement) {
-    const table = document.querySelector('table');
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    
-    // Don't sort if "no pigs" message is showing
-    if (rows[0]?.querySelector('td[colspan]')) return;
-    
+function sortTable(sortKey, headerElement) {
     // Determine sort direction
     const isAscending = headerElement.classList.contains('sort-asc');
     
     // Remove all sort classes
-    document.querySelectorAll('th').forEach(th => {
+    document.querySelectorAll('#pigsCard th').forEach(th => {
         th.classList.remove('sort-asc', 'sort-desc');
         const icon = th.querySelector('.sort-icon');
         if (icon) icon.className = 'bi bi-chevron-expand sort-icon';
@@ -110,27 +93,107 @@ function sortTable(columnIndex, headerElement) {
         headerElement.querySelector('.sort-icon').className = 'bi bi-chevron-up sort-icon';
     }
     
-    // Sort rows
-    rows.sort((a, b) => {
-        const aValue = a.querySelectorAll('td')[columnIndex]?.textContent.trim() || '';
-        const bValue = b.querySelectorAll('td')[columnIndex]?.textContent.trim() || '';
-        
-        // Check if numeric
-        const aNum = parseFloat(aValue);
-        const bNum = parseFloat(bValue);
-        
-        if (!isNaN(aNum) && !isNaN(bNum)) {
-            return isAscending ? bNum - aNum : aNum - bNum;
-        }
-        
-        // String comparison
-        return isAscending ? 
-            bValue.localeCompare(aValue) : 
-            aValue.localeCompare(bValue);
+    pigListing.sort = sortKey;
+    pigListing.dir = isAscending ? 'desc' : 'asc';
+    reloadPigs();
+}
+
+// "Load more" fetches the next page using the cursor from the previous one
+function initializeLoadMore() {
+    const button = document.getElementById('loadMorePigs');
+    if (!button) return;
+    
+    pigListing.cursor = button.dataset.cursor || null;
+    
+    button.addEventListener('click', function() {
+        fetchPigs(true);
     });
+}
+
+function reloadPigs() {
+    pigListing.cursor = null;
+    fetchPigs(false);
+}
+
+function fetchPigs(append) {
+    const card = document.getElementById('pigsCard');
+    const button = document.getElementById('loadMorePigs');
+    if (!card) return;
+    
+    const params = new URLSearchParams({ sort: pigListing.sort, dir: pigListing.dir });
+    if (pigListing.q) params.set('q', pigListing.q);
+    if (pigListing.status) params.set('status', pigListing.status);
+    if (append && pigListing.cursor) params.set('cursor', pigListing.cursor);
     
-    // Re-append sorted rows
-    rows.forEach(row => tbody.appendChild(row));
+    // Ignore responses that arrive after a newer request was issued
+    const requestId = ++pigListing.request;
+    if (append) setLoadingState(button, true);
+    
+    fetch(`${card.dataset.apiUrl}?${params.toString()}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            if (requestId !== pigListing.request) return;
+            renderPigRows(data.pigs, append);
+            pigListing.cursor = data.next_cursor;
+            button.style.display = data.next_cursor ? '' : 'none';
+        })
+        .catch(error => {
+            log(`Failed to load pigs: ${error.message}`, 'error');
+            showToast('Could not load pigs', 'danger');
+        })
+        .finally(() => {
+            if (append) setLoadingState(button, false);
+        });
+}
+
+function renderPigRows(pigs, append) {
+    const tbody = document.getElementById('pigsTableBody');
+    
+    if (!append) tbody.innerHTML = '';
+    
+    if (!append && pigs.length === 0) {
+        const searchValue = escapeHtml(pigListing.q);
+        tbody.innerHTML = `
+            <tr id="noResults">
+                <td colspan="7" class="text-center text-muted py-4">
+                    <i class="bi bi-search" style="font-size: 2rem;"></i><br>
+                    ${searchValue ? `No pigs found matching "${searchValue}"` : 'No pigs found'}
+                </td>
+            </tr>
+        `;
+        return;
+    }
+    
+    const rowsHTML = pigs.map(pig => `
+        <tr>
+            <td><strong>${escapeHtml(pig.id)}</strong></td>
+            <td>${escapeHtml(pig.barn)}</td>
+            <td>${pig.section ? escapeHtml(pig.section) : '-'}</td>
+            <td>${escapeHtml(pig.sex)}</td>
+            <td>${escapeHtml(pig.breed)}</td>
+            <td>
+                ${pig.status === 'ALIVE'
+                    ? '<span class="badge bg-success">ALIVE</span>'
+                    : '<span class="badge bg-danger">SLAUGHTERED</span>'}
+            </td>
+            <td>
+                <a href="${pig.url}" class="btn btn-sm btn-info">
+                    <i class="bi bi-eye"></i> View
+                </a>
+            </td>
+        </tr>
+    `).join('');
+    
+    tbody.insertAdjacentHTML('beforeend', rowsHTML);
+}
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
 }
 
 // Export button animation
@@ -178,18 +241,8 @@ function animateCounters() {
 
 // Filter by status
 function filterByStatus(status) {
-    const rows = document.querySelectorAll('tbody tr');
-    
-    rows.forEach(row => {
-        if (status === 'ALL') {
-            row.style.display = '';
-        } else {
-            const badge = row.querySelector('.badge');
-            if (badge && badge.textContent.trim() === status) {
-                row.style.display = '';
-            } else {
-                row.style.display = 'none';
-            }
-        }
-    });
+    pigListing.status = status === 'ALL' ? '' : status;
+    const select = document.getElementById('pigStatusFilter');
+    if (select) select.value = pigListing.status;
+    reloadPigs();
 }
\ No newline at end of file
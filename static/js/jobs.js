@@ -0,0 +1,120 @@
+// ==========================================
+// JOBS.JS - Background job submission and progress
+// ==========================================
+// Buttons with data-job-type submit a background job (POST to the jobs URL in
+// their data-job-submit-url) and show its progress in the element named by
+// data-job-target until the result is ready to download. Parameters come from
+// data-job-params (JSON) and, when data-job-form names a form, from that
+// form's fields. Rows on the jobs page
+// (data-job-status-url) keep polling while their job is queued or running.
+
+const JOB_POLL_INTERVAL = 1000;
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-job-type]').forEach(button => {
+        button.addEventListener('click', function(event) {
+            event.preventDefault();
+            startJobFromButton(button);
+        });
+    });
+    document.querySelectorAll('[data-job-status-url]').forEach(row => {
+        if (row.dataset.jobStatus === 'QUEUED' || row.dataset.jobStatus === 'RUNNING') {
+            pollJob(row.dataset.jobStatusUrl, job => renderJobRow(row, job));
+        }
+    });
+});
+
+// Collect form fields into an object; repeated names (checkboxes) become arrays
+function formParams(form) {
+    const params = {};
+    new FormData(form).forEach((value, key) => {
+        if (value === '') return;
+        if (form.querySelectorAll(`[name="${key}"][type="checkbox"]`).length) {
+            (params[key] = params[key] || []).push(value);
+        } else {
+            params[key] = value;
+        }
+    });
+    return params;
+}
+
+function startJobFromButton(button) {
+    let params = JSON.parse(button.dataset.jobParams || '{}');
+    if (button.dataset.jobForm) {
+        params = Object.assign(formParams(document.getElementById(button.dataset.jobForm)), params);
+    }
+    const target = document.getElementById(button.dataset.jobTarget);
+    button.disabled = true;
+    submitJob(button.dataset.jobSubmitUrl, button.dataset.jobType, params)
+        .then(job => {
+            renderJobStatus(target, job);
+            pollJob(job.status_url, job => renderJobStatus(target, job));
+        })
+        .catch(error => showToast(error.message, 'danger'))
+        .finally(() => { button.disabled = false; });
+}
+
+function submitJob(url, type, params) {
+    return fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+        body: JSON.stringify({ type: type, params: params })
+    }).then(response => response.json().then(body => {
+        if (!response.ok) throw new Error(body.error || `HTTP ${response.status}`);
+        return body;
+    }));
+}
+
+// Poll a job's status URL until it finishes, calling onUpdate with each status
+function pollJob(url, onUpdate) {
+    fetchJob(url).then(job => {
+        onUpdate(job);
+        if (job.status === 'QUEUED' || job.status === 'RUNNING') {
+            setTimeout(() => pollJob(url, onUpdate), JOB_POLL_INTERVAL);
+        } else if (job.status === 'FAILED') {
+            showToast(`${job.label} failed: ${job.message}`, 'danger');
+        }
+    }).catch(() => setTimeout(() => pollJob(url, onUpdate), JOB_POLL_INTERVAL * 5));
+}
+
+function fetchJob(url) {
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        });
+}
+
+function jobProgressBar(job) {
+    const percent = Math.round(job.progress * 100);
+    const style = job.status === 'FAILED' ? 'bg-danger' : job.status === 'DONE' ? 'bg-success' : 'progress-bar-striped progress-bar-animated';
+    return `<div class="progress" style="height: 1.25rem;">
+                <div class="progress-bar ${style}" role="progressbar" style="width: ${job.status === 'QUEUED' ? 100 : percent}%">
+                    ${job.status === 'QUEUED' ? 'Queued' : percent + '%'}
+                </div>
+            </div>`;
+}
+
+function jobDownloadLink(job) {
+    return job.download_url
+        ? `<a href="${job.download_url}" class="btn btn-sm btn-success"><i class="bi bi-download"></i> ${job.download_name}</a>`
+        : '';
+}
+
+// Progress bar, message and download link for a job started from a button
+function renderJobStatus(target, job) {
+    if (!target) return;
+    target.innerHTML = `${jobProgressBar(job)}
+        <div class="d-flex justify-content-between align-items-center mt-2">
+            <small class="text-muted">${job.message || ''}</small>
+            ${jobDownloadLink(job)}
+        </div>`;
+}
+
+function renderJobRow(row, job) {
+    row.dataset.jobStatus = job.status;
+    row.querySelector('.job-status').textContent = job.status;
+    row.querySelector('.job-progress').innerHTML = jobProgressBar(job);
+    row.querySelector('.job-message').textContent = job.message || '';
+    row.querySelector('.job-download').innerHTML = jobDownloadLink(job);
+}
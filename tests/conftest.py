@@ -0,0 +1,83 @@
+import random
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from pigfarm.benchmarks import seed_farm_data
+from pigfarm.extensions import db
+from pigfarm.migrations import init_db
+from pigfarm.models import Barn, BarnDailyRollup, User, WeightSummary
+from pigfarm.rollups import rebuild_rollups
+from pigfarm.summaries import rebuild_weight_summaries
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh SQLite file with the schema and the default admin"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "pigfarm.db"}',
+        'JOB_DIR': str(tmp_path / 'jobs'),
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+    })
+    init_db(app)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def farm(app):
+    """`app` with a small synthetic farm: 3 barns of 40 pigs, a farmer per barn and a helper"""
+    with app.app_context():
+        seed_farm_data(3, 2, 40, 7, 240, random.Random(1), prefix='T')
+        barn = Barn.query.order_by(Barn.id).first()
+        db.session.add(User(username='helper', password=generate_password_hash('helper'),
+                            role='HELPER', barn_id=barn.id))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client_for(app):
+    """Test client logged in as the named user"""
+    def log_in(username):
+        client = app.test_client()
+        with app.app_context():
+            user = User.query.filter_by(username=username).one()
+            login = {'user_id': user.id, 'username': user.username, 'role': user.role, 'barn_id': user.barn_id}
+        with client.session_transaction() as client_session:
+            client_session.update(login)
+        return client
+    return log_in
+
+
+def weight_summary_rows():
+    return {row.pig_id: (row.weight_count, row.first_weight, row.first_weight_date, row.latest_weight,
+                         row.latest_weight_date, None if row.avg_daily_gain is None else round(row.avg_daily_gain, 9))
+            for row in WeightSummary.query}
+
+
+def rollup_rows():
+    return {(row.barn_id, row.section_id, row.day): (row.head_change, row.weighed_change, row.weight_change)
+            for row in BarnDailyRollup.query
+            if row.head_change or row.weighed_change or abs(row.weight_change) > 1e-6}
+
+
+@pytest.fixture
+def assert_matches_rebuild(app):
+    """Check, in an app context, that the summaries and rollups kept up on write equal a full rebuild"""
+    def check():
+        db.session.expire_all()
+        summaries, rollups = weight_summary_rows(), rollup_rows()
+        rebuild_weight_summaries()
+        rebuild_rollups()
+        rebuilt_summaries, rebuilt_rollups = weight_summary_rows(), rollup_rows()
+        db.session.rollback()
+        assert summaries == rebuilt_summaries
+        assert rollups.keys() == rebuilt_rollups.keys()
+        for key, (head, weighed, weight) in rollups.items():
+            assert rebuilt_rollups[key][:2] == (head, weighed), key
+            assert abs(rebuilt_rollups[key][2] - weight) < 1e-6, key
+    return check
@@ -0,0 +1,25 @@
+"""Cached chart images and their ETags"""
+from pigfarm.extensions import db
+from pigfarm.models import Barn
+
+PIG = {'pig_id': 'C1', 'dob': '2024-05-01', 'sex': 'F', 'breed': 'Duroc'}
+
+
+def register_and_weigh(client, barn_id):
+    assert client.post('/api/pigs/import', json={'barn_id': barn_id, 'pigs': [PIG]}).status_code == 200
+    assert client.post('/pig/C1/weigh', data={'weight': '30', 'date': '2024-06-01'}).status_code == 302
+
+
+def test_re_registered_pig_does_not_reuse_the_old_chart(farm, client_for):
+    with farm.app_context():
+        barn_id = db.session.query(db.func.min(Barn.id)).scalar()
+    client = client_for('admin')
+    register_and_weigh(client, barn_id)
+    first = client.get('/pig/C1/chart.png')
+    assert first.status_code == 200
+
+    assert client.post('/pig/C1/delete').status_code == 302
+    register_and_weigh(client, barn_id)
+    again = client.get('/pig/C1/chart.png', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200
+    assert again.headers['ETag'] != first.headers['ETag']
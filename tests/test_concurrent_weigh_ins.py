@@ -0,0 +1,62 @@
+"""Weigh-ins posted from many threads at once against the SQLite file database"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pigfarm.extensions import db
+from pigfarm.models import Pig, User, Weight, WeightSummary
+from pigfarm.outliers import counted_weight
+
+WRITERS = 8
+WEIGH_INS_PER_WRITER = 15
+
+
+def post_weigh_ins(app, login, pig_ids, number):
+    """One terminal: post its weigh-ins in turn and return [(pig_id, weight, status or error)]"""
+    client = app.test_client()
+    with client.session_transaction() as client_session:
+        client_session.update(login)
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    outcomes = []
+    for index in range(WEIGH_INS_PER_WRITER):
+        pig_id = pig_ids[(number + index) % len(pig_ids)]
+        weight = round(60 + number + index / 100, 2)
+        try:
+            outcome = client.post(f'/pig/{pig_id}/weigh', data={'weight': str(weight), 'date': today}).status_code
+        except Exception as error:
+            outcome = repr(error)
+        outcomes.append((pig_id, weight, outcome))
+    return outcomes
+
+
+def test_concurrent_weigh_ins_all_land(farm, assert_matches_rebuild):
+    farm.config['PROPAGATE_EXCEPTIONS'] = True
+    with farm.app_context():
+        user = User.query.filter_by(role='ADMIN').first()
+        login = {'user_id': user.id, 'username': user.username, 'role': user.role, 'barn_id': user.barn_id}
+        # A few pigs shared by every writer, so their summaries and rollup days are contended
+        pig_ids = [pig_id for (pig_id,) in db.session.query(Pig.id).filter(Pig.status == 'ALIVE')
+                   .order_by(Pig.id).limit(5)]
+        before = {pig_id: count for pig_id, count in db.session.query(Weight.pig_id, db.func.count())
+                  .filter(Weight.pig_id.in_(pig_ids)).group_by(Weight.pig_id)}
+        last_weight_id = db.session.query(db.func.max(Weight.id)).scalar()
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        outcomes = [outcome for result in pool.map(lambda number: post_weigh_ins(farm, login, pig_ids, number),
+                                                   range(WRITERS)) for outcome in result]
+
+    failed = [outcome for outcome in outcomes if outcome[2] != 302]
+    assert not failed
+    with farm.app_context():
+        recorded = sorted((row.pig_id, row.weight) for row in Weight.query.filter(Weight.id > last_weight_id))
+        assert recorded == sorted((pig_id, weight) for pig_id, weight, _ in outcomes)
+
+        # No lost updates: every summary counts each of its pig's weigh-ins
+        counted = dict(db.session.query(Weight.pig_id, db.func.count()).filter(
+            Weight.pig_id.in_(pig_ids), counted_weight()).group_by(Weight.pig_id))
+        summaries = dict(db.session.query(WeightSummary.pig_id, WeightSummary.weight_count)
+                         .filter(WeightSummary.pig_id.in_(pig_ids)))
+        assert summaries == counted
+        assert sum(counted.values()) <= sum(before.values()) + len(outcomes)
+
+        # The summaries and rollups written concurrently match a rebuild from the stored history
+        assert_matches_rebuild()
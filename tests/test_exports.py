@@ -0,0 +1,30 @@
+"""Export records: one row per weigh-in with the change from the previous counted one"""
+from datetime import date
+
+from pigfarm.exports import EXPORT_COLUMN_KEYS, export_records
+from pigfarm.extensions import db
+from pigfarm.models import Barn, Pig, Weight
+
+
+def test_flagged_weigh_ins_are_left_out_of_the_change_chain(farm):
+    with farm.app_context():
+        barn_id = db.session.query(db.func.min(Barn.id)).scalar()
+        db.session.add(Pig(id='X1', barn_id=barn_id, dob=date(2024, 1, 1), sex='Female', breed='Duroc'))
+        db.session.add_all([
+            Weight(pig_id='X1', weight=20.0, date=date(2024, 2, 1)),
+            Weight(pig_id='X1', weight=200.0, date=date(2024, 2, 8), flag='trajectory'),
+            Weight(pig_id='X1', weight=25.0, date=date(2024, 2, 15)),
+            Weight(pig_id='X1', weight=27.0, date=date(2024, 2, 22), flag='reviewed'),
+        ])
+        db.session.commit()
+
+        columns = [EXPORT_COLUMN_KEYS.index(key)
+                   for key in ('weight', 'weight_flag', 'weight_change', 'weight_change_pct')]
+        rows = [tuple(record[index] for index in columns)
+                for record in export_records(barn_id) if record[0] == 'X1']
+        assert rows == [
+            (20.0, None, None, None),
+            (200.0, 'trajectory', None, None),
+            (25.0, None, 5.0, 25.0),
+            (27.0, 'reviewed', 2.0, 8.0),
+        ]
@@ -0,0 +1,31 @@
+"""Cursor pagination of the pig listing"""
+import base64
+import json
+
+import pytest
+
+
+def cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def test_pages_follow_each_other(farm, client_for):
+    client = client_for('admin')
+    first = client.get('/api/pigs?sort=breed&limit=30').get_json()
+    second = client.get(f'/api/pigs?sort=breed&limit=30&cursor={first["next_cursor"]}').get_json()
+    everything = client.get('/api/pigs?sort=breed&limit=60').get_json()
+    assert [pig['id'] for pig in first['pigs'] + second['pigs']] == [pig['id'] for pig in everything['pigs']]
+
+
+@pytest.mark.parametrize('bad_cursor', [
+    cursor(['Duroc'], 'T001-00001'),
+    cursor({'a': 1}, 'T001-00001'),
+    cursor('Duroc', ['T001-00001']),
+    cursor(3, 'T001-00001'),
+    cursor('Duroc'),
+    'not base64 at all!',
+])
+def test_malformed_cursor_is_a_bad_request(farm, client_for, bad_cursor):
+    client = client_for('admin')
+    assert client.get('/api/pigs', query_string={'sort': 'breed', 'cursor': bad_cursor}).status_code == 400
+    assert client.get('/dashboard', query_string={'sort': 'breed', 'cursor': bad_cursor}).status_code == 400
@@ -0,0 +1,95 @@
+"""Upgrading a database created by the first release, before any migration existed"""
+import sqlite3
+
+from app import create_app
+from pigfarm.extensions import db
+from pigfarm.migrations import MIGRATIONS, init_db, pending_migrations
+from pigfarm.models import BarnDailyRollup, Pig, Weight, WeightSummary
+
+BASELINE_SCHEMA = """
+CREATE TABLE barn (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, location VARCHAR(200), capacity INTEGER,
+    created_at DATETIME, PRIMARY KEY (id), UNIQUE (name)
+);
+CREATE TABLE user (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, password VARCHAR(200) NOT NULL, role VARCHAR(20),
+    barn_id INTEGER, PRIMARY KEY (id), UNIQUE (username), FOREIGN KEY(barn_id) REFERENCES barn (id)
+);
+CREATE TABLE section (
+    id INTEGER NOT NULL, barn_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, capacity INTEGER,
+    PRIMARY KEY (id), CONSTRAINT _barn_section_uc UNIQUE (barn_id, name), FOREIGN KEY(barn_id) REFERENCES barn (id)
+);
+CREATE TABLE pig (
+    id VARCHAR(50) NOT NULL, barn_id INTEGER NOT NULL, section_id INTEGER, dob DATE NOT NULL,
+    sex VARCHAR(10) NOT NULL, breed VARCHAR(50) NOT NULL, kill_date DATE, status VARCHAR(20), notes TEXT,
+    created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(barn_id) REFERENCES barn (id),
+    FOREIGN KEY(section_id) REFERENCES section (id)
+);
+CREATE TABLE weight (
+    id INTEGER NOT NULL, pig_id VARCHAR(50) NOT NULL, weight FLOAT NOT NULL, date DATE NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(pig_id) REFERENCES pig (id)
+);
+INSERT INTO barn (id, name) VALUES (1, 'North');
+INSERT INTO section (id, barn_id, name) VALUES (1, 1, 'Pen A');
+INSERT INTO pig (id, barn_id, section_id, dob, sex, breed, status)
+    VALUES ('P1', 1, 1, '2024-01-01', 'F', 'Duroc', 'ALIVE');
+INSERT INTO weight (id, pig_id, weight, date) VALUES (1, 'P1', 20.0, '2024-02-01'), (2, 'P1', 35.5, '2024-03-01');
+"""
+
+
+def schema(path):
+    """{table: {column names}} and the named indexes of an SQLite file"""
+    connection = sqlite3.connect(path)
+    try:
+        tables = [name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        columns = {table: {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')}
+                   for table in tables}
+        indexes = {name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    finally:
+        connection.close()
+    return columns, indexes
+
+
+def make_app(path, tmp_path):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'JOB_DIR': str(tmp_path / 'jobs'),
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+    })
+
+
+def test_baseline_database_migrates_to_the_current_schema(tmp_path):
+    baseline = tmp_path / 'baseline.db'
+    connection = sqlite3.connect(baseline)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+
+    app = make_app(baseline, tmp_path)
+    init_db(app)
+    with app.app_context():
+        assert pending_migrations() == []
+        pig = db.session.get(Pig, 'P1')
+        assert (pig.barn_id, pig.section_id, pig.sync_version) == (1, 1, 0)
+        assert [weight.flag for weight in Weight.query.order_by(Weight.id)] == [None, None]
+        assert db.session.get(WeightSummary, 'P1').latest_weight == 35.5
+        assert BarnDailyRollup.query.count() > 0
+        db.engine.dispose()
+
+    fresh = tmp_path / 'fresh.db'
+    app = make_app(fresh, tmp_path)
+    init_db(app)
+    with app.app_context():
+        db.engine.dispose()
+    assert schema(baseline) == schema(fresh)
+
+
+def test_migrations_are_recorded_once(tmp_path):
+    app = make_app(tmp_path / 'fresh.db', tmp_path)
+    init_db(app)
+    init_db(app)
+    with app.app_context():
+        assert pending_migrations() == []
+        assert db.session.execute(db.text('SELECT count(*) FROM schema_migration')).scalar() == len(MIGRATIONS)
+        db.engine.dispose()
@@ -0,0 +1,26 @@
+"""Bulk pig registration through the JSON API"""
+from pigfarm.extensions import db
+from pigfarm.models import Barn, Pig
+
+LITTER = [{'pig_id': 'L1', 'dob': '2024-05-01', 'sex': 'F', 'breed': 'Duroc'},
+          {'pig_id': 'L2', 'dob': '2024-05-01', 'sex': 'M', 'breed': 'Duroc'}]
+
+
+def test_import_into_unknown_barn_is_rejected(farm, client_for):
+    with farm.app_context():
+        missing = db.session.query(db.func.max(Barn.id)).scalar() + 1
+    response = client_for('admin').post('/api/pigs/import', json={'barn_id': missing, 'pigs': LITTER})
+    assert response.status_code == 422
+    assert response.get_json()['errors'] == [{'row': 0, 'pig_id': '', 'error': f'Unknown barn {missing}'}]
+    with farm.app_context():
+        assert db.session.get(Pig, 'L1') is None
+
+
+def test_import_into_existing_barn(farm, client_for):
+    with farm.app_context():
+        barn_id = db.session.query(db.func.min(Barn.id)).scalar()
+    response = client_for('admin').post('/api/pigs/import', json={'barn_id': barn_id, 'pigs': LITTER})
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 2
+    with farm.app_context():
+        assert {pig.barn_id for pig in Pig.query.filter(Pig.id.in_(['L1', 'L2']))} == {barn_id}
@@ -0,0 +1,109 @@
+"""SQL statements per protected page: each route has a budget it must stay within"""
+import random
+
+from flask import current_app, has_request_context
+from sqlalchemy import event
+
+from pigfarm.auth import user_cache
+from pigfarm.benchmarks import seed_farm_data
+from pigfarm.charts import chart_cache
+from pigfarm.extensions import db
+from pigfarm.models import Barn, Pig, User
+
+# Most statements any role may cause on each route, with {barn_id} and {pig_id}
+# standing for the first barn and pig. Redirects (pages a role may not open)
+# stay well below these. Streamed bodies are counted too.
+ROUTE_BUDGETS = {
+    '/dashboard': 6,
+    '/api/pigs': 3,
+    '/api/pigs?status=ALIVE&sort=breed': 3,
+    '/pig/add': 3,
+    '/pig/import': 2,
+    '/weigh-in/bulk': 1,
+    '/charts/weight-comparison': 2,
+    '/charts/barn-statistics': 7,
+    '/export': 1,
+    '/export?format=csv': 3,
+    '/export/csv': 3,
+    '/api/analytics/growth': 4,
+    '/charts/trends': 3,
+    '/api/rollups?period=day': 3,
+    '/jobs': 2,
+    '/barns': 4,
+    '/users': 3,
+    '/barn/{barn_id}/sections': 6,
+    '/api/pigs?barn_id={barn_id}&status=ALIVE': 3,
+    '/api/sync/barns/{barn_id}/roster': 4,
+    '/api/sync/barns/{barn_id}/roster?since=0': 5,
+    '/pig/{pig_id}': 4,
+    '/pig/{pig_id}/edit': 3,
+    '/api/pig/{pig_id}/weights': 4,
+    '/pig/{pig_id}/chart.png': 4,
+    '/api/weights?pig_ids={pig_id}': 4,
+}
+
+
+def protected_route_requests(paths):
+    """Yield (role, path, response) for each path, as the first user of each role.
+
+    Each request runs in a fresh app context so it gets its own `g`, as it
+    would when served, and streamed bodies are read inside it.
+    """
+    app = current_app._get_current_object()
+    for role in ['ADMIN', 'FARMER', 'HELPER']:
+        user = User.query.filter_by(role=role).order_by(User.id).first()
+        client = app.test_client()
+        with client.session_transaction() as client_session:
+            client_session.update(user_id=user.id, username=user.username, role=user.role, barn_id=user.barn_id)
+        for path in paths:
+            user_cache.invalidate()
+            with app.app_context():
+                response = client.get(path)
+                response.get_data()
+            yield role, path, response
+
+
+def route_statement_counts(app):
+    """{(role, route): (statements, status)} for every route in ROUTE_BUDGETS"""
+    with app.app_context():
+        barn = Barn.query.order_by(Barn.id).first()
+        pig = Pig.query.order_by(Pig.id).first()
+        routes = {route.format(barn_id=barn.id, pig_id=pig.id): route for route in ROUTE_BUDGETS}
+        chart_cache.invalidate_pig(pig.id)
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                statements.append(statement)
+
+        counts = {}
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            for role, path, response in protected_route_requests(routes):
+                counts[role, routes[path]] = (len(statements), response.status_code)
+                statements.clear()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+    return counts
+
+
+def test_every_route_within_its_budget(farm):
+    counts = route_statement_counts(farm)
+    assert {role for role, _ in counts} == {'ADMIN', 'FARMER', 'HELPER'}
+    assert {route for _, route in counts} == set(ROUTE_BUDGETS)
+    over = {f'{role} {route}': f'{count} statements (budget {ROUTE_BUDGETS[route]})'
+            for (role, route), (count, status) in counts.items() if count > ROUTE_BUDGETS[route]}
+    assert not over
+    assert all(status < 500 for _, status in counts.values())
+
+
+def test_statements_do_not_grow_with_the_farm(farm):
+    """An N+1 query shows up as more statements once there are more pigs and weigh-ins"""
+    small = route_statement_counts(farm)
+    with farm.app_context():
+        seed_farm_data(3, 3, 150, 5, 240, random.Random(2), prefix='U')
+        db.session.commit()
+    large = route_statement_counts(farm)
+    grown = {f'{role} {route}': f'{small[role, route][0]} -> {count}'
+             for (role, route), (count, _) in large.items() if count > small[role, route][0]}
+    assert not grown
@@ -0,0 +1,94 @@
+"""Daily rollups kept up by rollups_follow match a rebuild after moves, slaughters and deletes"""
+from datetime import datetime, timedelta
+
+from pigfarm.extensions import db
+from pigfarm.models import BarnDailyRollup, Pig, Section, Weight
+from pigfarm.rollups import rollups_follow
+from pigfarm.summaries import rebuild_weight_summaries
+
+
+def alive_pigs(count):
+    """Alive pigs in a section with a few weigh-ins, first come first"""
+    pigs = []
+    for pig in Pig.query.filter(Pig.status == 'ALIVE', Pig.section_id.isnot(None)).order_by(Pig.id):
+        if Weight.query.filter_by(pig_id=pig.id).count() >= 4:
+            pigs.append(pig.id)
+    return pigs[:count]
+
+
+def other_section(pig_id):
+    pig = db.session.get(Pig, pig_id)
+    return Section.query.filter(Section.barn_id == pig.barn_id, Section.id != pig.section_id).first().id
+
+
+def section_days(section_id):
+    """{day: head count change} recorded for a section"""
+    return {row.day: row.head_change for row in BarnDailyRollup.query.filter_by(section_id=section_id)
+            if row.head_change}
+
+
+def test_move_keeps_earlier_days_with_the_old_section(farm, client_for, assert_matches_rebuild):
+    client = client_for('admin')
+    today = datetime.utcnow().date()
+    with farm.app_context():
+        pig_id = alive_pigs(1)[0]
+        pig = db.session.get(Pig, pig_id)
+        old_section, new_section = pig.section_id, other_section(pig_id)
+        form = {'sex': pig.sex, 'breed': pig.breed, 'notes': '', 'section_id': str(new_section)}
+        latest = Weight.query.filter_by(pig_id=pig_id).order_by(Weight.date.desc()).first()
+        back_dated = {'weight': str(latest.weight), 'date': (latest.date - timedelta(days=1)).isoformat()}
+        old_days, new_days = section_days(old_section), section_days(new_section)
+
+    assert client.post(f'/pig/{pig_id}/edit', data=form).status_code == 302
+    assert client.post(f'/pig/{pig_id}/weigh', data=back_dated).status_code == 302
+    with farm.app_context():
+        assert section_days(old_section) == {**old_days, today: old_days.get(today, 0) - 1}
+        assert section_days(new_section) == {**new_days, today: new_days.get(today, 0) + 1}
+        assert_matches_rebuild()
+
+    # Moved again the same day, then back where it started
+    assert client.post(f'/pig/{pig_id}/edit', data={**form, 'section_id': str(old_section)}).status_code == 302
+    with farm.app_context():
+        assert_matches_rebuild()
+
+
+def test_slaughter_and_delete(farm, client_for, assert_matches_rebuild):
+    client = client_for('admin')
+    with farm.app_context():
+        slaughtered, deleted = alive_pigs(2)
+        weigh_dates = [row.date for row in Weight.query.filter_by(pig_id=slaughtered).order_by(Weight.date)]
+    # Killed before its last weigh-ins: those no longer count towards live weight
+    kill_date = weigh_dates[len(weigh_dates) // 2]
+
+    assert client.post(f'/pig/{slaughtered}/slaughter', data={'kill_date': kill_date.isoformat()}).status_code == 302
+    with farm.app_context():
+        assert_matches_rebuild()
+    assert client.post(f'/pig/{deleted}/delete').status_code == 302
+    with farm.app_context():
+        assert db.session.get(Pig, deleted) is None
+        assert_matches_rebuild()
+
+
+def test_deleting_a_section_moves_its_pigs_out(farm, client_for, assert_matches_rebuild):
+    with farm.app_context():
+        section_id = db.session.get(Pig, alive_pigs(1)[0]).section_id
+    assert client_for('admin').post(f'/section/{section_id}/delete').status_code == 302
+    with farm.app_context():
+        assert Pig.query.filter_by(section_id=section_id).count() == 0
+        assert_matches_rebuild()
+
+
+def test_several_changes_in_one_block(farm, assert_matches_rebuild):
+    with farm.app_context():
+        first, second, third = alive_pigs(3)
+        with rollups_follow([first, second, third]):
+            pig = db.session.get(Pig, first)
+            pig.dob -= timedelta(days=3)
+            pig = db.session.get(Pig, second)
+            pig.status, pig.kill_date = 'SLAUGHTERED', datetime.utcnow().date()
+            db.session.delete(db.session.get(Pig, third))
+            Weight.query.filter_by(pig_id=first).order_by(Weight.date).first().flag = 'trajectory'
+            db.session.flush()
+            rebuild_weight_summaries([first])
+        db.session.commit()
+        assert_matches_rebuild()
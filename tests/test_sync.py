@@ -0,0 +1,117 @@
+"""Terminal sync: retried batches, conflicts and roster deltas"""
+from datetime import datetime, timedelta
+
+from pigfarm.extensions import db
+from pigfarm.models import Barn, Pig, Section, SyncOperation, Weight
+
+
+def alive_pigs(barn_id, count):
+    return Pig.query.filter(Pig.barn_id == barn_id, Pig.status == 'ALIVE', Pig.section_id.isnot(None)) \
+        .order_by(Pig.id).limit(count).all()
+
+
+def sync(client, *operations):
+    response = client.post('/api/sync/batch', json={'operations': list(operations)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_retried_batch_is_applied_once(farm, client_for, assert_matches_rebuild):
+    today = datetime.utcnow().date()
+    with farm.app_context():
+        barn_id = db.session.query(db.func.min(Barn.id)).scalar()
+        weighed, moved, slaughtered = (pig.id for pig in alive_pigs(barn_id, 3))
+        pig = db.session.get(Pig, moved)
+        section_id = Section.query.filter(Section.barn_id == barn_id, Section.id != pig.section_id).first().id
+        weights_before = Weight.query.count()
+    operations = [
+        {'client_id': 'op-1', 'type': 'weigh', 'pig_id': weighed, 'weight': 40.5, 'date': today.isoformat()},
+        {'client_id': 'op-2', 'type': 'move', 'pig_id': moved, 'section_id': section_id},
+        {'client_id': 'op-3', 'type': 'slaughter', 'pig_id': slaughtered, 'kill_date': today.isoformat()},
+    ]
+    client = client_for('admin')
+
+    first = sync(client, *operations)
+    assert first['applied'] == 3
+    retry = sync(client, *operations)
+    assert retry['duplicate'] == 3
+    assert [{**result, 'status': 'applied'} for result in retry['results']] == first['results']
+    with farm.app_context():
+        assert Weight.query.count() == weights_before + 1
+        assert db.session.get(Pig, moved).section_id == section_id
+        assert db.session.get(Pig, slaughtered).kill_date == today
+        assert SyncOperation.query.count() == 3
+        assert_matches_rebuild()
+
+
+def test_conflicts_and_rejections(farm, client_for, assert_matches_rebuild):
+    today = datetime.utcnow().date()
+    with farm.app_context():
+        first_barn, second_barn = [barn_id for (barn_id,) in db.session.query(Barn.id).order_by(Barn.id).limit(2)]
+        slaughtered, moved, stale = (pig.id for pig in alive_pigs(first_barn, 3))
+        foreign_section = Section.query.filter_by(barn_id=second_barn).first().id
+        stale_section = db.session.get(Pig, stale).section_id
+        stale_target = Section.query.filter(Section.barn_id == first_barn, Section.id != stale_section).first().id
+        foreign_pig = alive_pigs(second_barn, 1)[0].id
+        weights_before = Weight.query.count()
+    kill_date = today - timedelta(days=3)
+
+    outcome = sync(
+        client_for('t-farmer-001'),
+        {'client_id': 'kill', 'type': 'slaughter', 'pig_id': slaughtered, 'kill_date': kill_date.isoformat()},
+        # Queued after the kill by the same terminal: the slaughter in this batch wins
+        {'client_id': 'late-weigh', 'type': 'weigh', 'pig_id': slaughtered, 'weight': 90, 'date': today.isoformat()},
+        {'client_id': 'kill-again', 'type': 'slaughter', 'pig_id': slaughtered, 'kill_date': today.isoformat()},
+        # The terminal last saw the pig somewhere it no longer is
+        {'client_id': 'stale-move', 'type': 'move', 'pig_id': stale, 'section_id': stale_target,
+         'from_section_id': foreign_section},
+        {'client_id': 'wrong-barn', 'type': 'move', 'pig_id': moved, 'section_id': foreign_section},
+        {'client_id': 'not-mine', 'type': 'weigh', 'pig_id': foreign_pig, 'weight': 50, 'date': today.isoformat()},
+        {'client_id': 'ghost', 'type': 'weigh', 'pig_id': 'NO-SUCH-PIG', 'weight': 50, 'date': today.isoformat()},
+        {'client_id': 'ghost', 'type': 'weigh', 'pig_id': moved, 'weight': 50, 'date': today.isoformat()},
+    )
+    statuses = {result['client_id']: (result['status'], result.get('error')) for result in outcome['results']}
+    assert statuses == {
+        'kill': ('applied', None),
+        'late-weigh': ('conflict', 'Pig was slaughtered before this weigh-in'),
+        'kill-again': ('conflict', 'Pig was already slaughtered on another date'),
+        'stale-move': ('conflict', 'Pig was moved to another section since the last sync'),
+        'wrong-barn': ('rejected', "Section is not in the pig's barn"),
+        'not-mine': ('rejected', 'Access denied'),
+        'ghost': ('rejected', 'client_id repeated in this batch'),
+    }
+    assert [result['status'] for result in outcome['results']][6] == 'conflict'  # the first 'ghost': unknown pig
+    conflict = next(result for result in outcome['results'] if result['client_id'] == 'stale-move')
+    assert conflict['pig']['section_id'] == stale_section
+
+    # Only applied operations are recorded: a corrected operation may reuse its client_id
+    corrected = sync(client_for('t-farmer-001'),
+                     {'client_id': 'late-weigh', 'type': 'weigh', 'pig_id': slaughtered, 'weight': 90,
+                      'date': kill_date.isoformat()})
+    assert corrected['applied'] == 1
+    with farm.app_context():
+        assert Weight.query.count() == weights_before + 1
+        assert_matches_rebuild()
+
+
+def test_roster_delta_and_tombstones(farm, client_for):
+    today = datetime.utcnow().date()
+    with farm.app_context():
+        barn_id = db.session.query(db.func.min(Barn.id)).scalar()
+        deleted, slaughtered, unchanged = (pig.id for pig in alive_pigs(barn_id, 3))
+    client = client_for('admin')
+    roster = client.get(f'/api/sync/barns/{barn_id}/roster').get_json()
+    assert roster['full'] and {deleted, slaughtered, unchanged} <= {pig['id'] for pig in roster['pigs']}
+
+    assert client.post(f'/pig/{deleted}/delete').status_code == 302
+    sync(client, {'client_id': 'kill', 'type': 'slaughter', 'pig_id': slaughtered, 'kill_date': today.isoformat()})
+
+    delta = client.get(f'/api/sync/barns/{barn_id}/roster?since={roster["version"]}').get_json()
+    assert not delta['full'] and delta['version'] > roster['version']
+    assert delta['removed'] == [deleted]
+    assert [(pig['id'], pig['status']) for pig in delta['pigs']] == [(slaughtered, 'SLAUGHTERED')]
+
+    caught_up = client.get(f'/api/sync/barns/{barn_id}/roster?since={delta["version"]}').get_json()
+    assert (caught_up['pigs'], caught_up['removed']) == ([], [])
+    full = client.get(f'/api/sync/barns/{barn_id}/roster').get_json()
+    assert {deleted, slaughtered}.isdisjoint(pig['id'] for pig in full['pigs'])
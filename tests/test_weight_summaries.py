@@ -0,0 +1,94 @@
+"""Weigh-ins recorded out of date order fold into the weight summaries as a rebuild would"""
+from datetime import timedelta
+
+from pigfarm.extensions import db
+from pigfarm.models import Pig, Weight, WeightSummary
+
+
+def history(pig_id):
+    return [(row.date, row.weight) for row in Weight.query.filter_by(pig_id=pig_id).order_by(Weight.date, Weight.id)]
+
+
+def pig_with_history(offset=0):
+    """An alive pig with at least six weigh-ins and a free day before the first one"""
+    pigs = []
+    for pig in Pig.query.filter_by(status='ALIVE').order_by(Pig.id):
+        weights = history(pig.id)
+        if len(weights) >= 6 and weights[0][0] > pig.dob:
+            pigs.append(pig.id)
+    return pigs[offset]
+
+
+def weigh(client, pig_id, date, weight):
+    response = client.post(f'/pig/{pig_id}/weigh', data={'weight': str(weight), 'date': date.isoformat()})
+    assert response.status_code == 302
+
+
+def test_back_dated_weigh_ins_fold_into_the_summary(farm, client_for, assert_matches_rebuild):
+    client = client_for('admin')
+    with farm.app_context():
+        pig_id = pig_with_history()
+        weights = history(pig_id)
+    (first_date, first_weight), (latest_date, latest_weight) = weights[0], weights[-1]
+    (before_date, before_weight), (after_date, after_weight) = weights[2], weights[3]
+
+    earlier = first_date - timedelta(days=1)
+    weigh(client, pig_id, earlier, round(first_weight - 0.2, 1))
+    weigh(client, pig_id, before_date + (after_date - before_date) / 2, round((before_weight + after_weight) / 2, 1))
+    weigh(client, pig_id, earlier, round(first_weight - 0.1, 1))  # same day as the first: stays second
+    weigh(client, pig_id, latest_date, round(latest_weight + 0.2, 1))  # same day as the latest: replaces it
+
+    with farm.app_context():
+        assert Weight.query.filter(Weight.pig_id == pig_id, Weight.flag.isnot(None)).count() == 0
+        summary = db.session.get(WeightSummary, pig_id)
+        assert summary.weight_count == len(weights) + 4
+        assert (summary.first_weight_date, summary.first_weight) == (earlier, round(first_weight - 0.2, 1))
+        assert (summary.latest_weight_date, summary.latest_weight) == (latest_date, round(latest_weight + 0.2, 1))
+        assert_matches_rebuild()
+
+
+def test_back_dated_bulk_batch(farm, client_for, assert_matches_rebuild):
+    rows = []
+    with farm.app_context():
+        for offset in range(3):
+            pig_id = pig_with_history(offset)
+            weights = history(pig_id)
+            (first_date, first_weight), (middle_date, middle_weight) = weights[0], weights[len(weights) // 2]
+            rows += [
+                {'pig_id': pig_id, 'weight': round(first_weight - 0.2, 1),
+                 'date': (first_date - timedelta(days=1)).isoformat()},
+                {'pig_id': pig_id, 'weight': round(first_weight - 0.1, 1),
+                 'date': (first_date - timedelta(days=1)).isoformat()},
+                {'pig_id': pig_id, 'weight': middle_weight, 'date': middle_date.isoformat()},
+            ]
+    response = client_for('admin').post('/api/weigh-ins', json={'weights': rows})
+    assert response.status_code == 200
+    assert response.get_json()['inserted'] == len(rows)
+    with farm.app_context():
+        assert_matches_rebuild()
+
+
+def test_deleted_and_reviewed_weigh_ins(farm, client_for, assert_matches_rebuild):
+    client = client_for('admin')
+    with farm.app_context():
+        pig_id = pig_with_history()
+        weights = history(pig_id)
+    weigh(client, pig_id, weights[0][0] - timedelta(days=1), round(weights[0][1] - 0.2, 1))
+    weigh(client, pig_id, weights[3][0], weights[3][1] + 60)  # an entry error in the middle
+
+    with farm.app_context():
+        back_dated = Weight.query.filter_by(pig_id=pig_id).order_by(Weight.date, Weight.id).first().id
+        flagged = Weight.query.filter(Weight.pig_id == pig_id, Weight.flag.isnot(None)).one().id
+        assert db.session.get(WeightSummary, pig_id).weight_count == len(weights) + 1
+        assert_matches_rebuild()
+
+    assert client.post(f'/weight/{back_dated}/delete').status_code == 302
+    with farm.app_context():
+        summary = db.session.get(WeightSummary, pig_id)
+        assert (summary.first_weight_date, summary.weight_count) == (weights[0][0], len(weights))
+        assert_matches_rebuild()
+
+    assert client.post(f'/weight/{flagged}/review').status_code == 302
+    with farm.app_context():
+        assert db.session.get(WeightSummary, pig_id).weight_count == len(weights) + 1
+        assert_matches_rebuild()